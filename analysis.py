@@ -1,12 +1,16 @@
 import os
-import csv
+import glob
+import time
+import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-import glob
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
+from utils.results_store import ResultsStore
+from utils.profiling import diff_profiles
 
 # Generated by AI (Gemini) with my collaboration
 
@@ -15,6 +19,20 @@ import plotly.graph_objects as go
 # ==========================================
 ARTIFACTS_PATH = r"D:\CMU\Mini 2\Financial Computing\fc2-final-project-Anmaya1856\artifacts"
 OUTPUT_PATH = r"D:\CMU\Mini 2\Financial Computing\fc2-final-project-Anmaya1856\analysis_results"
+# Consolidated results store, only new/modified run folders get parsed on each run
+RESULTS_DB = os.path.join(OUTPUT_PATH, "results.sqlite")
+
+# Static charts are rendered as independent jobs on a process pool (None = one worker per core)
+CHART_WORKERS = None
+# Skip charts whose input data slice hasn't changed since the last render (tracked in chart_hashes.json)
+SKIP_UNCHANGED_CHARTS = True
+# Bump when the look of the static charts changes so every chart gets re-rendered once
+CHART_STYLE_VERSION = 1
+
+# Capacity planning: budgets used to extrapolate the largest N each solver can handle (see utils/capacity.py)
+LATENCY_BUDGET_S = 1.0
+MEMORY_BUDGET_MB = 2048
+BOOTSTRAP_SAMPLES = 1000
 
 os.makedirs(OUTPUT_PATH, exist_ok=True)
 
@@ -55,72 +73,19 @@ def get_algo_order(df):
 # 2. DATA LOADING
 # ==========================================
 
-def parse_benchmark_file(filepath):
-    metadata = {}
-    algo_data_temp = []
+def load_data(root_path, scenario=None):
+    """
+    Syncs the results store with root_path (incremental) and returns the benchmark rows.
+    """
+    start = time.perf_counter()
+    store = ResultsStore(RESULTS_DB)
     try:
-        with open(filepath, 'r', newline='', encoding='utf-8', errors='replace') as f: 
-            reader = csv.reader(f)
-            rows = list(reader)
-        if not rows: return None
-
-        for row in rows[:20]:
-            if len(row) < 2: continue
-            key = row[0].strip()
-            val = row[1].strip()
-            if "Active Users" in key and val.isdigit(): metadata['N'] = int(val)
-            elif "Theoretical Min" in key and val.isdigit(): metadata['Floor'] = int(val)
-            elif "Theoretical Worst" in key and val.isdigit(): metadata['Ceiling'] = int(val)
-
-        header_idx = -1
-        for i, row in enumerate(rows):
-            if len(row) > 0 and "Algorithm" in row[0]:
-                header_idx = i; break
-        if header_idx == -1: return None
-        
-        for row in rows[header_idx+1:]:
-            if not row or not row[0]: continue
-            algo_name = row[0].strip()
-            try:
-                txs = int(float(row[1]))
-                time_val = float(row[2])
-            except ValueError: continue
-
-            if "Theoretical Worst" in algo_name:
-                if 'N' not in metadata: metadata['N'] = txs + 1
-                if 'Ceiling' not in metadata: metadata['Ceiling'] = txs
-                continue
-            if "Theoretical Best" in algo_name:
-                if 'Floor' not in metadata: metadata['Floor'] = txs
-                continue
-
-            algo_data_temp.append({
-                'Algorithm': algo_name,
-                'Transactions': txs,
-                'Time (s)': time_val
-            })
-
-        if 'N' not in metadata: return None
-
-        final_data = []
-        for item in algo_data_temp:
-            item['N'] = metadata['N']
-            item['Theoretical_Floor'] = metadata.get('Floor', 0)
-            item['Optimality Gap'] = max(0, item['Transactions'] - item['Theoretical_Floor'])
-            final_data.append(item)
-        return final_data
-    except Exception: return None
-
-def load_data(root_path):
-    all_records = []
-    files = glob.glob(os.path.join(root_path, "**", "benchmark_stats.csv"), recursive=True)
-    print(f"Found {len(files)} benchmark files. Parsing...")
-    for f in files:
-        data = parse_benchmark_file(f)
-        if data: all_records.extend(data)
-    if not all_records: return pd.DataFrame()
-    df = pd.DataFrame(all_records)
-    df = df[df['N'] > 0] 
+        counts = store.sync(root_path)
+        print(f"Results store: {counts['added']} added, {counts['updated']} updated, {counts['removed']} removed, "
+              f"{counts['unchanged']} unchanged ({time.perf_counter() - start:.3f}s)")
+        df = store.load_frame(scenario=scenario)
+    finally:
+        store.close()
     return df
 
 # ==========================================
@@ -135,42 +100,47 @@ def plot_static_transactions(df):
     plot_df = df[df['Transactions'] > 0]
     unique_ns = sorted(plot_df['N'].unique())
     for n in unique_ns:
-        subset = plot_df[plot_df['N'] == n]
-        if len(subset) == 0: continue
-        
-        plt.figure(figsize=(16, 10))
-        floor = subset['Theoretical_Floor'].mean() 
-        order = get_algo_order(subset)
-        
-        ax = sns.barplot(
-            data=subset, x='Algorithm', y='Transactions', hue='Algorithm', 
-            palette="viridis", estimator=np.mean, errorbar=None, dodge=False, zorder=3,
-            order=order, hue_order=order
-        )
-        
-        # INCREASED DATA LABEL FONT
-        add_labels(ax, '{:.1f}', size=18)
-        
-        plt.axhline(floor, color='red', linestyle='--', linewidth=2.5, label=f'Theoretical Floor ({floor:.1f})', zorder=4)
-        
-        k_trials = len(subset) // len(subset['Algorithm'].unique())
-        plt.title(f"Mean Transactions (N={n}) | Trials: k={k_trials}", fontsize=24, fontweight='bold', y=1.15)
-        
-        # INCREASED AXIS LABEL FONTS
-        plt.ylabel("Number of Transactions", fontsize=20)
-        plt.xlabel("") # Algorithm labels are on x-axis ticks
-        
-        # INCREASED LEGEND FONT
-        plt.legend(loc='lower center', bbox_to_anchor=(0.5, 1.02), ncol=3, frameon=False, fontsize=16)
-        
-        # INCREASED TICK FONTS
-        plt.xticks(rotation=30, ha='right', fontsize=16)
-        plt.yticks(fontsize=16)
-        
-        plt.grid(True, axis='y', linestyle='--', alpha=0.7, zorder=0)
-        plt.tight_layout()
-        plt.savefig(f"{OUTPUT_PATH}/static_transactions_N{n}.png", dpi=300, bbox_inches='tight')
-        plt.close()
+        plot_static_transactions_n(df, n)
+
+def plot_static_transactions_n(df, n):
+    """Bar chart of mean transactions per algorithm for a single N."""
+    plot_df = df[df['Transactions'] > 0]
+    subset = plot_df[plot_df['N'] == n]
+    if len(subset) == 0: return
+    
+    plt.figure(figsize=(16, 10))
+    floor = subset['Theoretical_Floor'].mean() 
+    order = get_algo_order(subset)
+    
+    ax = sns.barplot(
+        data=subset, x='Algorithm', y='Transactions', hue='Algorithm', 
+        palette="viridis", estimator=np.mean, errorbar=None, dodge=False, zorder=3,
+        order=order, hue_order=order
+    )
+    
+    # INCREASED DATA LABEL FONT
+    add_labels(ax, '{:.1f}', size=18)
+    
+    plt.axhline(floor, color='red', linestyle='--', linewidth=2.5, label=f'Theoretical Floor ({floor:.1f})', zorder=4)
+    
+    k_trials = len(subset) // len(subset['Algorithm'].unique())
+    plt.title(f"Mean Transactions (N={n}) | Trials: k={k_trials}", fontsize=24, fontweight='bold', y=1.15)
+    
+    # INCREASED AXIS LABEL FONTS
+    plt.ylabel("Number of Transactions", fontsize=20)
+    plt.xlabel("") # Algorithm labels are on x-axis ticks
+    
+    # INCREASED LEGEND FONT
+    plt.legend(loc='lower center', bbox_to_anchor=(0.5, 1.02), ncol=3, frameon=False, fontsize=16)
+    
+    # INCREASED TICK FONTS
+    plt.xticks(rotation=30, ha='right', fontsize=16)
+    plt.yticks(fontsize=16)
+    
+    plt.grid(True, axis='y', linestyle='--', alpha=0.7, zorder=0)
+    plt.tight_layout()
+    plt.savefig(f"{OUTPUT_PATH}/static_transactions_N{n}.png", dpi=300, bbox_inches='tight')
+    plt.close()
 
 def plot_static_time(df):
     if len(df['N'].unique()) < 2: return
@@ -195,6 +165,38 @@ def plot_static_time(df):
     plt.savefig(f"{OUTPUT_PATH}/static_time_complexity.png", dpi=300, bbox_inches='tight')
     plt.close()
 
+def plot_static_memory(df):
+    """Peak memory vs N next to the time complexity chart (traced Python allocations + RSS delta)"""
+    plot_df = df[df['Transactions'] > 0]
+    panels = [c for c in ('Peak Traced (MB)', 'Peak RSS Delta (MB)') if c in plot_df.columns and plot_df[c].notna().any()]
+    if len(plot_df['N'].unique()) < 2 or not panels: return
+
+    # Only algorithms that actually have memory numbers (older runs / skipped solvers don't)
+    order = [a for a in get_algo_order(plot_df) if plot_df.loc[plot_df['Algorithm'] == a, panels].notna().any(axis=None)]
+    fig, axes = plt.subplots(1, len(panels), figsize=(16 * len(panels) / 1.5, 10), squeeze=False)
+    for i, (ax, col) in enumerate(zip(axes[0], panels)):
+        mem_df = plot_df[plot_df[col].notna()].copy()
+        # log scale: tiny runs can report 0 MB
+        mem_df[col] = mem_df[col].clip(lower=0.001)
+        sns.lineplot(
+            data=mem_df, x='N', y=col, hue='Algorithm', style='Algorithm', ax=ax,
+            markers=True, dashes=True, linewidth=3, markersize=10, palette="tab10",
+            errorbar=("ci", 95), hue_order=order, style_order=order
+        )
+        ax.set_yscale('log')
+        ax.set_title(col.replace(" (MB)", ""), fontsize=16)
+        ax.set_ylabel(f"{col} - Log Scale", fontsize=15)
+        ax.set_xlabel("Number of Active Users (N)", fontsize=15)
+        ax.grid(True, which="both", ls="-", alpha=0.2)
+        if i == 0:
+            handles, labels = ax.get_legend_handles_labels()
+        ax.get_legend().remove()
+    fig.legend(handles, labels, loc='lower center', bbox_to_anchor=(0.5, 1.0), ncol=3, frameon=False)
+    fig.suptitle("Peak Memory vs Input Size (Log Scale)", fontsize=20, fontweight='bold', y=1.1)
+    plt.tight_layout()
+    plt.savefig(f"{OUTPUT_PATH}/static_memory_complexity.png", dpi=300, bbox_inches='tight')
+    plt.close()
+
 def plot_static_heatmap(df):
     plot_df = df[df['Transactions'] > 0]
     pivot = plot_df.pivot_table(index='N', columns='Algorithm', values='Optimality Gap', aggfunc='mean')
@@ -219,7 +221,7 @@ def plot_static_heatmap(df):
 
 def plot_static_tradeoff(df):
     """Static Scatter Plot"""
-    agg = df.groupby(['N', 'Algorithm']).mean().reset_index()
+    agg = df.groupby(['N', 'Algorithm']).mean(numeric_only=True).reset_index()
     order = get_algo_order(df)
     
     plt.figure(figsize=(16, 10))
@@ -231,170 +233,293 @@ def plot_static_tradeoff(df):
     plt.savefig(f"{OUTPUT_PATH}/static_tradeoff_scatter.png", dpi=300, bbox_inches='tight'); plt.close()
 
 
+# ==========================================
+# 3b. PARALLEL CHART RENDERING
+# ==========================================
+
+# Columns the static charts actually read, only these go into the per chart data hash
+CHART_COLUMNS = ['N', 'Algorithm', 'Transactions', 'Time (s)', 'Optimality Gap', 'Theoretical_Floor', 'Peak Traced (MB)', 'Peak RSS Delta (MB)']
+
+# Per worker copy of the dataframe (shipped once per worker by the pool initializer, not once per task)
+_WORKER_DF = None
+
+def _init_chart_worker(df, output_path):
+    global _WORKER_DF, OUTPUT_PATH
+    _WORKER_DF = df
+    OUTPUT_PATH = output_path
+
+def _render_chart(func_name, args):
+    globals()[func_name](_WORKER_DF, *args)
+    return func_name, args
+
+def _data_hash(frame):
+    h = hashlib.sha1(str(CHART_STYLE_VERSION).encode())
+    cols = [c for c in CHART_COLUMNS if c in frame.columns]
+    h.update(pd.util.hash_pandas_object(frame[cols].sort_values(cols), index=False).values.tobytes())
+    return h.hexdigest()
+
+def _chart_jobs(df):
+    """
+    One job per figure: (chart key, output file, plotting function name, extra args, input data slice).
+    """
+    plot_df = df[df['Transactions'] > 0]
+    jobs = []
+    for n in sorted(plot_df['N'].unique()):
+        jobs.append((f"transactions_N{n}", f"static_transactions_N{n}.png", "plot_static_transactions_n", (n,), plot_df[plot_df['N'] == n]))
+    if len(df['N'].unique()) >= 2:
+        jobs.append(("time_complexity", "static_time_complexity.png", "plot_static_time", (), plot_df))
+        if 'Peak Traced (MB)' in plot_df.columns and plot_df['Peak Traced (MB)'].notna().any():
+            jobs.append(("memory_complexity", "static_memory_complexity.png", "plot_static_memory", (), plot_df))
+    jobs.append(("optimality_gap_heatmap", "static_optimality_gap_heatmap.png", "plot_static_heatmap", (), plot_df))
+    jobs.append(("tradeoff_scatter", "static_tradeoff_scatter.png", "plot_static_tradeoff", (), df))
+    return jobs
+
+def render_static_charts(df, workers=CHART_WORKERS, skip_unchanged=SKIP_UNCHANGED_CHARTS):
+    """
+    Renders every static chart as an independent job on a process pool.
+    With skip_unchanged, charts whose input slice hash matches the last render (and whose PNG still exists) are skipped.
+    """
+    manifest_path = os.path.join(OUTPUT_PATH, "chart_hashes.json")
+    manifest = {}
+    if skip_unchanged and os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    todo = []
+    new_hashes = {}
+    for key, out_file, func_name, args, frame in _chart_jobs(df):
+        h = _data_hash(frame)
+        new_hashes[key] = h
+        if skip_unchanged and manifest.get(key) == h and os.path.exists(os.path.join(OUTPUT_PATH, out_file)):
+            continue
+        todo.append((key, func_name, args))
+
+    print(f"Rendering {len(todo)} static charts ({len(new_hashes) - len(todo)} unchanged, skipped)...")
+    if todo:
+        # Only ship the columns the charts need to the workers
+        chart_df = df[[c for c in CHART_COLUMNS if c in df.columns]]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_chart_worker, initargs=(chart_df, OUTPUT_PATH)) as pool:
+            futures = {pool.submit(_render_chart, func_name, args): key for key, func_name, args in todo}
+            for fut in as_completed(futures):
+                key = futures[fut]
+                try:
+                    fut.result()
+                except Exception as e:
+                    print(f"Chart {key} failed: {e}")
+                    new_hashes.pop(key, None)
+
+    manifest.update(new_hashes)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
 # ==========================================
 # 4. INTERACTIVE PLOTTING (Plotly)
 # ==========================================
 
+# Metric name in the dashboard payload -> dataframe column
+DASHBOARD_METRICS = {
+    "time": 'Time (s)',
+    "tx": 'Transactions',
+    "gap": 'Optimality Gap',
+    "mem": 'Peak Traced (MB)',
+}
+
+def _dashboard_payload(df):
+    """
+    Pre-aggregates the results into one compact, column oriented JSON payload:
+    (scenario, N, algorithm) -> count + mean/std/q25/q50/q75 of every metric, plus the mean floor per (scenario, N).
+    Size depends on #scenarios x #N x #solvers only, not on how many runs are in the store.
+    """
+    plot_df = df[df['Transactions'] > 0].copy()
+    if 'Scenario' not in plot_df.columns:
+        plot_df['Scenario'] = "All"
+    plot_df['Scenario'] = plot_df['Scenario'].fillna("Unknown")
+    algos = get_algo_order(plot_df)
+    algo_idx = {a: i for i, a in enumerate(algos)}
+
+    grouped = plot_df.groupby(['Scenario', 'N', 'Algorithm'])
+    cols = {"scenario": [], "N": [], "algo": [], "count": []}
+    metrics = {m: c for m, c in DASHBOARD_METRICS.items() if c in plot_df.columns and plot_df[c].notna().any()}
+    for m in metrics:
+        for stat in ("mean", "std", "q25", "q50", "q75"):
+            cols[f"{m}_{stat}"] = []
+
+    for (scenario, n, algo), g in grouped:
+        cols["scenario"].append(scenario)
+        cols["N"].append(int(n))
+        cols["algo"].append(algo_idx[algo])
+        cols["count"].append(int(len(g)))
+        for m, c in metrics.items():
+            vals = g[c].dropna()
+            q = vals.quantile([0.25, 0.5, 0.75]).values if len(vals) else [None] * 3
+            cols[f"{m}_mean"].append(round(float(vals.mean()), 6) if len(vals) else None)
+            cols[f"{m}_std"].append(round(float(vals.std()), 6) if len(vals) > 1 else 0.0)
+            cols[f"{m}_q25"].append(None if q[0] is None else round(float(q[0]), 6))
+            cols[f"{m}_q50"].append(None if q[1] is None else round(float(q[1]), 6))
+            cols[f"{m}_q75"].append(None if q[2] is None else round(float(q[2]), 6))
+
+    floors = {}
+    for (scenario, n), g in plot_df.groupby(['Scenario', 'N']):
+        floors.setdefault(scenario, {})[int(n)] = round(float(g['Theoretical_Floor'].mean()), 3)
+
+    return {
+        "algorithms": algos,
+        "colors": [COLOR_MAP.get(a, "#888888") for a in algos],
+        "scenarios": sorted(plot_df['Scenario'].unique().tolist()),
+        "metrics": list(metrics.keys()),
+        "rows": cols,
+        "floors": floors,
+    }
+
 def generate_interactive_dashboard(df):
+    """
+    Writes interactive_dashboard.html: one JSON payload of pre-aggregated stats + client side Plotly charts
+    (filter by scenario / solver / N in the browser), so the page stays small as runs accumulate.
+    """
     print("Generating Interactive Dashboard...")
-    
-    # 1. Time Chart
-    time_df = df.groupby(['N', 'Algorithm'])['Time (s)'].mean().reset_index()
-    time_df['Time (s)'] = time_df['Time (s)'].replace(0, 0.0001)
-    
-    fig_time = px.line(
-        time_df, x='N', y='Time (s)', color='Algorithm', markers=True,
-        title="<b>1. Time Complexity (Speed)</b><br><i>Logarithmic Scale</i>",
-        color_discrete_map=COLOR_MAP
-    )
-    fig_time.update_yaxes(type="log", tickvals=[0.0001, 0.001, 0.01, 0.1, 1, 10, 60], ticktext=["0.1ms", "1ms", "10ms", "100ms", "1s", "10s", "1m"])
-    fig_time.update_layout(height=600, font=dict(size=14))
+    payload = json.dumps(_dashboard_payload(df), separators=(",", ":"))
 
-    # 2. Heatmap
-    pivot = df.pivot_table(index='N', columns='Algorithm', values='Optimality Gap', aggfunc='mean')
-    pivot.sort_index(ascending=True, inplace=True)
-    order = get_algo_order(df)
-    valid_cols = [c for c in order if c in pivot.columns]
-    pivot = pivot[valid_cols]
-    row_max = pivot.max(axis=1); row_max[row_max == 0] = 1
-    norm_pivot = pivot.div(row_max, axis=0)
-    
-    fig_heat = go.Figure(data=go.Heatmap(
-        z=norm_pivot.values, x=pivot.columns, y=pivot.index,
-        text=pivot.values, texttemplate="%{text:.1f}", textfont={"size": 16},
-        colorscale="Reds", colorbar=dict(title="Relative Gap"),
-    ))
-    fig_heat.update_layout(
-        title="<b>2. Accuracy Heatmap</b><br><i>Numbers = Avg Extra Transactions vs Floor</i>", 
-        height=800, yaxis=dict(type='category', title="Active Users (N)", autorange="reversed"),
-        xaxis=dict(title="Algorithm"), font=dict(size=14)
-    )
+    out_file = os.path.join(OUTPUT_PATH, "interactive_dashboard.html")
+    with open(out_file, 'w') as f:
+        f.write(DASHBOARD_TEMPLATE.replace("__PAYLOAD__", payload))
+
+    print(f"Interactive Dashboard saved: {out_file} ({os.path.getsize(out_file) / 1024:.1f} KB)")
+
+DASHBOARD_TEMPLATE = """<html><head><title>Benchmark Results</title>
+<meta charset="utf-8">
+<script src="https://cdn.plot.ly/plotly-2.35.2.min.js"></script>
+<style>
+body { font-family: sans-serif; }
+#controls { text-align: center; margin: 10px; }
+#controls label { margin-right: 12px; }
+.chart { height: 650px; }
+</style>
+</head><body>
+<h1 style='text-align:center;'>Benchmark Analysis Results</h1>
+<p style='text-align:center; font-size:16px; color:#555;'><b>Parameters:</b> Min Amount = $1 | Max Amount = $500 | Transaction Type = Integer</p>
+<div id="controls">
+  Scenario: <select id="scenario"></select>
+  &nbsp; N: <select id="nsel"></select>
+  &nbsp; Time: <select id="stat"><option value="mean">Mean</option><option value="q50">Median</option><option value="q75">P75</option></select>
+  <div id="algos" style="margin-top:8px;"></div>
+</div>
+<div id="time" class="chart"></div><hr>
+<div id="heat" class="chart"></div><hr>
+<div id="bar" class="chart"></div><hr>
+<div id="tradeoff" class="chart"></div>
+<script>
+var DATA = __PAYLOAD__;
+var R = DATA.rows;
+
+function el(id) { return document.getElementById(id); }
+function selectedAlgos() {
+    var out = {};
+    DATA.algorithms.forEach(function (a, i) { if (el("algo_" + i).checked) out[i] = true; });
+    return out;
+}
+function rowsFor(scenario, algos) {
+    var idx = [];
+    for (var i = 0; i < R.N.length; i++) {
+        if (R.scenario[i] === scenario && algos[R.algo[i]]) idx.push(i);
+    }
+    return idx;
+}
+function uniqueNs(idx) {
+    var seen = {};
+    idx.forEach(function (i) { seen[R.N[i]] = true; });
+    return Object.keys(seen).map(Number).sort(function (a, b) { return a - b; });
+}
 
-    # 3. Interactive Bar Chart (Dropdown by N)
-    fig_bar = go.Figure()
-    all_ns = sorted(df['N'].unique())
-    
-    # Store shapes in a dict to update via dropdown
-    shapes_dict = {}
+function drawTime(idx, stat) {
+    var traces = {};
+    idx.forEach(function (i) {
+        var a = R.algo[i];
+        if (!traces[a]) traces[a] = {x: [], y: [], name: DATA.algorithms[a], mode: "lines+markers", line: {color: DATA.colors[a]},
+                                     error_y: {type: "data", array: [], visible: stat === "mean"}};
+        traces[a].x.push(R.N[i]);
+        traces[a].y.push(Math.max(R["time_" + stat][i], 0.0001));
+        traces[a].error_y.array.push(R.time_std[i]);
+    });
+    Plotly.react("time", Object.values(traces), {
+        title: "<b>1. Time Complexity (Speed)</b><br><i>Logarithmic Scale</i>",
+        xaxis: {title: "Active Users (N)", type: "log"}, yaxis: {title: "Time (s)", type: "log"}
+    });
+}
 
-    for i, n in enumerate(all_ns):
-        subset = df[df['N'] == n]
-        if subset.empty: continue
-        
-        agg = subset.groupby('Algorithm')['Transactions'].mean().reset_index()
-        floor = subset['Theoretical_Floor'].mean()
-        
-        agg['Algo_Sort_Key'] = agg['Algorithm'].apply(lambda x: PREFERRED_ORDER.index(x) if x in PREFERRED_ORDER else 999)
-        agg = agg.sort_values('Algo_Sort_Key')
-
-        # Bar Trace
-        fig_bar.add_trace(go.Bar(
-            x=agg['Algorithm'], y=agg['Transactions'],
-            text=agg['Transactions'], texttemplate='%{text:.1f}', textposition='auto',
-            name=f"N={n} Txs",
-            visible=(i==0),
-            marker_color=[COLOR_MAP.get(a, '#888') for a in agg['Algorithm']]
-        ))
-        
-        # Define the Red Line SHAPE for visual span
-        shapes_dict[n] = [dict(
-            type="line",
-            xref="paper", yref="y",
-            x0=0, x1=1,
-            y0=floor, y1=floor,
-            line=dict(color="red", width=4, dash="dash"),
-        )]
-
-    # Initial setup
-    initial_n = all_ns[0]
-    initial_floor = df[df['N'] == initial_n]['Theoretical_Floor'].mean()
-    
-    # Dummy Trace for Legend
-    fig_bar.add_trace(go.Scatter(
-        x=[None], y=[None],
-        mode='lines',
-        line=dict(color='red', width=4, dash='dash'),
-        name=f'Theoretical Floor', # Static name, value in title
-        showlegend=True,
-        visible=True
-    ))
-
-    # Dropdown Menu Logic
-    steps = []
-    for i, n in enumerate(all_ns):
-        visibility = [False] * len(fig_bar.data)
-        visibility[i] = True     # Show Bar for N
-        visibility[-1] = True    # Keep Legend Trace
-        
-        floor_val = df[df['N'] == n]['Theoretical_Floor'].mean()
-        
-        step = dict(
-            method="update",
-            args=[
-                {"visible": visibility}, 
-                {
-                    "title.text": f"<b>3. Transaction Counts for N={n}</b> (Floor: {floor_val:.1f})",
-                    "shapes": shapes_dict.get(n, [])
-                }
-            ],
-            label=str(n)
-        )
-        steps.append(step)
-
-    # Add Annotation for Dropdown
-    fig_bar.add_annotation(
-        text="Select N:", 
-        x=1.15, y=1.05, 
-        xref="paper", yref="paper", 
-        showarrow=False, 
-        font=dict(size=14, color="black"),
-        xanchor="left"
-    )
+function drawHeat(idx) {
+    var ns = uniqueNs(idx);
+    var algos = [];
+    idx.forEach(function (i) { if (algos.indexOf(R.algo[i]) === -1) algos.push(R.algo[i]); });
+    algos.sort(function (a, b) { return a - b; });
+    var z = ns.map(function () { return algos.map(function () { return null; }); });
+    idx.forEach(function (i) { z[ns.indexOf(R.N[i])][algos.indexOf(R.algo[i])] = R.gap_mean[i]; });
+    // Colour relative to the worst solver in the row, text is the raw value
+    var norm = z.map(function (row) {
+        var m = Math.max.apply(null, row.map(function (v) { return v || 0; })) || 1;
+        return row.map(function (v) { return v === null ? null : v / m; });
+    });
+    Plotly.react("heat", [{
+        z: norm, x: algos.map(function (a) { return DATA.algorithms[a]; }), y: ns.map(String), type: "heatmap",
+        text: z, texttemplate: "%{text:.1f}", colorscale: "Reds", colorbar: {title: "Relative Gap"}
+    }], {
+        title: "<b>2. Accuracy Heatmap</b><br><i>Numbers = Avg Extra Transactions vs Floor</i>",
+        yaxis: {type: "category", title: "Active Users (N)", autorange: "reversed"}, xaxis: {title: "Algorithm"}
+    });
+}
 
-    fig_bar.update_layout(
-        updatemenus=[dict(active=0, buttons=steps, x=1.15, y=1, xanchor="left", yanchor="top")],
-        title=dict(text=f"<b>3. Transaction Counts for N={initial_n}</b> (Floor: {initial_floor:.1f})", font=dict(size=20)),
-        yaxis_title="Transactions", xaxis_title="Algorithm",
-        height=700, margin=dict(r=200), # Space for legend
-        legend=dict(yanchor="top", y=0.9, xanchor="left", x=1.15), # Legend far right
-        shapes=shapes_dict.get(initial_n, []) # Set initial shape
-    )
+function drawBar(idx, scenario, n) {
+    var rows = idx.filter(function (i) { return R.N[i] === n; });
+    var floor = (DATA.floors[scenario] || {})[n];
+    Plotly.react("bar", [{
+        type: "bar", x: rows.map(function (i) { return DATA.algorithms[R.algo[i]]; }),
+        y: rows.map(function (i) { return R.tx_mean[i]; }),
+        error_y: {type: "data", array: rows.map(function (i) { return R.tx_std[i]; })},
+        text: rows.map(function (i) { return R.tx_mean[i].toFixed(1) + " (k=" + R.count[i] + ")"; }), textposition: "auto",
+        marker: {color: rows.map(function (i) { return DATA.colors[R.algo[i]]; })}, name: "Transactions"
+    }], {
+        title: "<b>3. Transaction Counts for N=" + n + "</b> (Floor: " + (floor === undefined ? "-" : floor.toFixed(1)) + ")",
+        yaxis: {title: "Transactions"}, xaxis: {title: "Algorithm"},
+        shapes: floor === undefined ? [] : [{type: "line", xref: "paper", x0: 0, x1: 1, y0: floor, y1: floor, line: {color: "red", width: 4, dash: "dash"}}]
+    });
+}
 
-    # 4. Animated Tradeoff
-    scatter_df = df.groupby(['N', 'Algorithm']).agg({'Time (s)': 'mean', 'Optimality Gap': 'mean'}).reset_index()
-    scatter_df['Time (s)'] = scatter_df['Time (s)'].replace(0, 0.0001)
-    
-    fig_tradeoff = px.scatter(
-        scatter_df, x="Time (s)", y="Optimality Gap", animation_frame="N", animation_group="Algorithm",
-        color="Algorithm", size=[20]*len(scatter_df), log_x=True,
-        range_y=[-1, scatter_df['Optimality Gap'].max() * 1.1],
-        range_x=[0.00005, max(65, scatter_df['Time (s)'].max())],
-        title="<b>4. Cost-Benefit Tradeoff (Animated)</b>", color_discrete_map=COLOR_MAP
-    )
-    fig_tradeoff.update_layout(height=700, font=dict(size=14))
+function drawTradeoff(idx, n) {
+    var rows = idx.filter(function (i) { return R.N[i] === n; });
+    Plotly.react("tradeoff", rows.map(function (i) {
+        return {x: [Math.max(R.time_mean[i], 0.0001)], y: [R.gap_mean[i]], mode: "markers", name: DATA.algorithms[R.algo[i]],
+                marker: {size: 20, color: DATA.colors[R.algo[i]]}};
+    }), {
+        title: "<b>4. Cost-Benefit Tradeoff (N=" + n + ")</b>",
+        xaxis: {title: "Time (s)", type: "log"}, yaxis: {title: "Optimality Gap"}
+    });
+}
 
-    # Save HTML
-    out_file = os.path.join(OUTPUT_PATH, "interactive_dashboard.html")
-    with open(out_file, 'w') as f:
-        f.write("<html><head><title>Benchmark Results</title></head><body>")
-        f.write("<h1 style='text-align:center; font-family:sans-serif;'>Benchmark Analysis Results</h1>")
-        
-        # --- NEW SECTION: PARAMETER SUBTITLE ---
-        f.write("<p style='text-align:center; font-family:sans-serif; font-size:16px; color:#555;'>")
-        f.write("<b>Parameters:</b> Min Amount = $1 | Max Amount = $500 | Transaction Type = Integer")
-        f.write("</p>")
-        # ---------------------------------------
-
-        f.write(fig_time.to_html(full_html=False, include_plotlyjs='cdn'))
-        f.write("<hr>")
-        f.write(fig_heat.to_html(full_html=False, include_plotlyjs=False))
-        f.write("<hr>")
-        f.write(fig_bar.to_html(full_html=False, include_plotlyjs=False))
-        f.write("<hr>")
-        f.write(fig_tradeoff.to_html(full_html=False, include_plotlyjs=False))
-        f.write("</body></html>")
-    
-    print(f"Interactive Dashboard saved: {out_file}")
+function redraw() {
+    var scenario = el("scenario").value;
+    var idx = rowsFor(scenario, selectedAlgos());
+    var ns = uniqueNs(idx);
+    var nsel = el("nsel");
+    var prev = Number(nsel.value);
+    nsel.innerHTML = ns.map(function (n) { return "<option>" + n + "</option>"; }).join("");
+    if (ns.indexOf(prev) !== -1) nsel.value = prev;
+    var n = Number(nsel.value);
+
+    drawTime(idx, el("stat").value);
+    drawHeat(idx);
+    drawBar(idx, scenario, n);
+    drawTradeoff(idx, n);
+}
+
+el("scenario").innerHTML = DATA.scenarios.map(function (s) { return "<option>" + s + "</option>"; }).join("");
+el("algos").innerHTML = DATA.algorithms.map(function (a, i) {
+    return "<label><input type='checkbox' id='algo_" + i + "' checked> " + a + "</label>";
+}).join("");
+["scenario", "nsel", "stat"].forEach(function (id) { el(id).onchange = redraw; });
+DATA.algorithms.forEach(function (a, i) { el("algo_" + i).onchange = redraw; });
+redraw();
+</script>
+</body></html>
+"""
 
 # ==========================================
 # 5. AGGREGATION & MAIN
@@ -403,6 +528,9 @@ def generate_interactive_dashboard(df):
 def export_aggregated_stats(df):
     if df.empty: return
     agg_rules = {'Transactions': ['mean', 'min', 'max', 'std'], 'Time (s)': ['mean'], 'Optimality Gap': ['mean']}
+    for col in ('Peak RSS Delta (MB)', 'Peak Traced (MB)'):
+        if col in df.columns and df[col].notna().any():
+            agg_rules[col] = ['mean', 'max']
     summary = df.groupby(['N', 'Algorithm']).agg(agg_rules)
     summary.columns = ['_'.join(col).strip() for col in summary.columns.values]
     summary = summary.reset_index()
@@ -410,24 +538,192 @@ def export_aggregated_stats(df):
     cols = summary.select_dtypes([np.number]).columns; summary[cols] = summary[cols].round(4)
     summary.to_csv(os.path.join(OUTPUT_PATH, "aggregated_benchmark_stats.csv"), index=False)
 
+# ==========================================
+# 6. SCALING EXPONENTS & CAPACITY PLANNING
+# ==========================================
+
+# metric name -> (dataframe column, budget, offset added before taking logs)
+# Gap can be 0 so it's fitted as log(gap + 1)
+SCALING_METRICS = {
+    "time": ('Time (s)', LATENCY_BUDGET_S, 0.0),
+    "memory": ('Peak Traced (MB)', MEMORY_BUDGET_MB, 0.0),
+    "gap": ('Optimality Gap', None, 1.0),
+}
+
+def fit_power_law(ns, ys, offset=0.0, n_boot=BOOTSTRAP_SAMPLES, seed=0):
+    """
+    Fits log(y + offset) = a + b * log(N) by least squares, b is the empirical scaling exponent.
+    Returns dict with exponent, intercept, r2 and a bootstrap 95% CI on the exponent
+    (plus the bootstrap (a, b) pairs for extrapolation), or None if there isn't enough spread in N.
+    """
+    ns = np.asarray(ns, dtype=float)
+    ys = np.asarray(ys, dtype=float) + offset
+    mask = (ns > 0) & (ys > 0)
+    x, y = np.log(ns[mask]), np.log(ys[mask])
+    if len(np.unique(x)) < 2:
+        return None
+
+    b, a = np.polyfit(x, y, 1)
+    pred = a + b * x
+    ss_res = float(np.sum((y - pred) ** 2))
+    ss_tot = float(np.sum((y - y.mean()) ** 2))
+    r2 = 1 - ss_res / ss_tot if ss_tot > 0 else 1.0
+
+    # Bootstrap: resample (N, y) points with replacement and refit
+    rng = np.random.default_rng(seed)
+    boots = []
+    for _ in range(n_boot):
+        idx = rng.integers(0, len(x), len(x))
+        if len(np.unique(x[idx])) < 2:
+            continue
+        boots.append(np.polyfit(x[idx], y[idx], 1))
+    boots = np.array(boots) if boots else np.array([[b, a]])
+
+    return {
+        "exponent": float(b),
+        "intercept": float(a),
+        "r2": float(r2),
+        "ci95": [float(np.percentile(boots[:, 0], 2.5)), float(np.percentile(boots[:, 0], 97.5))],
+        "n_points": int(len(x)),
+        "n_range": [int(ns[mask].min()), int(ns[mask].max())],
+        "_boots": boots,
+    }
+
+def _max_n_within(fit, budget, offset=0.0):
+    """
+    Largest N with predicted metric <= budget, using the 5th percentile over bootstrap fits (conservative).
+    None means the metric doesn't grow with N (no limit from this budget).
+    """
+    if fit is None or budget is None:
+        return None
+    limits = []
+    for b, a in fit["_boots"]:
+        if b <= 1e-6:
+            continue
+        limits.append(np.exp((np.log(budget + offset) - a) / b))
+    if not limits:
+        return None
+    return int(np.percentile(limits, 5))
+
+def estimate_scaling(df):
+    """
+    Fits the scaling exponent of every metric for every (solver, scenario) and extrapolates the largest N
+    within the configured latency / memory budgets. Returns a list of capacity entries.
+    """
+    plot_df = df[df['Transactions'] > 0]
+    scenario_col = 'Scenario' if 'Scenario' in plot_df.columns else None
+    group_cols = ['Algorithm'] + ([scenario_col] if scenario_col else [])
+
+    entries = []
+    for key, group in plot_df.groupby(group_cols, dropna=False):
+        algo = key[0]
+        scenario = key[1] if scenario_col else None
+        entry = {"algorithm": algo, "scenario": None if pd.isna(scenario) else scenario, "metrics": {}, "max_n": {}}
+        for metric, (col, budget, offset) in SCALING_METRICS.items():
+            if col not in group.columns or group[col].isna().all():
+                continue
+            valid = group.dropna(subset=[col])
+            fit = fit_power_law(valid['N'], valid[col], offset=offset)
+            if fit is None:
+                continue
+            entry["max_n"][metric] = _max_n_within(fit, budget, offset)
+            fit.pop("_boots")
+            entry["metrics"][metric] = fit
+        limits = [v for v in entry["max_n"].values() if v is not None]
+        entry["max_n_overall"] = min(limits) if limits else None
+        entries.append(entry)
+    return entries
+
+def export_capacity_table(df):
+    """
+    Writes capacity_table.json (read at runtime through utils/capacity.py) and a flat capacity_table.csv.
+    """
+    entries = estimate_scaling(df)
+    if not entries: return
+    table = {
+        "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "budgets": {"time_s": LATENCY_BUDGET_S, "memory_mb": MEMORY_BUDGET_MB},
+        "entries": entries,
+    }
+    with open(os.path.join(OUTPUT_PATH, "capacity_table.json"), 'w') as f:
+        json.dump(table, f, indent=2)
+
+    rows = []
+    for e in entries:
+        row = {"Algorithm": e["algorithm"], "Scenario": e["scenario"], "Max_N": e["max_n_overall"]}
+        for metric, fit in e["metrics"].items():
+            row[f"{metric}_exponent"] = round(fit["exponent"], 3)
+            row[f"{metric}_ci_low"] = round(fit["ci95"][0], 3)
+            row[f"{metric}_ci_high"] = round(fit["ci95"][1], 3)
+            row[f"{metric}_max_n"] = e["max_n"].get(metric)
+        rows.append(row)
+    pd.DataFrame(rows).to_csv(os.path.join(OUTPUT_PATH, "capacity_table.csv"), index=False)
+    print(f"Capacity table saved: {os.path.join(OUTPUT_PATH, 'capacity_table.json')}")
+
+# ==========================================
+# 7. PROFILE DIFF
+# ==========================================
+
+def _profile_files(path):
+    """A .prof file or a run folder (every profile_<suffix>.prof in it) -> {suffix: path}"""
+    if os.path.isfile(path):
+        return {os.path.basename(path)[:-len(".prof")].replace("profile_", "", 1): path}
+    return {os.path.basename(p)[len("profile_"):-len(".prof")]: p for p in sorted(glob.glob(os.path.join(path, "profile_*.prof")))}
+
+def diff_profile_runs(path_a, path_b, top=25, sort="tottime"):
+    """
+    Diffs the hot functions of two profiled runs (benchmark.py --profile).
+    Both args are .prof files or run folders (folders are matched per solver suffix).
+    Prints the table and writes profile_diff.csv to OUTPUT_PATH.
+    """
+    files_a, files_b = _profile_files(path_a), _profile_files(path_b)
+    if len(files_a) == 1 and len(files_b) == 1:
+        # Two single files can be compared even if the suffix differs
+        pairs = [(next(iter(files_a)), next(iter(files_a.values())), next(iter(files_b.values())))]
+    else:
+        pairs = [(k, files_a[k], files_b[k]) for k in files_a if k in files_b]
+    if not pairs:
+        print("No matching profiles found."); return pd.DataFrame()
+
+    frames = []
+    for suffix, a, b in pairs:
+        diff = pd.DataFrame(diff_profiles(a, b, n=top, sort=sort))
+        diff.insert(0, "solver", suffix)
+        frames.append(diff)
+        print(f"\n=== {suffix}: {sort} A -> B (top {top} of each, largest change first) ===")
+        print(f"{'FUNCTION':<70} | {'A (s)':>9} | {'B (s)':>9} | {'DELTA':>9} | {'RATIO':>7}")
+        for r in diff.head(top).itertuples(index=False):
+            ratio = "new" if r.ratio == float("inf") else f"{r.ratio:.2f}x"
+            print(f"{r.function[:70]:<70} | {getattr(r, sort + '_a'):>9.4f} | {getattr(r, sort + '_b'):>9.4f} | {r.delta:>+9.4f} | {ratio:>7}")
+
+    out = pd.concat(frames, ignore_index=True)
+    out.to_csv(os.path.join(OUTPUT_PATH, "profile_diff.csv"), index=False)
+    return out
+
 if __name__ == "__main__":
-    print("Reading Benchmark Data...")
-    df = load_data(ARTIFACTS_PATH)
-    if df.empty: print("No valid data found.")
+    parser = argparse.ArgumentParser(description="Benchmark analysis (charts, aggregated stats, capacity table, dashboard).")
+    parser.add_argument("--diff-profiles", nargs=2, metavar=("A", "B"), help="Only diff the hot functions of two profiles (.prof files or run folders)")
+    parser.add_argument("--top", type=int, default=25, help="Hot functions per profile for --diff-profiles")
+    parser.add_argument("--sort", choices=["tottime", "cumtime"], default="tottime")
+    args = parser.parse_args()
+    if args.diff_profiles:
+        diff_profile_runs(*args.diff_profiles, top=args.top, sort=args.sort)
     else:
-        print(f"Loaded {len(df)} rows. N values: {sorted(df['N'].unique())}")
+        print("Reading Benchmark Data...")
+        df = load_data(ARTIFACTS_PATH)
+        if df.empty: print("No valid data found.")
+        else:
+            print(f"Loaded {len(df)} rows. N values: {sorted(df['N'].unique())}")
         
-        # 1. Export CSV
-        export_aggregated_stats(df)
+            # 1. Export CSV
+            export_aggregated_stats(df)
+            export_capacity_table(df)
         
-        # 2. Generate Static PNGs (Only the ones you wanted)
-        print("Generating Static Plots...")
-        plot_static_transactions(df)
-        plot_static_time(df)
-        plot_static_heatmap(df)
-        plot_static_tradeoff(df)
+            # 2. Generate Static PNGs (Only the ones you wanted)
+            print("Generating Static Plots...")
+            render_static_charts(df)
         
-        # 3. Generate Interactive HTML
-        generate_interactive_dashboard(df)
+            # 3. Generate Interactive HTML
+            generate_interactive_dashboard(df)
         
-        print("\nDone.")
\ No newline at end of file
+            print("\nDone.")
\ No newline at end of file
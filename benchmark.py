@@ -0,0 +1,359 @@
+import os
+import json
+import time
+import random
+import argparse
+import traceback
+import multiprocessing as mp
+from statistics import median
+from models.expense_manager import ExpenseManager
+from models.settlement_plan import as_plan
+from utils.data_generator import generate_connected_data
+from utils.exporter import create_artifact_folder, export_run_artifacts, export_benchmark_stats, export_original_state, export_run_metadata, export_solver_trace
+from utils.memory_tracker import measure_solver
+from utils.profiling import profile_call, write_profile
+from utils.verifier import verify_plan, format_report
+from utils.shared_arrays import SharedArray, share_balances, shared_balances_dict, write_plan, read_plan, RECORD
+from solvers import create_solver, solver_info
+from solvers.small_exact import save_engine
+
+# Config driven benchmark runner (replaces editing N / solvers / paths / skip thresholds inside main.py).
+#   python benchmark.py [benchmark_config.json] [--profile]
+#   python benchmark.py --replay "artifacts/N 1000_Int/run_..."   (same solvers on a past run's ledger)
+# Every solver run happens in its own subprocess with a hard wall clock timeout and a memory limit,
+# so a hung MILP or an OOM in LayeredSolver._solve_k4 only fails that one run instead of the whole sweep.
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_config.json")
+RECORDS_FILE = "benchmark_records.jsonl"
+
+def load_config(path):
+    with open(path) as f:
+        cfg = json.load(f)
+    # Relative artifact paths are relative to the config file, not the cwd
+    root = cfg.get("artifacts_path", "artifacts")
+    if not os.path.isabs(root):
+        root = os.path.join(os.path.dirname(os.path.abspath(path)), root)
+    cfg["artifacts_path"] = root
+    # Same for the run folders to replay
+    cfg["replay"] = [p if os.path.isabs(p) else os.path.join(os.path.dirname(os.path.abspath(path)), p) for p in cfg.get("replay", [])]
+    return cfg
+
+def trial_seeds(cfg, scenario_name, n):
+    """
+    Explicit "seeds" list if given, else one seed per trial derived from base_seed (stable across runs).
+    """
+    if cfg.get("seeds"):
+        return list(cfg["seeds"])
+    base = cfg.get("base_seed", 0)
+    return [random.Random(f"{base}:{scenario_name}:{n}:{t}").randrange(2**32) for t in range(cfg.get("trials", 1))]
+
+# ==========================================
+# ISOLATED SOLVER WORKER
+# ==========================================
+
+def _limit_memory(limit_mb):
+    if not limit_mb:
+        return
+    try:
+        import resource
+    except ImportError:
+        # Windows has no RLIMIT_AS, the timeout still applies
+        return
+    limit = int(limit_mb) * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def _solver_worker(conn, spec, shared_balances, plan_buffer, opts):
+    """
+    Runs inside the subprocess: builds the solver, does the warmup runs, then times `repeats` runs with perf_counter.
+    Balances come in and the plan goes out through shared memory (utils/shared_arrays.py), only handles are pickled.
+    Memory comes from utils/memory_tracker.measure_solver (the first warmup is the tracemalloc run).
+    With opts["profile_dir"] set, one more run happens under cProfile after the measured ones (so profiling
+    overhead never ends up in the timings) and profile_<suffix>.prof / .collapsed are written there.
+    Sends back ("ok", measurement) or ("oom"/"error", message).
+    """
+    try:
+        _limit_memory(opts.get("memory_limit_mb"))
+        balances = shared_balances_dict(shared_balances)
+        shared_balances.release()
+        solver = create_solver(spec["class"], **spec.get("params", {}))
+        res = measure_solver(solver, balances, warmups=opts.get("warmups", 1), repeats=opts.get("repeats", 1),
+                             trace_allocations=opts.get("trace_allocations", True), trace_phases=opts.get("trace_phases", False),
+                             instrument=opts.get("instrument", True))
+        # Plan into the parent's shared buffer, pickled arrays only if it doesn't fit
+        res["plan_rows"] = write_plan(plan_buffer, res["txs"])
+        res["txs"] = as_plan(res["txs"]) if res["plan_rows"] is None else None
+        if opts.get("profile_dir"):
+            _, stats = profile_call(solver.solve, dict(balances))
+            res["profile"] = write_profile(stats, opts["profile_dir"], spec["suffix"])
+        # Signatures the exact engine solved in this worker (exact_threshold) go into the on disk table
+        save_engine()
+        conn.send(("ok", res))
+    except MemoryError:
+        conn.send(("oom", "MemoryError"))
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+def run_isolated(spec, balances, timeout_s, opts, plan_buffer=None):
+    """
+    Runs one solver in a fresh subprocess and enforces the hard timeout.
+    balances: {user: balance} or a share_balances() handle (share once per trial when running several solvers).
+    plan_buffer: shared RECORD buffer for the plan (one per trial is enough, runs are sequential), None = one per call.
+    opts: warmups, repeats, memory_limit_mb, trace_allocations, trace_phases, instrument, profile_dir.
+    Returns dict(status, txs, times, peak_rss_delta_mb, peak_traced_mb, phases, instrumentation, trace_events, profile, error).
+    """
+    shared = balances if isinstance(balances, SharedArray) else share_balances(balances)
+    # Every heuristic here needs at most n - 1 transactions, n rows leaves some room
+    own_buffer = plan_buffer is None
+    if own_buffer:
+        plan_buffer = SharedArray.create(max(1, shared.shape[0]), RECORD)
+    ctx = mp.get_context("spawn")
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_solver_worker, args=(child_conn, spec, shared, plan_buffer, opts), daemon=True)
+    proc.start()
+    child_conn.close()
+
+    result = {"status": "error", "txs": [], "times": [], "peak_rss_delta_mb": None, "peak_traced_mb": None, "phases": {},
+              "instrumentation": None, "trace_events": [], "profile": None, "error": None}
+    try:
+        if parent_conn.poll(timeout_s):
+            status, payload = parent_conn.recv()
+            result["status"] = status
+            if status == "ok":
+                result.update(payload)
+                if payload["plan_rows"] is not None:
+                    result["txs"] = read_plan(plan_buffer, payload["plan_rows"])
+            else:
+                result["error"] = payload
+        else:
+            result["status"] = "timeout"
+            result["error"] = f"no result after {timeout_s}s"
+    except EOFError:
+        # Child died without sending anything (killed by the OS, segfault in a native solver, ...)
+        result["status"] = "oom" if proc.exitcode in (-9, 137) else "crash"
+        result["error"] = f"worker exited with code {proc.exitcode}"
+    finally:
+        if proc.is_alive():
+            proc.kill()
+        proc.join()
+        parent_conn.close()
+        # Shared blocks made for this call only (run_trial passes its own per trial ones)
+        if shared is not balances:
+            shared.release()
+        if own_buffer:
+            plan_buffer.release()
+    return result
+
+# ==========================================
+# SWEEP
+# ==========================================
+
+def run_trial(cfg, scenario, n_users, seed, records_path, mgr=None, replay_of=None):
+    """
+    One scenario / N / seed: generates the ledger (or uses mgr, a ledger reloaded by run_replay) and runs every solver on it.
+    """
+    if mgr is None:
+        n_transactions = int(cfg.get("transactions_per_user", 2) * n_users)
+        random.seed(seed)
+        mgr = ExpenseManager(n_users)
+        generate_connected_data(mgr, n_transactions, min_amt=scenario["min_amt"], max_amt=scenario["max_amt"],
+                                active_threshold=scenario.get("active_threshold", 1), isInt=scenario.get("isInt", True))
+    else:
+        n_transactions = len(mgr.transactions)
+    mgr.validate_integrity()
+    active_balances = mgr.get_active_balances()
+
+    export = cfg.get("export_artifacts", True)
+    root = os.path.join(cfg["artifacts_path"], f"N {n_users}_{scenario['name']}")
+    assets = os.path.join(cfg["artifacts_path"], "_graph_assets") if cfg.get("shared_graph_assets") else None
+    folder = None
+    if export:
+        tag = f"s{seed}" if seed is not None else None
+        if replay_of:
+            tag = f"replay_{tag}" if tag else "replay"
+        folder = create_artifact_folder(root, tag=tag)
+        export_original_state(folder, mgr, n_users, n_transactions, shared_assets_dir=assets)
+    # Profiles go next to the run artifacts (or into _profiles/ when artifacts are off)
+    profile_dir = None
+    if cfg.get("profile"):
+        profile_dir = folder or os.path.join(cfg["artifacts_path"], "_profiles", f"N {n_users}_{scenario['name']}_s{seed}")
+
+    debtors = sum(1 for b in active_balances.values() if b < -0.001)
+    creditors = sum(1 for b in active_balances.values() if b > 0.001)
+    floor = max(debtors, creditors)
+
+    print(f"\n--- Scenario {scenario['name']} | N={n_users} | seed={seed} | active={len(active_balances)} ---")
+    print(f"{'ALGORITHM':<40} | {'STATUS':<8} | {'TXs':<6} | {'TIME':<8}")
+    stats = []
+    records = []
+    traces, trace_counters = {}, {}
+    # Balances go to every solver worker through one shared memory copy, plans come back through one shared buffer
+    shared = share_balances(active_balances)
+    plan_buffer = SharedArray.create(max(1, len(active_balances)), RECORD)
+    for spec in cfg["solvers"]:
+        name = spec["name"]
+        info = solver_info(spec["class"])
+        # Config max_n wins, otherwise the registry's recommended limit
+        max_n = spec.get("max_n", info.max_n)
+        record = {
+            "scenario": scenario["name"], "n_users": n_users, "n_active": len(active_balances), "seed": seed,
+            "solver": name, "class": spec["class"], "params": spec.get("params", {}), "floor": floor,
+            "replay_of": replay_of,
+        }
+        if max_n is not None and len(active_balances) > max_n:
+            print(f"{name:<40} | {'SKIP':<8} | {'-':<6} | (N > {max_n})")
+            stats.append({"name": name, "count": 0, "time": 0.0})
+            records.append({**record, "status": "skipped"})
+            continue
+        # Backend not installed here (e.g. no gurobipy): report it, don't spawn a worker just to fail the import
+        reason = info.unavailable_reason()
+        if reason is not None:
+            print(f"{name:<40} | {'N/A':<8} | {'-':<6} | {reason}")
+            stats.append({"name": name, "count": 0, "time": 0.0})
+            records.append({**record, "status": "unavailable", "error": reason})
+            continue
+
+        # Solvers can opt out of the traced warmup with a reason ("untraced" in the config, e.g. time limited MILPs),
+        # the reason goes to the Peak Traced column instead of a number
+        warmups = spec.get("warmups", cfg.get("warmups", 1))
+        untraced = spec.get("untraced")
+        if not cfg.get("trace_allocations", True):
+            untraced = "not traced (trace_allocations off)"
+        elif untraced is None and warmups == 0:
+            untraced = "not traced (warmups = 0)"
+        opts = {
+            "warmups": warmups,
+            "repeats": spec.get("repeats", cfg.get("repeats", 1)),
+            "memory_limit_mb": spec.get("memory_limit_mb", cfg.get("memory_limit_mb")),
+            "trace_allocations": not untraced,
+            "trace_phases": cfg.get("trace_phases", False),
+            "instrument": cfg.get("instrument", True),
+            "profile_dir": profile_dir,
+        }
+        res = run_isolated(spec, shared, spec.get("timeout_s", cfg.get("timeout_s", 120)), opts, plan_buffer=plan_buffer)
+        if res["status"] == "ok":
+            dur = median(res["times"])
+            count = len(res["txs"])
+            # Does the plan actually settle the balances? (integer cents, a few ms even at N=1M)
+            check = verify_plan(res["txs"], active_balances)
+            status = "OK" if check["ok"] else "INVALID"
+            traced = f"{res['peak_traced_mb']} MB traced" if res["peak_traced_mb"] is not None else untraced
+            print(f"{name:<40} | {status:<8} | {count:<6} | {dur:.4f}s | {traced}")
+            if not check["ok"]:
+                print(f"{'':<40} | {format_report(check)}")
+            stats.append({"name": name, "count": count, "time": dur, "instrumentation": res["instrumentation"],
+                          "peak_rss_mb": res["peak_rss_delta_mb"], "peak_traced_mb": res["peak_traced_mb"],
+                          "traced_note": untraced})
+            if res["trace_events"]:
+                traces[name] = res["trace_events"]
+                trace_counters[name] = res["instrumentation"]["counters"]
+            if res["txs"] and folder:
+                export_run_artifacts(folder, spec["suffix"], res["txs"], mgr, shared_assets_dir=assets)
+        else:
+            print(f"{name:<40} | {res['status'].upper():<8} | {'-':<6} | {res['error']}")
+            # Failures are logged as 0/0 like main.py so they show up as N/A in the CSV
+            stats.append({"name": name, "count": 0, "time": 0.0})
+            count, dur, check = 0, None, None
+
+        records.append({**record, "status": res["status"], "transactions": count, "time_s": dur,
+                        "times_s": res["times"], "gap": (count - floor) if count else None, "error": res["error"],
+                        "peak_rss_delta_mb": res["peak_rss_delta_mb"], "peak_traced_mb": res["peak_traced_mb"],
+                        "traced_note": untraced, "memory_phases": res["phases"], "instrumentation": res["instrumentation"], "profile": res["profile"],
+                        "verified": check["ok"] if check else None,
+                        "verification": {k: v for k, v in check.items() if k != "ok"} if check else None})
+    shared.release()
+    plan_buffer.release()
+
+    if folder:
+        export_benchmark_stats(folder, stats, active_balances)
+        if traces:
+            export_solver_trace(folder, traces, trace_counters)
+        export_run_metadata(folder, {
+            "num_users": n_users, "num_transactions": n_transactions, "seed": seed, "scenario": scenario["name"],
+            "params": {k: v for k, v in scenario.items() if k != "name"},
+            "solvers": {s["name"]: s.get("params", {}) for s in cfg["solvers"]},
+            "replay_of": replay_of,
+        })
+    with open(records_path, "a") as f:
+        for r in records:
+            r["run_dir"] = folder
+            f.write(json.dumps(r) + "\n")
+    return records
+
+def run_benchmark(cfg):
+    os.makedirs(cfg["artifacts_path"], exist_ok=True)
+    records_path = os.path.join(cfg["artifacts_path"], RECORDS_FILE)
+    all_records = []
+    for scenario in cfg["scenarios"]:
+        for n_users in cfg["n_users"]:
+            for seed in trial_seeds(cfg, scenario["name"], n_users):
+                try:
+                    all_records.extend(run_trial(cfg, scenario, n_users, seed, records_path))
+                except Exception:
+                    traceback.print_exc()
+    print(f"\nDone. {len(all_records)} solver runs recorded in {records_path}")
+    return all_records
+
+def run_replay(cfg, run_dirs):
+    """
+    Re-runs the solvers on the ledgers of past runs (artifact run folders) instead of generating new data.
+    The ledger comes from the run's exported CSVs through utils/ledger_loader.py (binary cache after the first load).
+    """
+    from utils.ledger_loader import load_run
+    os.makedirs(cfg["artifacts_path"], exist_ok=True)
+    records_path = os.path.join(cfg["artifacts_path"], RECORDS_FILE)
+    all_records = []
+    for run_dir in run_dirs:
+        try:
+            start = time.perf_counter()
+            mgr, meta = load_run(run_dir)
+            print(f"\nReplaying {run_dir}: {meta['num_users']} users, {meta['num_transactions']} transactions "
+                  f"(loaded in {time.perf_counter() - start:.3f}s)")
+            scenario = {"name": meta.get("scenario", "Replay"), **meta.get("params", {})}
+            all_records.extend(run_trial(cfg, scenario, meta["num_users"], meta.get("seed"), records_path,
+                                         mgr=mgr, replay_of=meta["source"]))
+        except Exception:
+            traceback.print_exc()
+    print(f"\nDone. {len(all_records)} solver runs recorded in {records_path}")
+    return all_records
+
+def run_batch_benchmark(cfg, n_groups, workers=1, min_size=3, max_size=30, only=None):
+    """
+    Throughput of solvers/batch.solve_many (groups / s) on n_groups random small groups, for every
+    heuristic solver in the config (or just the names in `only`). Exact solvers are skipped, they'd need a
+    time limit per group. Hybrid runs all its iterations per group, so expect it to be orders of magnitude slower.
+    """
+    from solvers.batch import solve_many
+    from utils.data_generator import generate_packed_groups
+    balances, offsets = generate_packed_groups(n_groups, min_size=min_size, max_size=max_size, seed=cfg.get("base_seed"))
+    print(f"\n--- Batch: {n_groups} groups of {min_size}-{max_size} members ({len(balances)} users), workers={workers} ---")
+    print(f"{'ALGORITHM':<40} | {'GROUPS/S':<10} | {'TXs':<8} | {'TIME':<8}")
+    results = []
+    for spec in cfg["solvers"]:
+        if solver_info(spec["class"]).kind == "exact" or (only and spec["name"] not in only):
+            continue
+        res = solve_many(balances, offsets, solver=spec["class"], params=spec.get("params", {}), workers=workers)
+        print(f"{spec['name']:<40} | {res.groups_per_s:<10.0f} | {len(res):<8} | {res.elapsed_s:.4f}s")
+        results.append({"solver": spec["name"], "groups": n_groups, "workers": workers, "groups_per_s": res.groups_per_s,
+                        "transactions": len(res), "star_groups": res.star_groups, "time_s": res.elapsed_s})
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Config driven benchmark runner with isolated solver runs.")
+    parser.add_argument("config", nargs="?", default=DEFAULT_CONFIG, help="Path to the benchmark config JSON")
+    parser.add_argument("--profile", action="store_true", help="Extra cProfile run per solver/N/trial (.prof + .collapsed flame data)")
+    parser.add_argument("--batch", type=int, metavar="GROUPS", help="Measure batch throughput (groups/s) on GROUPS small groups instead")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for --batch (0 = one per core)")
+    parser.add_argument("--solvers", nargs="+", metavar="NAME", help="Only these solvers (config names) for --batch")
+    parser.add_argument("--replay", nargs="+", metavar="RUN_DIR", help="Re-benchmark the ledgers of these past run folders instead of generating data")
+    args = parser.parse_args()
+    cfg = load_config(args.config)
+    if args.profile:
+        cfg["profile"] = True
+    if args.batch:
+        run_batch_benchmark(cfg, args.batch, workers=args.workers or None, only=args.solvers)
+    elif args.replay or cfg.get("replay"):
+        run_replay(cfg, args.replay or cfg["replay"])
+    else:
+        run_benchmark(cfg)
@@ -1,7 +1,7 @@
 import time
 import os
 from models.expense_manager import ExpenseManager
-from solvers import *
+from solvers import create_solver, SolverUnavailableError
 from utils.exporter import create_artifact_folder, export_run_artifacts, export_benchmark_stats, export_original_state
 
 def setup_custom_scenario():
@@ -50,15 +50,21 @@ def main():
         print(f"User {u}: {b:.2f}")
         
     # Solvers
-    contestants = [
-        ("Layered Solver k4", LayeredSolver(k4 = True), "layered_solver_k4"),
-        ("Layered Solver", LayeredSolver(k4 = False), "layered_solver"),
-        ("Max-Max Greedy", SimpleGreedySolver(strategy='max'), "max_max"),
-        ("Min-Min Greedy", SimpleGreedySolver(strategy='min'), "min_min"),
-        ("Hybrid Greedy Monte Carlo", HybridSolver(iterations=1000, greedy_probability=0.98), "hybrid_best"),
-        ("Exact MILP Gurobi", MilpSolverGurobi(time_limit=30), "exact_milp_gurobi"),
-        # ("Exact MILP", MilpSolver(time_limit=30), "exact_milp"),
+    solver_specs = [
+        ("Layered Solver k4", "LayeredSolver", {"k4": True}, "layered_solver_k4"),
+        ("Layered Solver", "LayeredSolver", {"k4": False}, "layered_solver"),
+        ("Max-Max Greedy", "SimpleGreedySolver", {"strategy": "max"}, "max_max"),
+        ("Min-Min Greedy", "SimpleGreedySolver", {"strategy": "min"}, "min_min"),
+        ("Hybrid Greedy Monte Carlo", "HybridSolver", {"iterations": 1000, "greedy_probability": 0.98}, "hybrid_best"),
+        ("Exact MILP Gurobi", "MilpSolverGurobi", {"time_limit": 30}, "exact_milp_gurobi"),
+        # ("Exact MILP", "MilpSolver", {"time_limit": 30}, "exact_milp"),
     ]
+    contestants = []
+    for name, cls, params, suffix in solver_specs:
+        try:
+            contestants.append((name, create_solver(cls, **params), suffix))
+        except SolverUnavailableError as e:
+            print(f"Skipping {name}: {e}")
     
     theo_best = 4
 
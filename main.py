@@ -1,28 +1,81 @@
 import time
 import os
+import sys
+import random
+import multiprocessing as mp
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from models.expense_manager import ExpenseManager
 from utils.data_generator import generate_connected_data
-from utils.exporter import create_artifact_folder, export_run_artifacts, export_benchmark_stats, export_original_state
-from solvers import *
+from utils.exporter import create_artifact_folder, export_run_artifacts, export_benchmark_stats, export_original_state, export_run_metadata, export_solver_trace, export_trial_summary
+from utils.capacity import load_capacity_table, max_recommended_n
+from utils.memory_tracker import measure_solver
+from utils.verifier import verify_plan, format_report
+from solvers import create_solver, solver_info, SolverUnavailableError
+from solvers.instrumentation import tqdm_progress
+from solvers.small_exact import save_engine
 import traceback
 from tqdm import tqdm
 import time
 
 # DO NOT GENERATE DECIMALS WITH N USERS >= 100,000 AND MAX AMOUNT = 500 (LAPTOP CRASHED !!!!!!!)
 
-def main():
+# Trials run in a process pool when trials > 1 (each trial = data generation + every solver + exports)
+# None = one worker per core
+TRIAL_WORKERS = None
+# Max trials running the same solver at once, across all workers (MILP solvers are multi threaded / memory hungry)
+SOLVER_CONCURRENCY = {"Exact MILP Gurobi": 1, "Exact MILP": 1}
+# None = fresh random seeds, otherwise the trial seeds are derived from it (same base seed = same set of trials)
+TRIAL_BASE_SEED = None
+
+# Set in each trial worker by _init_trial_worker: solver name -> semaphore shared by all workers
+_SOLVER_SLOTS = {}
+
+def _solver_slot(name):
+    slot = _SOLVER_SLOTS.get(name)
+    return slot if slot is not None else nullcontext()
+
+def main(seed=None, verbose=True):
+    """
+    One trial: generates the data, runs every solver and exports the artifacts.
+    seed overrides SEED below (used by run_trials). Returns a small picklable summary for the trials CSV.
+    """
     N_USERS = 10000
     N_TRANSACTIONS = 2 * N_USERS
     EXPORT_FLAG = True
+    # Data generator params (also recorded in run_meta.json for the results store)
+    MIN_AMT, MAX_AMT, ACTIVE_THRESHOLD, IS_INT = 1, 500, 1, True
+    # None = draw a fresh seed, the seed used is recorded so the run can be reproduced
+    SEED = None
+    # Skip solvers whose recommended max N (capacity_table.json from analysis.py) is below the active N
+    # Off by default since benchmarking past the limits is how the table gets built in the first place
+    USE_CAPACITY_TABLE = False
+    # Write graphs as small stubs + content hashed node/edge sidecars shared by all runs (False = self contained PyVis pages)
+    # Graphs past LARGE_GRAPH_THRESHOLD users get the clustered Level-of-Detail page either way
+    SHARED_GRAPH_ASSETS = True
+    # Warmup run per solver under tracemalloc for the Peak Traced (MB) column (the timed run never has tracemalloc on)
+    # UNTRACED: solvers that skip it (name -> reason, written to the Peak Traced column instead of a number). The warmup
+    # is one more full solve, for a time limited MILP that's another time_limit seconds under tracemalloc
+    # TRACE_PHASES adds the top allocation sites per phase to run_meta.json (slow, snapshots the heap)
+    TRACE_ALLOCATIONS = True
+    UNTRACED = {"Exact MILP Gurobi": "not traced (time limited exact solver)",
+                "Exact MILP": "not traced (time limited exact solver)"}
+    TRACE_PHASES = False
+    # Phase timings / counters per solver (Phases / Counters columns + solver_trace.json for chrome://tracing)
+    INSTRUMENT_SOLVERS = True
 
     # Use raw string r"" for Windows paths
     ARTIFACTS_PATH = r"D:\CMU\Mini 2\Financial Computing\fc2-final-project-Anmaya1856\artifacts\N " + str(N_USERS) + "_Int"
     # ARTIFACTS_PATH = r"D:\CMU\Mini 2\Financial Computing\fc2-final-project-Anmaya1856\artifacts"
+    ASSETS_PATH = os.path.join(os.path.dirname(ARTIFACTS_PATH), "_graph_assets") if SHARED_GRAPH_ASSETS else None
     
     # Setup Data
-    print(f"--- Initializing {N_USERS} Users ---")
+    if seed is None:
+        seed = SEED if SEED is not None else random.randrange(2**32)
+    random.seed(seed)
+    print(f"--- Initializing {N_USERS} Users (seed={seed}) ---")
     mgr = ExpenseManager(N_USERS)
-    generate_connected_data(mgr, N_TRANSACTIONS, min_amt=1, max_amt=500, active_threshold=1, isInt=True)
+    generate_connected_data(mgr, N_TRANSACTIONS, min_amt=MIN_AMT, max_amt=MAX_AMT, active_threshold=ACTIVE_THRESHOLD, isInt=IS_INT)
     mgr.validate_integrity()
     active_balances = mgr.get_active_balances()
     
@@ -30,23 +83,37 @@ def main():
 
     if EXPORT_FLAG:
         # Prepare Output & Export Original Data
-        folder = create_artifact_folder(ARTIFACTS_PATH)
+        # Seed in the folder name, parallel trials finishing in the same second would otherwise share a folder
+        folder = create_artifact_folder(ARTIFACTS_PATH, tag=f"s{seed}")
         print(f"\n--- Saving Artifacts to: {folder} ---")
         # EXPORT ORIGINAL STATE HERE
-        export_original_state(folder, mgr, N_USERS, N_TRANSACTIONS)
+        export_original_state(folder, mgr, N_USERS, N_TRANSACTIONS, shared_assets_dir=ASSETS_PATH)
     
-    # Define Solvers
-    contestants = [
-        ("Layered Solver k4", LayeredSolver(k4 = True), "layered_solver_k4"),
-        ("Layered Solver", LayeredSolver(k4 = False), "layered_solver"),
-        ("Max-Max Greedy", SimpleGreedySolver(strategy='max'), "max_max"),
-        ("Min-Min Greedy", SimpleGreedySolver(strategy='min'), "min_min"),
-        ("Hybrid Greedy Monte Carlo", HybridSolver(iterations=1000, greedy_probability=0.98), "hybrid_best"),
-        ("Exact MILP Gurobi", MilpSolverGurobi(time_limit=30), "exact_milp_gurobi"),
-        # ("Exact MILP", MilpSolver(time_limit=30), "exact_milp"),
+    # Define Solvers (name, registry class, params, suffix), see solvers/registry.py
+    solver_specs = [
+        ("Layered Solver k4", "LayeredSolver", {"k4": True}, "layered_solver_k4"),
+        ("Layered Solver", "LayeredSolver", {"k4": False}, "layered_solver"),
+        ("Max-Max Greedy", "SimpleGreedySolver", {"strategy": "max"}, "max_max"),
+        ("Min-Min Greedy", "SimpleGreedySolver", {"strategy": "min"}, "min_min"),
+        ("Hybrid Greedy Monte Carlo", "HybridSolver", {"iterations": 1000, "greedy_probability": 0.98}, "hybrid_best"),
+        ("Exact MILP Gurobi", "MilpSolverGurobi", {"time_limit": 30}, "exact_milp_gurobi"),
+        # ("Exact MILP", "MilpSolver", {"time_limit": 30}, "exact_milp"),
     ]
+    # Backends that aren't installed here (no gurobipy / pulp) are reported and skipped instead of crashing the import
+    contestants, unavailable, registry_max_n = [], {}, {}
+    for name, cls, params, suffix in solver_specs:
+        registry_max_n[name] = solver_info(cls).max_n
+        try:
+            contestants.append((name, create_solver(cls, **params), suffix))
+        except SolverUnavailableError as e:
+            unavailable[name] = str(e)
     
     stats = []
+    memory_phases = {}
+    verification = {}
+    traces, trace_counters = {}, {}
+    capacity = load_capacity_table() if USE_CAPACITY_TABLE else {}
+    scenario = "Int" if IS_INT else "Dec"
 
     debtors = [userId for userId, bal in active_balances.items() if bal < 0]
     creditors = [userId for userId, bal in active_balances.items() if bal > 0]
@@ -57,30 +124,51 @@ def main():
     print("-" * 60)
     print(f"{'Theoretical Worst Case':<60} | {theo_worst:<6} | -")
     print(f"{'Theoretical Best Case (under Optimal Conditions)':<60} | {theo_best:<6} | -")
+    for name, reason in unavailable.items():
+        print(f"{name:<60} | {'N/A':<6} | {reason}")
 
     for name, solver, suffix in contestants:
         try:
-            # Skip MILP if N is too large
-            if ((name == "Exact MILP") and len(active_balances) > 400) or ((name == "Exact MILP Gurobi") and len(active_balances) > 500):
-                print(f"{name:<60} | {'SKIP':<6} | {'0.0000'}s (N > {400 if name == 'Exact MILP' else 500})")
+            # Skip solvers past their recommended N from the capacity table
+            max_n = max_recommended_n(capacity, name, scenario)
+            if max_n is not None and len(active_balances) > max_n:
+                print(f"{name:<60} | {'SKIP':<6} | {'0.0000'}s (N > {max_n}, capacity table)")
                 stats.append({"name": name, "count": 0, "time": 0.0})
                 continue
-            if ((name == "Hybrid Greedy Monte Carlo") and len(active_balances) >= 10000):
-                print(f"{name:<60} | {'SKIP':<6} | {'0.0000'}s (N >= 10000)")
+            # Skip MILP / Hybrid if N is too large (registry max N)
+            limit = registry_max_n[name]
+            if limit is not None and len(active_balances) > limit:
+                print(f"{name:<60} | {'SKIP':<6} | {'0.0000'}s (N > {limit})")
                 stats.append({"name": name, "count": 0, "time": 0.0})
                 continue
 
-            # Start Time
-            start = time.time()
-            txs = solver.solve(active_balances)
-            dur = time.time() - start
+            # Traced warmup for the allocation peak (unless the solver is UNTRACED), then the timed run (+ RSS high water mark)
+            untraced = UNTRACED.get(name) if TRACE_ALLOCATIONS else "not traced (TRACE_ALLOCATIONS off)"
+            with _solver_slot(name):
+                res = measure_solver(solver, active_balances, warmups=0 if untraced else 1,
+                                     trace_allocations=not untraced, trace_phases=TRACE_PHASES,
+                                     instrument=INSTRUMENT_SOLVERS, progress=tqdm_progress(name) if verbose else None)
+            txs = res["txs"]
+            dur = res["times"][0]
             
             count = len(txs)
-            stats.append({"name": name, "count": count, "time": dur})
-            print(f"{name:<60} | {count:<6} | {dur:.4f}s")
+            stats.append({"name": name, "count": count, "time": dur, "instrumentation": res["instrumentation"],
+                          "peak_rss_mb": res["peak_rss_delta_mb"], "peak_traced_mb": res["peak_traced_mb"],
+                          "traced_note": untraced})
+            memory_phases[name] = res["phases"]
+            # Check the plan really settles active_balances (integer cents, cheap even at N=1M)
+            check = verify_plan(txs, active_balances)
+            verification[name] = format_report(check)
+            if res["trace_events"]:
+                traces[name] = res["trace_events"]
+                trace_counters[name] = res["instrumentation"]["counters"]
+            traced = f"{res['peak_traced_mb']} MB traced" if res["peak_traced_mb"] is not None else untraced
+            print(f"{name:<60} | {count:<6} | {dur:.4f}s | {traced}")
+            if not check["ok"]:
+                print(f"{'':<60} | {verification[name]}")
             
             if txs and EXPORT_FLAG:
-                export_run_artifacts(folder, suffix, txs, mgr)
+                export_run_artifacts(folder, suffix, txs, mgr, shared_assets_dir=ASSETS_PATH)
                 
         except Exception as e:
             traceback.print_exc() 
@@ -90,14 +178,73 @@ def main():
 
     if EXPORT_FLAG:
         export_benchmark_stats(folder, stats, active_balances)
+        if traces:
+            export_solver_trace(folder, traces, trace_counters)
+        export_run_metadata(folder, {
+            "num_users": N_USERS,
+            "num_transactions": N_TRANSACTIONS,
+            "seed": seed,
+            "scenario": scenario,
+            "params": {"min_amt": MIN_AMT, "max_amt": MAX_AMT, "active_threshold": ACTIVE_THRESHOLD, "isInt": IS_INT},
+            "solvers": {name: vars(solver) for name, solver, _ in contestants},
+            "memory_phases": memory_phases,
+            "verification": verification,
+        })
+    # Groups solved exactly through exact_threshold go into the on disk table for the next run (solvers/small_exact.py)
+    save_engine()
     print("-" * 40)
     print("Done. Check the artifacts folder.")
 
     if N_USERS <= 10:
         time.sleep(0.8)
 
+    return {"seed": seed, "n_active": len(active_balances), "folder": folder if EXPORT_FLAG else None,
+            "artifacts_root": ARTIFACTS_PATH if EXPORT_FLAG else None,
+            "stats": [{k: s.get(k) for k in ("name", "count", "time", "peak_traced_mb")} for s in stats]}
+
+def _init_trial_worker(slots):
+    global _SOLVER_SLOTS
+    _SOLVER_SLOTS = slots
+    # Every trial prints its own table, interleaved output from N workers is unreadable
+    sys.stdout = open(os.devnull, "w")
+
+def _trial_seeds(trials, base_seed=None):
+    rng = random.Random(base_seed) if base_seed is not None else random.SystemRandom()
+    return [rng.randrange(2**32) for _ in range(trials)]
+
+def run_trials(trials, workers=None, solver_concurrency=None, base_seed=None):
+    """
+    Runs main() for `trials` independent seeds across a process pool.
+    Seeds are drawn up front and results are kept in trial order, so the same base seed gives the same
+    summary no matter which worker finishes first.
+    """
+    seeds = _trial_seeds(trials, base_seed)
+    results = [None] * trials
+    workers = min(workers or os.cpu_count() or 1, trials)
+
+    if workers <= 1:
+        for i, seed in enumerate(tqdm(seeds)):
+            results[i] = main(seed=seed)
+    else:
+        ctx = mp.get_context("spawn")
+        slots = {name: ctx.BoundedSemaphore(limit) for name, limit in (solver_concurrency or {}).items()}
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_trial_worker, initargs=(slots,)) as pool:
+            futures = {pool.submit(main, seed, False): i for i, seed in enumerate(seeds)}
+            for fut in tqdm(as_completed(futures), total=trials):
+                i = futures[fut]
+                try:
+                    results[i] = fut.result()
+                except Exception:
+                    print(f"Trial {i} (seed={seeds[i]}) failed:")
+                    traceback.print_exc()
+
+    done = [r for r in results if r is not None]
+    root = next((r["artifacts_root"] for r in done if r["artifacts_root"]), None)
+    if root and len(done) > 1:
+        print(f"Trial summary: {export_trial_summary(root, done)}")
+    return results
+
 if __name__ == "__main__":
     # trials = 100
     trials = 1
-    for _ in tqdm(range(trials)):
-        main()
\ No newline at end of file
+    run_trials(trials, workers=TRIAL_WORKERS, solver_concurrency=SOLVER_CONCURRENCY, base_seed=TRIAL_BASE_SEED)
\ No newline at end of file
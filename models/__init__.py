@@ -1,2 +1,13 @@
 from .transaction import Transaction
-from .expense_manager import ExpenseManager
\ No newline at end of file
+from .expense_manager import ExpenseManager
+from .plan_view import PlanView
+from .settlement_plan import SettlementPlan, as_plan
+
+# Imported on first use, so the solvers (which import models for SettlementPlan) don't load sqlite3 / numpy
+_LAZY = {"SqliteLedger": ".sqlite_ledger", "TransactionLog": ".snapshot"}
+
+def __getattr__(name):
+    if name in _LAZY:
+        import importlib
+        return getattr(importlib.import_module(_LAZY[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -1,4 +1,5 @@
-from typing import List, Dict
+import os
+from typing import List, Dict, Iterator, Tuple
 from .transaction import Transaction
 
 class ExpenseManager:
@@ -10,6 +11,64 @@ class ExpenseManager:
         self.num_users = num_users
         self.net_balances: List[float] = [0.0] * num_users
         self.transactions: List[Transaction] = []
+        # (snapshot path, transactions it holds) of the last snapshot() / restore(), for incremental checkpoints
+        self._checkpoint = None
+
+    @classmethod
+    def from_arrays(cls, payers, payees, amounts, num_users: int = None, keep_transactions: bool = True):
+        """
+        Bulk version of calling add_transaction for every row (e.g. a ledger reloaded by utils/ledger_loader.py).
+        Balances are summed in integer cents with np.bincount instead of one rounded float update per row,
+        which gives the same 2 decimal balances. Transactions are kept packed in a TransactionLog (Transaction objects
+        only built on access), keep_transactions=False drops them (enough for solving, export_original_state /
+        the graphs need them).
+        """
+        import numpy as np
+        from .snapshot import TransactionLog, RECORD
+        payers = np.asarray(payers, dtype=np.int64)
+        payees = np.asarray(payees, dtype=np.int64)
+        cents = np.rint(np.asarray(amounts, dtype=np.float64) * 100).astype(np.int64)
+        # Same rule as add_transaction: self payments are dropped
+        keep = payers != payees
+        payers, payees, cents = payers[keep], payees[keep], cents[keep]
+        if num_users is None:
+            num_users = int(max(payers.max(initial=-1), payees.max(initial=-1))) + 1
+
+        mgr = cls(num_users)
+        # Payer gets credit (+), Payee gets debt (-)
+        balance = np.bincount(payers, weights=cents, minlength=num_users) - np.bincount(payees, weights=cents, minlength=num_users)
+        mgr.net_balances = (np.rint(balance) / 100).tolist()
+        if keep_transactions:
+            records = np.empty(len(cents), dtype=RECORD)
+            records["payer"], records["payee"], records["cents"] = payers, payees, cents
+            mgr.transactions = TransactionLog(records)
+        return mgr
+
+    def snapshot(self, path: str, incremental: bool = True) -> int:
+        """
+        Binary checkpoint of the ledger (format in models/snapshot.py), ~16 bytes per transaction.
+        incremental: if the last snapshot / restore of this manager was the same file, only the transactions added
+        since then are appended. Returns the number of transactions written.
+        """
+        from .snapshot import write_snapshot
+        return write_snapshot(self, path, incremental)
+
+    @classmethod
+    def restore(cls, path: str):
+        """
+        Manager from a snapshot(). The transactions stay memory mapped (TransactionLog), balances are recomputed
+        from them in cents, so restoring 10M transactions takes a second or two, not a replay of add_transaction.
+        """
+        import numpy as np
+        from .snapshot import TransactionLog, read_snapshot
+        num_users, records = read_snapshot(path)
+        mgr = cls(num_users)
+        payers, payees, cents = records["payer"], records["payee"], records["cents"]
+        balance = np.bincount(payers, weights=cents, minlength=num_users) - np.bincount(payees, weights=cents, minlength=num_users)
+        mgr.net_balances = (np.rint(balance) / 100).tolist()
+        mgr.transactions = TransactionLog(records)
+        mgr._checkpoint = (os.path.abspath(path), len(records))
+        return mgr
 
     def add_transaction(self, payer_id: int, payee_id: int, amount: float):
         # Can't have a transaction where payer and payee are the same (Doesn't make sense)
@@ -28,6 +87,14 @@ class ExpenseManager:
         self.net_balances[payer_id] = round(self.net_balances[payer_id] + curr_amount, 2)
         self.net_balances[payee_id] = round(self.net_balances[payee_id] - curr_amount, 2)
 
+    def iter_edges(self) -> Iterator[Tuple[int, int, float]]:
+        """
+        Yields (payer, payee, amount) for every recorded transaction.
+        Same interface as PlanView so the visualizer can render either one.
+        """
+        for t in self.transactions:
+            yield t.payer_id, t.payee_id, t.amount
+
     def get_active_balances(self) -> Dict[int, float]:
         """
         Returns dictionary of {user_id: balance} for users with non-zero balance.
@@ -0,0 +1,26 @@
+from typing import Iterable, Iterator, Sequence, Tuple
+
+class PlanView:
+    """
+    Lightweight read-only view of a settlement plan on top of an existing graph.
+
+    Holds the node balances BY REFERENCE (no copy) plus the solver's SettlementPlan (or old style tuple list),
+    so the exporter/visualizer can render a plan without building a throwaway ExpenseManager
+    and a Transaction object per edge. Memory per plan is O(plan) instead of O(N + plan).
+    """
+    __slots__ = ("num_users", "net_balances", "plan")
+
+    def __init__(self, net_balances: Sequence[float], plan: Iterable[Tuple[int, int, float]]):
+        self.num_users = len(net_balances)
+        self.net_balances = net_balances
+        self.plan = plan
+
+    def iter_edges(self) -> Iterator[Tuple[int, int, float]]:
+        """
+        Yields (payer, payee, amount) for every transaction in the plan.
+        """
+        for payer, payee, amt in self.plan:
+            yield payer, payee, amt
+
+    def __len__(self):
+        return len(self.plan)
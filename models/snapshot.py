@@ -0,0 +1,165 @@
+import os
+import numpy as np
+from .transaction import Transaction
+
+# Binary checkpoints of an ExpenseManager (ExpenseManager.snapshot / ExpenseManager.restore).
+#
+# File layout (little endian):
+#   header  (32 bytes): magic, version, num_users, count = number of committed transaction records
+#   records (16 bytes each): payer int32, payee int32, cents int64, in transaction order
+#
+# Balances aren't stored, restore recomputes them from the records with np.bincount (exact, in cents), so there's
+# nothing that could disagree with the transactions after a crash.
+#
+# Incremental snapshots append the transactions added since the last checkpoint of the same file, then rewrite the
+# header count. The header is the commit point: a crash mid append leaves the old count, restore ignores the partial
+# tail and the next checkpoint overwrites it.
+
+MAGIC = b"EMSNAP\x00\x00"
+VERSION = 1
+HEADER = np.dtype([("magic", "S8"), ("version", "<u4"), ("reserved", "<u4"), ("num_users", "<u8"), ("count", "<u8")])
+RECORD = np.dtype([("payer", "<i4"), ("payee", "<i4"), ("cents", "<i8")])
+# Rows turned into Transaction objects at a time when iterating a TransactionLog
+ITER_CHUNK = 65536
+
+class TransactionLog:
+    """
+    List of Transaction lookalike over packed records (a restored snapshot's memmap, or arrays from
+    ExpenseManager.from_arrays), so a restored 10M transaction ledger doesn't build 10M objects up front.
+    Transaction objects are created on access / iteration, add_transaction's appends go to a plain list tail.
+    """
+    __slots__ = ("records", "tail")
+
+    def __init__(self, records, tail=None):
+        self.records = records
+        self.tail = tail if tail is not None else []
+
+    def __len__(self):
+        return len(self.records) + len(self.tail)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def _row(self, i):
+        r = self.records[i]
+        return Transaction(int(r["payer"]), int(r["payee"]), int(r["cents"]) / 100)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("transaction index out of range")
+        return self._row(i) if i < len(self.records) else self.tail[i - len(self.records)]
+
+    def __iter__(self):
+        for start in range(0, len(self.records), ITER_CHUNK):
+            chunk = self.records[start:start + ITER_CHUNK]
+            for p, q, c in zip(chunk["payer"].tolist(), chunk["payee"].tolist(), chunk["cents"].tolist()):
+                yield Transaction(p, q, c / 100)
+        yield from self.tail
+
+    def append(self, t: Transaction):
+        self.tail.append(t)
+
+    def __repr__(self):
+        return f"TransactionLog({len(self.records)} packed + {len(self.tail)} appended)"
+
+def transaction_records(transactions, start=0):
+    """Records (RECORD dtype) of transactions[start:], for a TransactionLog or a plain list of Transaction."""
+    if isinstance(transactions, TransactionLog):
+        packed_count = len(transactions.records)
+        tail = transactions.tail[max(0, start - packed_count):]
+        if start >= packed_count:
+            # Only the tail, not even an empty slice of records (a memmap slice keeps the map open through .base)
+            return transaction_records(tail)
+        packed = np.asarray(transactions.records[start:], dtype=RECORD)
+        return np.concatenate([packed, transaction_records(tail)]) if tail else packed
+    rows = transactions[start:] if start else transactions
+    out = np.empty(len(rows), dtype=RECORD)
+    out["payer"] = np.fromiter((t.payer_id for t in rows), dtype=np.int32, count=len(rows))
+    out["payee"] = np.fromiter((t.payee_id for t in rows), dtype=np.int32, count=len(rows))
+    out["cents"] = np.rint(np.fromiter((t.amount for t in rows), dtype=np.float64, count=len(rows)) * 100)
+    return out
+
+def _read_header(path):
+    header = np.fromfile(path, dtype=HEADER, count=1)
+    if not len(header) or header["magic"][0] != MAGIC.rstrip(b"\x00") or header["version"][0] != VERSION:
+        raise ValueError(f"{path} is not an ExpenseManager snapshot (version {VERSION})")
+    return int(header["num_users"][0]), int(header["count"][0])
+
+def _header_bytes(num_users, count):
+    return np.array([(MAGIC, VERSION, 0, num_users, count)], dtype=HEADER).tobytes()
+
+def _maps(records, path):
+    """True if records is a memmap of the file at path (a restored TransactionLog)."""
+    filename = getattr(records, "filename", None)
+    return filename is not None and os.path.exists(filename) and os.path.samefile(filename, path)
+
+def write_snapshot(manager, path, incremental=True):
+    """
+    Checkpoints manager to path. Incremental = only append what was added since manager's last checkpoint of this
+    file (falls back to a full write when there's no such checkpoint or the file changed underneath).
+    Returns the number of transaction records written.
+    """
+    path = os.path.abspath(path)
+    last = getattr(manager, "_checkpoint", None)
+    log = manager.transactions
+    total = len(log)
+    start = 0
+    if incremental and last and last[0] == path and last[1] <= total and os.path.exists(path):
+        try:
+            if _read_header(path) == (manager.num_users, last[1]):
+                start = last[1]
+        except ValueError:
+            pass
+    # A manager restored from this file still has it memory mapped. Windows refuses to truncate / replace a mapped
+    # file, so drop the map for the write (same as SmallExactEngine.save()) and map the result again afterwards.
+    mapped = isinstance(log, TransactionLog) and _maps(log.records, path)
+    # Packed before touching the file, a full write may read them out of the map dropped below
+    records = transaction_records(log, start)
+    if mapped:
+        # Owned copy, any view of the memmap (even an empty one) would keep the file mapped through its .base
+        records = np.array(records, copy=True)
+        kept = len(log.records)
+        log.records = np.zeros(0, dtype=RECORD)
+    try:
+        if start:
+            with open(path, "r+b") as f:
+                f.seek(HEADER.itemsize + start * RECORD.itemsize)
+                f.write(records.tobytes())
+                f.truncate()
+                f.flush()
+                os.fsync(f.fileno())
+                # Commit: only now does the header count include the new records
+                f.seek(0)
+                f.write(_header_bytes(manager.num_users, total))
+                f.flush()
+                os.fsync(f.fileno())
+        else:
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(_header_bytes(manager.num_users, len(records)))
+                f.write(records.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+    finally:
+        if mapped:
+            _, committed = read_snapshot(path)
+            if len(committed) == total:
+                # Everything is in the file now, appended transactions included
+                log.records, log.tail = committed, []
+            else:
+                # The write failed before its commit, the file still holds what was mapped before
+                log.records = committed[:kept]
+    manager._checkpoint = (path, total)
+    return len(records)
+
+def read_snapshot(path):
+    """(num_users, records memmap) of a snapshot, only the committed records."""
+    num_users, count = _read_header(path)
+    if count == 0:
+        return num_users, np.zeros(0, dtype=RECORD)
+    return num_users, np.memmap(path, dtype=RECORD, mode="r", offset=HEADER.itemsize, shape=(count,))
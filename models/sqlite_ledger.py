@@ -0,0 +1,204 @@
+import sqlite3
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+# Persistent ledger (SQLite), optional alternative to the in-memory ExpenseManager.
+#
+#   transactions: every ingested transaction, amounts in integer cents, indexed by payer and payee for history queries
+#   balances:     one row per user with a non zero history, kept up to date on every flush.
+#                 Indexed on (sign, amount) so "debtors owing more than X" or "creditors sorted by amount" are index
+#                 range scans instead of a scan of all users.
+#
+# Writes are buffered and flushed in batches (one transaction per batch, WAL journal, synchronous=NORMAL), and the
+# balance table gets one upsert per user touched in the batch (deltas summed in python first), not two per row.
+# Sign is -1 for debtors, 1 for creditors (same convention as net_balances: payer +, payee -).
+
+# Bigger batches mean fewer balance upserts (a user touched 10 times in a batch is still one upsert):
+# 50k rows -> ~70k tx/s, 200k -> ~100k tx/s on 100k users
+BATCH_SIZE = 200000
+# Page cache (KiB): random payer / payee index inserts thrash the default 2 MB cache (~2x slower ingestion)
+CACHE_KB = 65536
+# Rows fetched per round trip by the streaming iterators
+FETCH_SIZE = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    tx_id INTEGER PRIMARY KEY,
+    payer INTEGER NOT NULL,
+    payee INTEGER NOT NULL,
+    cents INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS balances (
+    user INTEGER PRIMARY KEY,
+    cents INTEGER NOT NULL,
+    sign INTEGER NOT NULL,
+    amount INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tx_payer ON transactions(payer);
+CREATE INDEX IF NOT EXISTS idx_tx_payee ON transactions(payee);
+CREATE INDEX IF NOT EXISTS idx_balances_sign_amount ON balances(sign, amount);
+"""
+
+# sign / amount (= abs(cents)) are stored next to cents so the index can serve both the filter and the order
+_UPSERT = """
+INSERT INTO balances (user, cents, sign, amount) VALUES (?1, ?2, (?2 > 0) - (?2 < 0), abs(?2))
+ON CONFLICT(user) DO UPDATE SET
+    cents = cents + excluded.cents,
+    sign = (cents + excluded.cents > 0) - (cents + excluded.cents < 0),
+    amount = abs(cents + excluded.cents)
+"""
+
+class SqliteLedger:
+    """
+    SQLite backed ledger with the ExpenseManager write interface (add_transaction / get_active_balances /
+    validate_integrity) plus indexed queries:
+        debtors(min_amount) / creditors(min_amount): streaming (user, balance), largest amount first
+        iter_active_balances(): every non zero balance, streaming
+        history(user): a user's transactions in ingestion order
+    Use as a context manager (or call close()) so the last batch gets flushed.
+    """
+    def __init__(self, db_path: str, batch_size: int = BATCH_SIZE):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute("PRAGMA temp_store = MEMORY")
+        self.conn.execute(f"PRAGMA cache_size = -{CACHE_KB}")
+        self.conn.executescript(_SCHEMA)
+        self._pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.conn is not None:
+            self.flush()
+            self.conn.close()
+            self.conn = None
+
+    # ---------- Ingestion ----------
+
+    def add_transaction(self, payer_id: int, payee_id: int, amount: float):
+        # Same rules as ExpenseManager.add_transaction: no self payments, amounts rounded to cents
+        if payer_id == payee_id:
+            return
+        self._pending.append((payer_id, payee_id, round(amount * 100)))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def add_transactions(self, transactions: Iterable[Tuple[int, int, float]]):
+        """Bulk add_transaction for (payer, payee, amount) rows (e.g. manager.iter_edges())."""
+        self._pending.extend((payer, payee, round(amount * 100)) for payer, payee, amount in transactions if payer != payee)
+        while len(self._pending) >= self.batch_size:
+            rest = self._pending[self.batch_size:]
+            del self._pending[self.batch_size:]
+            self.flush()
+            self._pending = rest
+
+    def flush(self):
+        """Writes the buffered transactions and their balance deltas in one SQLite transaction."""
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        deltas = {}
+        for payer, payee, cents in rows:
+            deltas[payer] = deltas.get(payer, 0) + cents
+            deltas[payee] = deltas.get(payee, 0) - cents
+        with self.conn:
+            self.conn.executemany("INSERT INTO transactions (payer, payee, cents) VALUES (?, ?, ?)", rows)
+            # In user order, so the upserts walk the balances b-tree instead of jumping around it
+            self.conn.executemany(_UPSERT, sorted(item for item in deltas.items() if item[1]))
+
+    @classmethod
+    def from_manager(cls, db_path: str, manager, batch_size: int = BATCH_SIZE):
+        """Ledger at db_path filled with every transaction of an ExpenseManager."""
+        ledger = cls(db_path, batch_size)
+        ledger.add_transactions(manager.iter_edges())
+        ledger.flush()
+        return ledger
+
+    # ---------- Queries ----------
+
+    def _stream(self, query, args=()) -> Iterator[tuple]:
+        self.flush()
+        cur = self.conn.execute(query, args)
+        while True:
+            rows = cur.fetchmany(FETCH_SIZE)
+            if not rows:
+                return
+            yield from rows
+
+    def balance(self, user: int) -> float:
+        self.flush()
+        row = self.conn.execute("SELECT cents FROM balances WHERE user = ?", (user,)).fetchone()
+        return row[0] / 100 if row else 0.0
+
+    def _side(self, sign, min_amount, ascending):
+        order = "ASC" if ascending else "DESC"
+        for user, cents in self._stream(f"SELECT user, cents FROM balances WHERE sign = ? AND amount >= ? ORDER BY amount {order}",
+                                        (sign, max(1, round(min_amount * 100)))):
+            yield user, cents / 100
+
+    def debtors(self, min_amount: float = 0.0, ascending: bool = False) -> Iterator[Tuple[int, float]]:
+        """(user, balance) of users owing at least min_amount, largest debt first (ascending=True: smallest first)."""
+        return self._side(-1, min_amount, ascending)
+
+    def creditors(self, min_amount: float = 0.0, ascending: bool = False) -> Iterator[Tuple[int, float]]:
+        """(user, balance) of users owed at least min_amount, largest credit first (ascending=True: smallest first)."""
+        return self._side(1, min_amount, ascending)
+
+    def iter_active_balances(self) -> Iterator[Tuple[int, float]]:
+        """(user, balance) for every non zero balance, debtors then creditors, each by amount (largest first)."""
+        yield from self.debtors()
+        yield from self.creditors()
+
+    def get_active_balances(self) -> Dict[int, float]:
+        """Same dict as ExpenseManager.get_active_balances(), for handing the ledger to a solver."""
+        return dict(self.iter_active_balances())
+
+    def history(self, user: int, limit: Optional[int] = None) -> Iterator[Tuple[int, int, int, float]]:
+        """(tx_id, payer, payee, amount) of every transaction the user paid or received, oldest first."""
+        query = ("SELECT tx_id, payer, payee, cents FROM transactions WHERE payer = ?1 "
+                 "UNION ALL SELECT tx_id, payer, payee, cents FROM transactions WHERE payee = ?1 ORDER BY tx_id")
+        args = [user]
+        if limit is not None:
+            query += " LIMIT ?2"
+            args.append(limit)
+        for tx_id, payer, payee, cents in self._stream(query, args):
+            yield tx_id, payer, payee, cents / 100
+
+    def iter_edges(self) -> Iterator[Tuple[int, int, float]]:
+        """(payer, payee, amount) of every transaction in ingestion order (same interface as ExpenseManager)."""
+        for payer, payee, cents in self._stream("SELECT payer, payee, cents FROM transactions ORDER BY tx_id"):
+            yield payer, payee, cents / 100
+
+    def transaction_count(self) -> int:
+        self.flush()
+        return self.conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+    def num_users(self) -> int:
+        """Highest user id seen + 1 (users with only self payments / no history don't exist for the ledger)."""
+        self.flush()
+        row = self.conn.execute("SELECT MAX(user) FROM balances").fetchone()
+        return row[0] + 1 if row[0] is not None else 0
+
+    def to_manager(self, num_users: Optional[int] = None, keep_transactions: bool = True):
+        """Loads the ledger back into an in-memory ExpenseManager."""
+        import numpy as np
+        from .expense_manager import ExpenseManager
+        rows = np.array(list(self._stream("SELECT payer, payee, cents FROM transactions ORDER BY tx_id")),
+                        dtype=np.int64).reshape(-1, 3)
+        return ExpenseManager.from_arrays(rows[:, 0], rows[:, 1], rows[:, 2] / 100,
+                                          num_users=num_users or self.num_users(), keep_transactions=keep_transactions)
+
+    def validate_integrity(self):
+        """Same check as ExpenseManager.validate_integrity, but exact (integer cents)."""
+        self.flush()
+        total = self.conn.execute("SELECT COALESCE(SUM(cents), 0) FROM balances").fetchone()[0]
+        if total != 0:
+            raise Exception(f"CRITICAL ERROR: Net sum is {total / 100:.2f} (Should be 0.00)")
+        print("Integrity OK: Zero-Sum maintained.")
+        return True
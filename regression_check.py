@@ -0,0 +1,293 @@
+import os
+import sys
+import time
+import json
+import heapq
+import random
+import argparse
+import platform
+import numpy as np
+import pandas as pd
+from statistics import NormalDist
+from models.expense_manager import ExpenseManager
+from utils.data_generator import generate_connected_data
+from utils.memory_tracker import measure_solver
+from benchmark import load_config, DEFAULT_CONFIG
+from solvers import create_solver, solver_info
+
+# Performance regression gate.
+#   python regression_check.py                    -> run the seeded subset, compare with the baseline, exit 1 on regression
+#   python regression_check.py --update-baseline  -> run the subset and store it as the new baseline
+#
+# Baselines:
+#   analysis_results/regression_baseline.csv  per seed samples of this exact subset (preferred). Same seeds on both
+#                                             sides, so the comparison is paired: transactions are deterministic and
+#                                             timings are compared as per seed log ratios.
+#   analysis_results/aggregated_benchmark_stats.csv  fallback when there is no sample baseline yet. Only per N means
+#                                             from random trials, so the check is unpaired and transactions only
+#                                             (z test on the baseline std). Its times are means of single cold runs
+#                                             on another machine, not comparable with the warm min of repeats here,
+#                                             and it has no memory column: time / memory need --update-baseline.
+#
+# A metric only counts as a regression if it is both statistically significant (one sided bootstrap CI excludes
+# "no change") and bigger than its tolerance, so timer noise on sub millisecond solvers doesn't fail the gate.
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(ROOT, "analysis_results", "regression_baseline.csv")
+AGGREGATED_PATH = os.path.join(ROOT, "analysis_results", "aggregated_benchmark_stats.csv")
+
+# Fixed subset: every N gets the same seeds every time
+CHECK_N = [25, 50, 100, 250]
+CHECK_SEEDS = 5
+SCENARIO = {"name": "Int", "min_amt": 1, "max_amt": 500, "active_threshold": 1, "isInt": True}
+WARMUPS = 1
+# Timed repeats per sample: enough to cover ~TARGET_MEASURE_S of solver time (fast solvers get many, like timeit),
+# clamped to [MIN_REPEATS, MAX_REPEATS]
+MIN_REPEATS = 3
+MAX_REPEATS = 200
+TARGET_MEASURE_S = 0.1
+# Solvers are taken from benchmark_config.json, minus the time limited exact (MILP) solvers, their result depends
+# on the time limit (kind comes from solvers/registry.py)
+EXCLUDE_KINDS = {"exact"}
+# Keeps the gate under a minute: fewer Monte Carlo iterations (a slower iteration still shows up proportionally)
+PARAMS_OVERRIDE = {"HybridSolver": {"iterations": 100}}
+
+# Thresholds
+CONFIDENCE = 0.99
+BOOTSTRAP_SAMPLES = 2000
+TIME_TOLERANCE = 0.25       # +25% slower
+MEMORY_TOLERANCE = 0.20     # +20% more traced memory
+TX_TOLERANCE = 0.0          # any increase in the mean transaction count
+MIN_TIME_S = 0.0005         # below this both sides are timer noise, time isn't checked
+
+# Timings are divided by a fixed pure Python workload timed right before each (N, seed) block, so a machine that is
+# uniformly slower/faster today (CPU boost, load, another laptop) doesn't show up as a regression of every solver
+CALIBRATION_REPEATS = 5
+
+def check_seeds(n):
+    return [random.Random(f"regression:{SCENARIO['name']}:{n}:{t}").randrange(2**32) for t in range(CHECK_SEEDS)]
+
+def _balances(n, seed):
+    random.seed(seed)
+    mgr = ExpenseManager(n)
+    generate_connected_data(mgr, 2 * n, min_amt=SCENARIO["min_amt"], max_amt=SCENARIO["max_amt"],
+                            active_threshold=SCENARIO["active_threshold"], isInt=SCENARIO["isInt"])
+    return mgr.get_active_balances()
+
+def _calibrate():
+    """Min time of a fixed heap + dict + sort workload (same kind of work the solvers do)."""
+    rng = random.Random(12345)
+    vals = [rng.randint(1, 500) for _ in range(20000)]
+    best = float("inf")
+    for _ in range(CALIBRATION_REPEATS):
+        start = time.perf_counter()
+        heap, seen = [], {}
+        for i, v in enumerate(vals):
+            heapq.heappush(heap, (-v, i))
+            seen[v] = seen.get(v, 0) + 1
+        while heap:
+            heapq.heappop(heap)
+        sorted(vals)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _params(spec):
+    return {**spec.get("params", {}), **PARAMS_OVERRIDE.get(spec["class"], {})}
+
+def run_subset(solver_specs):
+    """
+    Runs every solver on every (N, seed) of the subset in process.
+    Returns a DataFrame of samples: N, Seed, Algorithm, Time (s) (min of repeats), Calibration (s), Transactions,
+    Peak Traced (MB).
+    """
+    rows = []
+    for n in CHECK_N:
+        for seed in check_seeds(n):
+            balances = _balances(n, seed)
+            calibration = _calibrate()
+            for spec in solver_specs:
+                if spec.get("max_n") is not None and len(balances) > spec["max_n"]:
+                    continue
+                solver = create_solver(spec["class"], **_params(spec))
+                # Seeded run for the transaction count (randomized solvers like Hybrid are deterministic per seed),
+                # its time sets the number of timed repeats
+                random.seed(seed)
+                start = time.perf_counter()
+                txs = solver.solve(dict(balances))
+                probe = time.perf_counter() - start
+                repeats = min(MAX_REPEATS, max(MIN_REPEATS, int(TARGET_MEASURE_S / max(probe, 1e-6))))
+                res = measure_solver(solver, balances, warmups=WARMUPS, repeats=repeats)
+                # min, not median: noise only ever adds time
+                rows.append({"N": n, "Seed": seed, "Algorithm": spec["name"], "Time (s)": min(res["times"]), "Calibration (s)": calibration,
+                             "Transactions": len(txs), "Peak Traced (MB)": res["peak_traced_mb"]})
+            print(f"  N={n} seed={seed} done", flush=True)
+    return pd.DataFrame(rows)
+
+# ==========================================
+# STATISTICS
+# ==========================================
+
+def _bootstrap_mean_ci(values, rng):
+    """Point estimate of the mean + one sided lower / upper bounds (each at CONFIDENCE)."""
+    values = np.asarray(values, dtype=float)
+    if len(values) == 1:
+        return float(values[0]), float(values[0]), float(values[0])
+    means = rng.choice(values, size=(BOOTSTRAP_SAMPLES, len(values)), replace=True).mean(axis=1)
+    return float(values.mean()), float(np.quantile(means, 1 - CONFIDENCE)), float(np.quantile(means, CONFIDENCE))
+
+def _verdict(point, lower, upper, limit):
+    """Regression: change significantly above 0 and the point estimate past the tolerance `limit`."""
+    if lower > 0 and point > limit:
+        return "REGRESSION"
+    if upper < 0 and point < -limit:
+        return "IMPROVED"
+    return "OK"
+
+def compare_paired(current, baseline, rng):
+    """
+    Same seeds on both sides. Per metric the per seed change is bootstrapped:
+    time / memory as log(current / baseline), transactions as the plain difference.
+    Time is compared in calibration units when both sides have the calibration column.
+    Samples only one side has aren't dropped silently: an (N, solver) only in the current run is NO BASELINE, one the
+    baseline has but this run can't pair (solver / N not run, different seeds) is MISSING, which fails the check.
+    """
+    outer = current.merge(baseline, on=["N", "Seed", "Algorithm"], how="outer", suffixes=("", "_base"), indicator=True)
+    results = []
+    paired_groups = set(map(tuple, outer.loc[outer["_merge"] == "both", ["N", "Algorithm"]].drop_duplicates().values))
+    base_groups = set(map(tuple, baseline[["N", "Algorithm"]].drop_duplicates().values))
+    current_groups = set(map(tuple, current[["N", "Algorithm"]].drop_duplicates().values))
+    for n, algo in sorted(base_groups - paired_groups):
+        why = "not in this run" if (n, algo) not in current_groups else "no matching seeds"
+        results.append({"N": n, "Algorithm": algo, "Metric": "-", "Baseline": None, "Current": None, "Change": why, "Verdict": "MISSING"})
+    for n, algo in sorted(current_groups - base_groups):
+        results.append({"N": n, "Algorithm": algo, "Metric": "-", "Baseline": None, "Current": None, "Change": "-", "Verdict": "NO BASELINE"})
+
+    merged = outer[outer["_merge"] == "both"].drop(columns="_merge")
+    if merged.empty:
+        return results
+    if "Calibration (s)_base" in merged.columns:
+        # One factor for the whole run, single calibration samples are too noisy to normalize each sample by
+        speed = merged["Calibration (s)"].median() / merged["Calibration (s)_base"].median()
+        print(f"Machine speed vs baseline: {1 / speed:.2f}x (calibration workload), timings normalized")
+        merged["Time (s)"] = merged["Time (s)"] / speed
+    for (n, algo), g in merged.groupby(["N", "Algorithm"], sort=True):
+        for metric, tol, log_scale in (("Time (s)", TIME_TOLERANCE, True), ("Peak Traced (MB)", MEMORY_TOLERANCE, True),
+                                       ("Transactions", TX_TOLERANCE, False)):
+            cur, base = g[metric].astype(float), g[f"{metric}_base"].astype(float)
+            if cur.isna().all() or base.isna().all():
+                continue
+            if metric == "Time (s)" and cur.median() < MIN_TIME_S and base.median() < MIN_TIME_S:
+                continue
+            if log_scale:
+                ok = (cur > 0) & (base > 0)
+                if not ok.any():
+                    continue
+                point, lower, upper = _bootstrap_mean_ci(np.log(cur[ok] / base[ok]), rng)
+                limit = np.log1p(tol)
+                change = f"{np.expm1(point) * 100:+.1f}%"
+            else:
+                point, lower, upper = _bootstrap_mean_ci(cur - base, rng)
+                limit = tol
+                change = f"{point:+.2f}"
+            results.append({"N": n, "Algorithm": algo, "Metric": metric, "Baseline": base.mean(), "Current": cur.mean(),
+                            "Change": change, "Verdict": _verdict(point, lower, upper, limit)})
+    return results
+
+def compare_aggregated(current, aggregated, overridden=()):
+    """
+    Fallback against aggregated_benchmark_stats.csv (means of random trials, no memory, different seeds):
+    transactions only, a regression if a one sided z test (baseline std) says the mean is above baseline + tol.
+    Solvers in `overridden` run with different params than the benchmarks behind the file, so they aren't compared.
+    """
+    results = []
+    base = aggregated.set_index(["N", "Algorithm"])
+    for (n, algo), g in current.groupby(["N", "Algorithm"], sort=True):
+        if (n, algo) not in base.index or algo in overridden:
+            results.append({"N": n, "Algorithm": algo, "Metric": "-", "Baseline": None, "Current": None, "Change": "-", "Verdict": "NO BASELINE"})
+            continue
+        row = base.loc[(n, algo)]
+        base_tx = float(row["Avg_Transactions"])
+
+        # Different seeds: a handful of samples can't estimate the spread, the baseline's std (from all its trials) can
+        tx = g["Transactions"].astype(float)
+        diff = tx.mean() - base_tx
+        se = float(row["Transactions_std"]) / np.sqrt(len(tx)) if "Transactions_std" in row and row["Transactions_std"] > 0 else None
+        z = NormalDist().inv_cdf(CONFIDENCE)
+        if se is None:
+            verdict = "REGRESSION" if diff > TX_TOLERANCE else "OK"
+        elif diff - TX_TOLERANCE > z * se:
+            verdict = "REGRESSION"
+        elif diff < -z * se:
+            verdict = "IMPROVED"
+        else:
+            verdict = "OK"
+        results.append({"N": n, "Algorithm": algo, "Metric": "Transactions", "Baseline": base_tx, "Current": tx.mean(),
+                        "Change": f"{diff:+.2f}", "Verdict": verdict})
+    return results
+
+def print_report(results, source):
+    """Prints the table, returns True if the check failed."""
+    print(f"\nRegression check against {source}")
+    print(f"{'N':<6} | {'ALGORITHM':<28} | {'METRIC':<17} | {'BASELINE':>10} | {'CURRENT':>10} | {'CHANGE':>8} | VERDICT")
+    print("-" * 105)
+    for r in results:
+        fmt = lambda v: "-" if v is None or (isinstance(v, float) and np.isnan(v)) else f"{v:.4f}"
+        print(f"{r['N']:<6} | {r['Algorithm'][:28]:<28} | {r['Metric']:<17} | {fmt(r['Baseline']):>10} | {fmt(r['Current']):>10} | {r['Change']:>8} | {r['Verdict']}")
+    # MISSING = a baseline (N, solver) this run couldn't be compared against, fails like a regression
+    regressions = [r for r in results if r["Verdict"] in ("REGRESSION", "MISSING")]
+    compared = any(r["Metric"] != "-" for r in results)
+    print("-" * 105)
+    if not compared:
+        print("FAILED: nothing could be compared against the baseline (different seeds / N / solvers?)")
+    if regressions:
+        print(f"FAILED: {len(regressions)} regression(s)")
+        for r in regressions:
+            print(f"  {r['Algorithm']} @ N={r['N']}: {r['Metric']} {r['Change']}")
+    elif compared:
+        print("PASSED: no regressions")
+    return bool(regressions) or not compared
+
+def _machine():
+    return {"platform": platform.platform(), "processor": platform.processor(), "python": platform.python_version()}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seeded benchmark subset compared against stored baselines.")
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help="Benchmark config to take the solver list from")
+    parser.add_argument("--baseline", default=None, help="Baseline CSV (default: regression_baseline.csv, else aggregated_benchmark_stats.csv)")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new regression_baseline.csv")
+    parser.add_argument("--time-tolerance", type=float, default=TIME_TOLERANCE, help="Allowed relative slowdown (noisy machines need more)")
+    args = parser.parse_args()
+    TIME_TOLERANCE = args.time_tolerance
+
+    specs = [s for s in load_config(args.config)["solvers"] if solver_info(s["class"]).kind not in EXCLUDE_KINDS]
+    print(f"Running regression subset: N={CHECK_N}, {CHECK_SEEDS} seeds, solvers={[s['name'] for s in specs]}")
+    current = run_subset(specs)
+
+    if args.update_baseline:
+        path = args.baseline or BASELINE_PATH
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        current.to_csv(path, index=False)
+        with open(os.path.splitext(path)[0] + "_meta.json", "w") as f:
+            json.dump({**_machine(), "check_n": CHECK_N, "seeds": CHECK_SEEDS, "warmups": WARMUPS,
+                       "solvers": {sp["name"]: _params(sp) for sp in specs}}, f, indent=2)
+        print(f"Baseline written to {path} ({len(current)} samples)")
+        sys.exit(0)
+
+    rng = np.random.default_rng(0)
+    path = args.baseline or (BASELINE_PATH if os.path.exists(BASELINE_PATH) else AGGREGATED_PATH)
+    baseline = pd.read_csv(path)
+    if "Seed" in baseline.columns:
+        meta_path = os.path.splitext(path)[0] + "_meta.json"
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get("platform") != _machine()["platform"]:
+                print(f"WARNING: baseline was recorded on {meta.get('platform')}, timings may not be comparable")
+        results = compare_paired(current, baseline, rng)
+    else:
+        print(f"NOTE: {os.path.basename(path)} has no per seed samples, only transaction counts are checked. "
+              "Run python regression_check.py --update-baseline on this machine to gate time and memory too.")
+        overridden = {sp["name"] for sp in specs if sp["class"] in PARAMS_OVERRIDE}
+        results = compare_aggregated(current, baseline, overridden)
+
+    sys.exit(1 if print_report(results, path) else 0)
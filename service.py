@@ -0,0 +1,489 @@
+import json
+import time
+import signal
+import asyncio
+import argparse
+import threading
+import http.client
+import multiprocessing as mp
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from solvers import create_solver, solver_info
+from utils.verifier import verify_plan, USER_ID_LIMIT
+
+# Local settlement service (asyncio, HTTP/JSON, stdlib only).
+#   python service.py [--port 8765] [--workers 2]
+#
+#   POST /ingest   {"group": "trip", "transactions": [[payer, payee, amount], ...]}
+#                  -> balances of the group are updated (same rules as ExpenseManager: no self payments, cents)
+#                  user ids are ints in 0 .. 2**31 - 1 (SettlementPlan stores int32), anything else is a 400
+#   POST /settle   {"group": "trip"} or {"balances": {"user": balance, ...}},
+#                  optional "solver" (registry name, default LayeredSolver), "params", "deadline_ms"
+#                  -> {"transactions": [[payer, payee, amount], ...], "count", "verified", "batch_size", "latency_ms"}
+#   GET  /metrics  -> request counts, latency percentiles per endpoint, batch sizes, queue depth
+#
+# Settle requests are coalesced into micro batches: the batcher waits up to batch_window_ms after the first request
+# (or until max_batch requests), groups them by solver + params and sends each group to the process pool as one
+# task, so a burst of small groups costs one round trip to a worker instead of one each. Solving never runs on the
+# event loop. A request past its deadline gets a 504 (before dispatch it's dropped, after dispatch the result is
+# thrown away when it arrives). Requests of a batch fail independently: a bad request only fails its own future, and
+# a worker crash (BrokenProcessPool) fails its batch with a 503 and replaces the pool.
+#
+# SettlementClient below talks to it with http.client, start_background() runs a service in a thread, so the whole
+# thing can be exercised from one python process without anything external.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_SOLVER = "LayeredSolver"
+BATCH_WINDOW_MS = 2
+MAX_BATCH = 64
+# Latencies kept per endpoint for the percentiles (most recent ones)
+LATENCY_WINDOW = 10000
+PERCENTILES = (50, 90, 99)
+MAX_BODY = 64 * 1024 * 1024
+# Solver errors that mean a bad request (400), anything else is a 500
+CLIENT_ERRORS = (KeyError, TypeError, ValueError)
+
+class DeadlineExceeded(Exception):
+    pass
+
+class ServiceError(Exception):
+    """Non 2xx answer from the service (status + message), raised by the client and inside the service."""
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.message = message
+
+# ==========================================
+# WORKER SIDE
+# ==========================================
+
+# Solver instances per worker process, keyed like the batches (solver, params json)
+_WORKER_SOLVERS = {}
+
+def _dense(balances):
+    """
+    {user: balance} with user ids remapped to 0..k-1 + the original id of each. Ids can be sparse (200_000_000 in a
+    3 user group), solvers and verify_plan size per user arrays by the largest id.
+    """
+    users = sorted(balances)
+    return {i: balances[u] for i, u in enumerate(users)}, users
+
+def _init_worker():
+    # Ctrl+C goes to the whole process group, the service shuts the pool down itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def _warm_up():
+    create_solver(DEFAULT_SOLVER)
+
+def _solve_batch(solver, params_json, balance_list):
+    """
+    Runs in the pool: one solver instance, every request of the batch.
+    Returns one (status, result) per request: (200, (transactions, verified)) or (400 / 500, error message),
+    so a request the solver rejects doesn't take the rest of the batch down with it.
+    """
+    key = (solver, params_json)
+    try:
+        instance = _WORKER_SOLVERS.get(key)
+        if instance is None:
+            instance = _WORKER_SOLVERS[key] = create_solver(solver, **json.loads(params_json))
+    except Exception as e:
+        # Same solver + params for the whole batch, so this one does fail every request
+        return [(400 if isinstance(e, CLIENT_ERRORS) else 500, f"{type(e).__name__}: {e}")] * len(balance_list)
+    out = []
+    for balances in balance_list:
+        try:
+            dense, users = _dense(balances)
+            plan = instance.solve(dense)
+            verified = verify_plan(plan, dense)["ok"]
+            out.append((200, ([[users[payer], users[payee], amount] for payer, payee, amount in plan], verified)))
+        except Exception as e:
+            out.append((400 if isinstance(e, CLIENT_ERRORS) else 500, f"{type(e).__name__}: {e}"))
+    return out
+
+# ==========================================
+# SERVICE
+# ==========================================
+
+def _user_id(value):
+    user = int(value)
+    if not 0 <= user < USER_ID_LIMIT:
+        raise ValueError(f"user id {user} out of range (0 .. {USER_ID_LIMIT - 1})")
+    return user
+
+def _percentiles(values):
+    if not values:
+        return {f"p{p}": None for p in PERCENTILES} | {"max": None}
+    ordered = sorted(values)
+    # Nearest rank
+    out = {f"p{p}": ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))] for p in PERCENTILES}
+    out["max"] = ordered[-1]
+    return out
+
+class _Pending:
+    __slots__ = ("key", "balances", "deadline", "future")
+
+    def __init__(self, key, balances, deadline, future):
+        self.key = key
+        self.balances = balances
+        self.deadline = deadline
+        self.future = future
+
+class SettlementService:
+    """
+    The asyncio server. workers=0 solves in a thread instead of a process pool (still off the event loop),
+    handy when debugging a solver.
+    """
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=1, batch_window_ms=BATCH_WINDOW_MS,
+                 max_batch=MAX_BATCH, default_deadline_ms=None):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max_batch
+        self.default_deadline_ms = default_deadline_ms
+        # group -> {user: cents}
+        self.groups = defaultdict(lambda: defaultdict(int))
+        self.latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        self.requests = defaultdict(int)
+        self.batches = 0
+        self.deadline_exceeded = 0
+        self.pool_restarts = 0
+        self.batch_sizes = deque(maxlen=LATENCY_WINDOW)
+        self._server = None
+        self._pool = None
+        self._queue = None
+        self._batcher = None
+        self._inflight = set()
+
+    # ---------- Lifecycle ----------
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        if self.workers:
+            # Start the workers and import the solvers now, not on the first settle request (~0.7s)
+            await asyncio.gather(*self._new_pool())
+        self._batcher = asyncio.create_task(self._batch_loop())
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Port 0 = pick a free one
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    def _new_pool(self):
+        """Creates the process pool, returns the warm up futures (one per worker)."""
+        # Spawn: same behaviour on every OS, and forking a process that runs an event loop is asking for trouble
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=mp.get_context("spawn"),
+                                         initializer=_init_worker)
+        loop = asyncio.get_running_loop()
+        return [loop.run_in_executor(self._pool, _warm_up) for _ in range(self.workers)]
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._batcher is not None:
+            self._batcher.cancel()
+            await asyncio.gather(self._batcher, return_exceptions=True)
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"Settlement service on http://{self.host}:{self.port} (workers={self.workers})")
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    # ---------- HTTP ----------
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, target, _ = line.decode("latin-1").split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "bad request line"}, keep_alive=False)
+                    break
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = h.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0) or 0)
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {"error": "body too large"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                keep_alive = headers.get("connection", "").lower() != "close"
+
+                start = time.perf_counter()
+                status, payload = await self._route(method, target.split("?", 1)[0], body)
+                elapsed = time.perf_counter() - start
+                endpoint = f"{method} {target.split('?', 1)[0]}"
+                if status != 404:
+                    self.latencies[endpoint].append(elapsed)
+                    self.requests[f"{endpoint} {status}"] += 1
+                if endpoint == "POST /settle" and status == 200:
+                    payload["latency_ms"] = round(elapsed * 1000, 3)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive=True):
+        body = json.dumps(payload).encode()
+        reason = http.client.responses.get(status, "")
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body)
+        await writer.drain()
+
+    async def _route(self, method, path, body):
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            return 400, {"error": "body is not valid JSON"}
+        try:
+            if method == "POST" and path == "/ingest":
+                return self._ingest(data)
+            if method == "POST" and path == "/settle":
+                return await self._settle(data)
+            if method == "GET" and path == "/metrics":
+                return 200, self.metrics()
+            return 404, {"error": f"no route for {method} {path}"}
+        except (KeyError, TypeError, ValueError) as e:
+            return 400, {"error": f"{type(e).__name__}: {e}"}
+        except DeadlineExceeded as e:
+            return 504, {"error": str(e)}
+        except ServiceError as e:
+            return e.status, {"error": e.message}
+        except Exception as e:
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    # ---------- Endpoints ----------
+
+    def _ingest(self, data):
+        # Parsed up front so a bad row rejects the whole request instead of leaving it half applied
+        rows = [(_user_id(payer), _user_id(payee), round(float(amount) * 100)) for payer, payee, amount in data["transactions"]]
+        group = self.groups[str(data["group"])]
+        added = 0
+        for payer, payee, cents in rows:
+            if payer == payee:
+                continue
+            # Payer gets credit (+), Payee gets debt (-)
+            group[payer] += cents
+            group[payee] -= cents
+            added += 1
+        return 200, {"group": str(data["group"]), "added": added, "users": len(group)}
+
+    async def _settle(self, data):
+        if "balances" in data:
+            balances = {_user_id(u): float(b) for u, b in data["balances"].items() if round(float(b) * 100) != 0}
+        else:
+            group = self.groups.get(str(data["group"]))
+            if group is None:
+                raise KeyError(f"unknown group {data['group']!r}")
+            balances = {u: c / 100 for u, c in group.items() if c != 0}
+        if abs(round(sum(balances.values()) * 100)) > 0:
+            raise ValueError(f"balances don't sum to zero ({sum(balances.values()):.2f})")
+
+        solver = data.get("solver", DEFAULT_SOLVER)
+        reason = solver_info(solver).unavailable_reason()
+        if reason is not None:
+            raise ValueError(f"{solver} is unavailable ({reason})")
+        params_json = json.dumps(data.get("params", {}), sort_keys=True)
+
+        loop = asyncio.get_running_loop()
+        deadline_ms = data.get("deadline_ms", self.default_deadline_ms)
+        deadline = loop.time() + deadline_ms / 1000 if deadline_ms is not None else None
+        pending = _Pending((solver, params_json), balances, deadline, loop.create_future())
+        await self._queue.put(pending)
+        try:
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            # shield: a timed out request must not cancel the batch it's part of
+            result, batch_size = await asyncio.wait_for(asyncio.shield(pending.future), timeout)
+        except asyncio.TimeoutError:
+            self.deadline_exceeded += 1
+            raise DeadlineExceeded(f"deadline of {deadline_ms} ms exceeded") from None
+        status, result = result
+        if status != 200:
+            raise ServiceError(status, result)
+        transactions, verified = result
+        return 200, {"transactions": transactions, "count": len(transactions), "verified": verified, "batch_size": batch_size}
+
+    def metrics(self):
+        sizes = list(self.batch_sizes)
+        return {
+            "latency_ms": {ep: {k: (round(v * 1000, 3) if v is not None else None) for k, v in _percentiles(list(lat)).items()}
+                           | {"samples": len(lat)} for ep, lat in self.latencies.items()},
+            "requests": dict(self.requests),
+            "deadline_exceeded": self.deadline_exceeded,
+            "pool_restarts": self.pool_restarts,
+            "batches": self.batches,
+            "mean_batch_size": round(sum(sizes) / len(sizes), 2) if sizes else None,
+            "max_batch_size": max(sizes) if sizes else None,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "groups": len(self.groups),
+            "workers": self.workers,
+        }
+
+    # ---------- Batching ----------
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            window_end = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = window_end - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Already past their deadline (or abandoned): don't spend a worker on them
+            now = loop.time()
+            live = [p for p in batch if not p.future.done() and (p.deadline is None or p.deadline > now)]
+            by_key = defaultdict(list)
+            for p in live:
+                by_key[p.key].append(p)
+            for key, items in by_key.items():
+                self._track(asyncio.create_task(self._dispatch(key, items)))
+
+    def _track(self, future):
+        """Keeps future in _inflight until it's done (close() waits for them)."""
+        self._inflight.add(future)
+        future.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, key, items):
+        loop = asyncio.get_running_loop()
+        self.batches += 1
+        self.batch_sizes.append(len(items))
+        pool = self._pool
+        try:
+            results = await loop.run_in_executor(pool, _solve_batch, key[0], key[1], [p.balances for p in items])
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                # A worker died (OOM kill, segfault in a native solver): the executor is unusable from now on.
+                # Only the first batch to notice replaces it, the others already see the new one.
+                if pool is self._pool:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self.pool_restarts += 1
+                    self._track(asyncio.gather(*self._new_pool(), return_exceptions=True))
+                e = ServiceError(503, "solver worker died, the pool was restarted (retry the request)")
+            for p in items:
+                if not p.future.done():
+                    p.future.set_exception(e)
+            return
+        for p, res in zip(items, results):
+            if not p.future.done():
+                p.future.set_result((res, len(items)))
+
+def start_background(**kwargs) -> SettlementService:
+    """
+    Starts a SettlementService (kwargs as for the constructor, port=0 picks a free port) on its own event loop in a
+    daemon thread and returns it once it's listening. service.stop() shuts it down.
+    """
+    kwargs.setdefault("port", 0)
+    service = SettlementService(**kwargs)
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    errors = []
+
+    def run():
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(service.start())
+        except Exception as e:
+            errors.append(e)
+            ready.set()
+            return
+        ready.set()
+        loop.run_forever()
+        loop.run_until_complete(service.close())
+        loop.close()
+
+    thread = threading.Thread(target=run, name="settlement-service", daemon=True)
+    thread.start()
+    ready.wait()
+    if errors:
+        raise errors[0]
+
+    def stop():
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    service.stop = stop
+    return service
+
+# ==========================================
+# CLIENT
+# ==========================================
+
+class SettlementClient:
+    """Blocking client (one keep-alive connection). Raises ServiceError on non 2xx answers (504 = deadline)."""
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=60):
+        self.conn = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _request(self, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        self.conn.request(method, path, body=body, headers=headers)
+        resp = self.conn.getresponse()
+        data = json.loads(resp.read() or b"{}")
+        if resp.status >= 300:
+            raise ServiceError(resp.status, data.get("error", resp.reason))
+        return data
+
+    def ingest(self, group, transactions):
+        return self._request("POST", "/ingest", {"group": group, "transactions": [list(t) for t in transactions]})
+
+    def settle(self, group=None, balances=None, solver=DEFAULT_SOLVER, params=None, deadline_ms=None):
+        payload = {"solver": solver, "params": params or {}}
+        if balances is not None:
+            payload["balances"] = {str(u): b for u, b in balances.items()}
+        else:
+            payload["group"] = group
+        if deadline_ms is not None:
+            payload["deadline_ms"] = deadline_ms
+        return self._request("POST", "/settle", payload)
+
+    def metrics(self):
+        return self._request("GET", "/metrics")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local asyncio settlement service (HTTP/JSON).")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=1, help="Solver processes (0 = solve in a thread)")
+    parser.add_argument("--batch-window-ms", type=float, default=BATCH_WINDOW_MS, help="How long the batcher waits for more settle requests")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--deadline-ms", type=float, default=None, help="Default deadline for settle requests without one")
+    args = parser.parse_args()
+    try:
+        asyncio.run(SettlementService(args.host, args.port, args.workers, args.batch_window_ms, args.max_batch,
+                                      args.deadline_ms).serve_forever())
+    except KeyboardInterrupt:
+        pass
@@ -1,5 +1,11 @@
-from .simple_greedy_solver import SimpleGreedySolver
-from .hybrid_solver import HybridSolver
-from .milp_solver import MilpSolver
-from .milp_solver_gurobi import MilpSolverGurobi
-from .layered_solver import LayeredSolver
+from .registry import REGISTRY, SolverInfo, SolverUnavailableError, solver_info, get_solver, create_solver, available_solvers, unavailable_solvers
+
+# Solver classes are loaded lazily through the registry (solvers/registry.py), so
+# `from solvers import SimpleGreedySolver` only imports that one module and never touches pulp / gurobipy.
+def __getattr__(name):
+    if name in REGISTRY:
+        return get_solver(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(list(globals()) + list(REGISTRY))
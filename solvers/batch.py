@@ -0,0 +1,184 @@
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from .registry import create_solver
+from models.settlement_plan import SettlementPlan
+
+# Batch API for lots of small settlement groups (3 - 30 members each) instead of one big graph.
+#
+# Packed (CSR style) input:
+#   balances: flat float array, every group's members back to back
+#   offsets:  int array of length n_groups + 1, group g is balances[offsets[g]:offsets[g + 1]]
+# Members are identified by their local index inside the group (0 .. size - 1).
+#
+# Packed output (BatchResult): debtors / creditors (local indices) and amounts, transactions of group g are
+# [tx_offsets[g]:tx_offsets[g + 1]].
+#
+# Two paths:
+#   1. Star groups (at most 1 debtor or at most 1 creditor, e.g. every 3 member group) are solved for all groups
+#      at once with numpy: the single debtor pays every creditor (or every debtor pays the single creditor).
+#      That's size - 1 transactions, which is optimal since everyone on the other side needs at least one.
+#   2. Everything else goes to the chosen solver in chunks, one solver instance per worker process.
+#      With workers the packed arrays are put in shared memory once (utils/shared_arrays.py) and every chunk
+#      only sends its group ids, workers slice their groups out of the shared arrays.
+
+# Members per chunk sent to a worker (a chunk is a list of whole groups)
+CHUNK_MEMBERS = 20000
+ZERO = 1e-9
+
+class BatchResult:
+    """Packed transactions for a batch of groups + how long solving took."""
+    def __init__(self, tx_offsets, debtors, creditors, amounts, elapsed_s, star_groups=0):
+        self.tx_offsets = tx_offsets
+        self.debtors = debtors
+        self.creditors = creditors
+        self.amounts = amounts
+        self.elapsed_s = elapsed_s
+        self.star_groups = star_groups
+
+    @property
+    def n_groups(self):
+        return len(self.tx_offsets) - 1
+
+    @property
+    def groups_per_s(self):
+        return self.n_groups / self.elapsed_s if self.elapsed_s > 0 else float("inf")
+
+    def counts(self):
+        """Transactions per group."""
+        return np.diff(self.tx_offsets)
+
+    def group(self, g):
+        """Transactions of group g as the usual [(debtor, creditor, amount)] list (local member indices)."""
+        s, e = self.tx_offsets[g], self.tx_offsets[g + 1]
+        return list(zip(self.debtors[s:e].tolist(), self.creditors[s:e].tolist(), self.amounts[s:e].tolist()))
+
+    def __len__(self):
+        return len(self.amounts)
+
+def pack_groups(groups):
+    """[{member: balance}] or [[balance, ...]] -> (balances, offsets). Dict groups keep their insertion order."""
+    sizes = [len(g) for g in groups]
+    offsets = np.zeros(len(groups) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    balances = np.fromiter((b for g in groups for b in (g.values() if isinstance(g, dict) else g)),
+                           dtype=np.float64, count=int(offsets[-1]))
+    return balances, offsets
+
+def _star_transactions(balances, offsets, group_ids, local):
+    """
+    Vectorized path. Returns (is_star mask per group, (group, debtor, creditor, amount) arrays for the star groups).
+    """
+    n_groups = len(offsets) - 1
+    neg = balances < -ZERO
+    pos = balances > ZERO
+    n_neg = np.bincount(group_ids[neg], minlength=n_groups)
+    n_pos = np.bincount(group_ids[pos], minlength=n_groups)
+
+    one_debtor = n_neg == 1
+    one_creditor = (n_pos == 1) & ~one_debtor
+    is_star = one_debtor | one_creditor | (n_neg == 0) | (n_pos == 0)
+
+    # Hub = the single debtor / creditor of the group (local index)
+    hub = np.zeros(n_groups, dtype=np.int32)
+    hub[group_ids[neg & one_debtor[group_ids]]] = local[neg & one_debtor[group_ids]]
+    hub[group_ids[pos & one_creditor[group_ids]]] = local[pos & one_creditor[group_ids]]
+
+    pays_hub = pos & one_debtor[group_ids]       # creditors of a 1 debtor group
+    paid_by_hub = neg & one_creditor[group_ids]  # debtors of a 1 creditor group
+    g = np.concatenate([group_ids[pays_hub], group_ids[paid_by_hub]])
+    debtors = np.concatenate([hub[group_ids[pays_hub]], local[paid_by_hub]])
+    creditors = np.concatenate([local[pays_hub], hub[group_ids[paid_by_hub]]])
+    amounts = np.concatenate([balances[pays_hub], -balances[paid_by_hub]])
+    return is_star, (g, debtors, creditors, amounts)
+
+# Per worker process solver, built once by _init_worker instead of once per group
+_WORKER_SOLVER = None
+
+def _init_worker(solver, params):
+    global _WORKER_SOLVER
+    _WORKER_SOLVER = create_solver(solver, **params)
+
+def _solve_chunk(group_index, balances, offsets, solver=None):
+    """Solves a chunk of groups with the solver, returns packed (group, debtor, creditor, amount) arrays."""
+    solver = solver or _WORKER_SOLVER
+    values = balances.tolist()
+    bounds = offsets.tolist()
+    plan, counts = SettlementPlan(), []
+    for i in range(len(group_index)):
+        s, e = bounds[i], bounds[i + 1]
+        group_txs = solver.solve({u: b for u, b in enumerate(values[s:e]) if b != 0})
+        plan.extend(group_txs)
+        counts.append(len(group_txs))
+    g = np.repeat(np.asarray(group_index, dtype=np.int64), counts)
+    return g, plan.payers.copy(), plan.payees.copy(), plan.amounts
+
+def _solve_shared_chunk(groups, balances, offsets):
+    """Worker side of the shared memory path: balances / offsets are SharedArray handles, only group ids were pickled."""
+    return _solve_chunk(*_chunk_payload(groups, balances.array, offsets.array))
+
+def _chunks(groups, offsets, chunk_members):
+    """Splits the non star groups into lists of whole groups with ~chunk_members members each."""
+    out, start, members = [], 0, 0
+    for i, g in enumerate(groups):
+        members += offsets[g + 1] - offsets[g]
+        if members >= chunk_members:
+            out.append(groups[start:i + 1])
+            start, members = i + 1, 0
+    if start < len(groups):
+        out.append(groups[start:])
+    return out
+
+def _chunk_payload(groups, balances, offsets):
+    sizes = offsets[groups + 1] - offsets[groups]
+    sub_offsets = np.zeros(len(groups) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=sub_offsets[1:])
+    sub_balances = np.concatenate([balances[offsets[g]:offsets[g + 1]] for g in groups]) if len(groups) else balances[:0]
+    return groups, sub_balances, sub_offsets
+
+def solve_many(balances, offsets, solver="LayeredSolver", params=None, workers=1, chunk_members=CHUNK_MEMBERS,
+               validate=True) -> BatchResult:
+    """
+    Solves every group of a packed batch (see the top of the file), returns a BatchResult.
+    solver / params: registry name + constructor params (solvers/registry.py) for the non star groups.
+    workers: processes for the non star groups (None = one per core, 1 = in process).
+    validate: raise ValueError if a group doesn't sum to zero.
+    """
+    start = time.perf_counter()
+    balances = np.asarray(balances, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n_groups = len(offsets) - 1
+    sizes = np.diff(offsets)
+    group_ids = np.repeat(np.arange(n_groups, dtype=np.int64), sizes)
+    local = (np.arange(len(balances), dtype=np.int64) - np.repeat(offsets[:-1], sizes)).astype(np.int32)
+
+    if validate and n_groups:
+        sums = np.bincount(group_ids, weights=balances, minlength=n_groups)
+        bad = np.flatnonzero(np.abs(sums) > 0.01)
+        if len(bad):
+            raise ValueError(f"{len(bad)} group(s) don't sum to zero, first: group {bad[0]} (sum {sums[bad[0]]:.4f})")
+
+    is_star, star_parts = _star_transactions(balances, offsets, group_ids, local)
+    parts = [star_parts]
+
+    rest = np.flatnonzero(~is_star)
+    if len(rest):
+        chunks = _chunks(rest, offsets, chunk_members)
+        workers = min(workers or os.cpu_count() or 1, len(chunks))
+        if workers <= 1:
+            instance = create_solver(solver, **(params or {}))
+            parts.extend(_solve_chunk(*_chunk_payload(c, balances, offsets), solver=instance) for c in chunks)
+        else:
+            from utils.shared_arrays import SharedArray
+            with SharedArray.copy_of(balances) as shared_balances, SharedArray.copy_of(offsets) as shared_offsets:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(solver, params or {})) as pool:
+                    parts.extend(pool.map(_solve_shared_chunk, chunks, [shared_balances] * len(chunks), [shared_offsets] * len(chunks)))
+
+    # Back into group order (stable, so each group keeps its solver's transaction order)
+    g, debtors, creditors, amounts = (np.concatenate(cols) for cols in zip(*parts))
+    order = np.argsort(g, kind="stable")
+    tx_offsets = np.zeros(n_groups + 1, dtype=np.int64)
+    np.cumsum(np.bincount(g, minlength=n_groups), out=tx_offsets[1:])
+    return BatchResult(tx_offsets, debtors[order], creditors[order], amounts[order],
+                       time.perf_counter() - start, star_groups=int(is_star.sum()))
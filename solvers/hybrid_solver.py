@@ -1,8 +1,10 @@
+import time
 import random
 import heapq
-from typing import Dict, List, Tuple
+from typing import Dict
 from collections import defaultdict
-from tqdm import tqdm
+from .instrumentation import NULL
+from models.settlement_plan import SettlementPlan
 
 class HybridSolver():
     """
@@ -19,12 +21,22 @@ class HybridSolver():
     
     Tried a lot of configs, having a higher P val seems to be better (.95 gives good results generally)
     But I tried P b/w 0.85 to 0.98 all give good results depending on the luck
+
+    Instrumentation (solvers/instrumentation.py): one "iteration" phase per Monte Carlo run with setup / exact_match /
+    select / remainder time aggregated inside it, counters for stale heap pops, exact matches and users eliminated,
+    and progress(done, iterations) after every iteration (replaces the old hard coded tqdm bar).
     """
-    def __init__(self, iterations=1000, greedy_probability=0.90):
+    instrumentation = NULL
+    # _handle_remainder outcomes
+    ELIMINATED, MATCHED, PUSHED = 0, 1, 2
+
+    def __init__(self, iterations=1000, greedy_probability=0.90, exact_threshold=0):
         self.iterations = iterations
         self.epsilon = greedy_probability
+        # Groups of <= exact_threshold active users are solved exactly instead (small_exact.py), 0 = never
+        self.exact_threshold = exact_threshold
 
-    def solve(self, net_balances: Dict[int, float]) -> List[Tuple[int, int, float]]:
+    def solve(self, net_balances: Dict[int, float]) -> SettlementPlan:
         """
         Main function to solve the problem given the algo above
 
@@ -33,152 +45,196 @@ class HybridSolver():
         d is short for debtor
         c is short for creditor
         """
+        # Tiny groups go to the exact engine (solvers/small_exact.py), imported here so it only costs when used
+        if self.exact_threshold and sum(1 for b in net_balances.values() if b != 0) <= self.exact_threshold:
+            from .small_exact import solve_small
+            return solve_small(net_balances)
+        ins = self.instrumentation
+        # Only touch the clock when instrumentation is on
+        timed = ins.enabled
+        clock = time.perf_counter
         pool_base = {userId: bal for userId, bal in net_balances.items() if bal != 0.0}
         
         best_txs = None
         min_tx_count = float('inf')
+        # Counters are plain ints in the loop and handed to the instrumentation once at the end
+        stale_pops = exact_matches = remainder_matches = eliminated_greedy = random_picks = 0
+        t_setup = t_exact = t_select = t_remainder = 0.0
 
-        for _ in tqdm(range(self.iterations)):
-            # Copying since we work in destructive fashion and need it everytime
-            active_bals = pool_base.copy()
-            current_txs = []
+        for it in range(self.iterations):
+            with ins.phase("iteration"):
+                if timed: t0 = clock()
+                # Copying since we work in destructive fashion and need it everytime
+                active_bals = pool_base.copy()
+                current_txs = SettlementPlan()
             
-            # DATA STRUCTURES
-            # Maps for Exact Lookup {value : UserId}
-            d_map = defaultdict(set)
-            c_map = defaultdict(set)
+                # DATA STRUCTURES
+                # Maps for Exact Lookup {value : UserId}
+                d_map = defaultdict(set)
+                c_map = defaultdict(set)
             
-            # Lists for Random Access [UserId]
-            d_list = []
-            c_list = []
+                # Lists for Random Access [UserId]
+                d_list = []
+                c_list = []
             
-            # Heaps for Greedy Access (Max-Max) (Value, UserId)
-            d_heap = []
-            c_heap = []
+                # Heaps for Greedy Access (Max-Max) (Value, UserId)
+                d_heap = []
+                c_heap = []
             
-            # Initialise all the different Structures
-            for userId, bal in active_bals.items():
-                val = abs(bal)
-                # bal < 0 means debtor so appending in debtor
-                if bal < 0:
-                    d_map[val].add(userId)
-                    d_list.append(userId)
-                    # Max-Heap via negation since heaps are min heap by default in python
-                    heapq.heappush(d_heap, (-val, userId)) 
-                # bal > 0 means creditor so appending in creditor
-                else:
-                    c_map[val].add(userId)
-                    c_list.append(userId)
-                    heapq.heappush(c_heap, (-val, userId))
+                # Initialise all the different Structures
+                for userId, bal in active_bals.items():
+                    val = abs(bal)
+                    # bal < 0 means debtor so appending in debtor
+                    if bal < 0:
+                        d_map[val].add(userId)
+                        d_list.append(userId)
+                        # Max-Heap via negation since heaps are min heap by default in python
+                        heapq.heappush(d_heap, (-val, userId)) 
+                    # bal > 0 means creditor so appending in creditor
+                    else:
+                        c_map[val].add(userId)
+                        c_list.append(userId)
+                        heapq.heappush(c_heap, (-val, userId))
             
-            # Shuffle lists once for randomness order
-            random.shuffle(d_list)
-            random.shuffle(c_list)
+                # Shuffle lists once for randomness order
+                random.shuffle(d_list)
+                random.shuffle(c_list)
+                if timed: t_setup += clock() - t0
 
-            # SOLVER LOOP
-            while active_bals:
+                # SOLVER LOOP
+                while active_bals:
+                    if timed: t0 = clock()
                 
-                # Net of Common Amounts
-                common = set(d_map.keys()) & set(c_map.keys())
-                match_found = False
-                # If there are common amounts
-                if common:
-                    for amt in common:
-                        # For every amount while there are users on both sides set them off
-                        while d_map[amt] and c_map[amt]:
-                            d = d_map[amt].pop()
-                            c = c_map[amt].pop()
-                            current_txs.append((d, c, amt))
-
-                            # Cleanup of users as they are done now
-                            del active_bals[d]
-                            del active_bals[c]
-                            match_found = True
-
-                        # Cleanup of maps, delete the val if there is no user with that bal
-                        if not d_map[amt]: 
-                            del d_map[amt]
-                        if not c_map[amt]: 
-                            del c_map[amt]
+                    # Net of Common Amounts
+                    common = set(d_map.keys()) & set(c_map.keys())
+                    match_found = False
+                    # If there are common amounts
+                    if common:
+                        for amt in common:
+                            # For every amount while there are users on both sides set them off
+                            while d_map[amt] and c_map[amt]:
+                                d = d_map[amt].pop()
+                                c = c_map[amt].pop()
+                                current_txs.add(d, c, amt)
+
+                                # Cleanup of users as they are done now
+                                del active_bals[d]
+                                del active_bals[c]
+                                match_found = True
+                                exact_matches += 1
+
+                            # Cleanup of maps, delete the val if there is no user with that bal
+                            if not d_map[amt]: 
+                                del d_map[amt]
+                            if not c_map[amt]: 
+                                del c_map[amt]
+                    if timed:
+                        t1 = clock(); t_exact += t1 - t0; t0 = t1
                 
-                if match_found: 
-                    continue
-                if not active_bals: 
-                    break
-
-                # Max Max or Random Selection
-                # if random number is less than prob use max max greedy or use random
-                use_greedy = random.random() < self.epsilon
+                    if match_found: 
+                        continue
+                    if not active_bals: 
+                        break
+
+                    # Max Max or Random Selection
+                    # if random number is less than prob use max max greedy or use random
+                    use_greedy = random.random() < self.epsilon
+                    if not use_greedy:
+                        random_picks += 1
                 
-                # Select Debtor
-                d_u = -1
-                if use_greedy:
-                    # Try Heap (Max)
-                    while d_heap:
-                        _, u = heapq.heappop(d_heap)
-                        if u in active_bals: 
-                            d_u = u
-                            break
+                    # Select Debtor
+                    d_u = -1
+                    if use_greedy:
+                        # Try Heap (Max)
+                        while d_heap:
+                            _, u = heapq.heappop(d_heap)
+                            if u in active_bals: 
+                                d_u = u
+                                break
+                            # Lazy deletion, this entry belonged to a user that is already settled / re-pushed
+                            stale_pops += 1
                 
-                # Fallback to List (Random) if Heap empty or skipped
-                if d_u == -1:
-                    while d_list:
-                        u = d_list.pop()
-                        if u in active_bals: 
-                            d_u = u
-                            break
+                    # Fallback to List (Random) if Heap empty or skipped
+                    if d_u == -1:
+                        while d_list:
+                            u = d_list.pop()
+                            if u in active_bals: 
+                                d_u = u
+                                break
                 
-                # Select Creditor
-                c_u = -1
-                if use_greedy:
-                    # Try Heap (Max)
-                    while c_heap:
-                        _, u = heapq.heappop(c_heap)
-                        if u in active_bals: 
-                            c_u = u
-                            break
+                    # Select Creditor
+                    c_u = -1
+                    if use_greedy:
+                        # Try Heap (Max)
+                        while c_heap:
+                            _, u = heapq.heappop(c_heap)
+                            if u in active_bals: 
+                                c_u = u
+                                break
+                            stale_pops += 1
                 
-                # Fallback to List (Random)
-                if c_u == -1:
-                    while c_list:
-                        u = c_list.pop()
-                        if u in active_bals: 
-                            c_u = u; 
-                            break
-
-                # If we can't find any debtor or creditor
-                # Should never really come to this since we are checking if active bals is empty above
-                # But good to have
-                if d_u == -1 or c_u == -1: 
-                    break
-
-                # MATCH
-                d_val = abs(active_bals[d_u])
-                c_val = active_bals[c_u]
+                    # Fallback to List (Random)
+                    if c_u == -1:
+                        while c_list:
+                            u = c_list.pop()
+                            if u in active_bals: 
+                                c_u = u; 
+                                break
+                    if timed:
+                        t1 = clock(); t_select += t1 - t0; t0 = t1
+
+                    # If we can't find any debtor or creditor
+                    # Should never really come to this since we are checking if active bals is empty above
+                    # But good to have
+                    if d_u == -1 or c_u == -1: 
+                        break
+
+                    # MATCH
+                    d_val = abs(active_bals[d_u])
+                    c_val = active_bals[c_u]
                 
-                # Cleanup Maps 
-                # Using discard here so that keyerror doesn't occur as in remove
-                if d_val in d_map: 
-                    d_map[d_val].discard(d_u)
-                if c_val in c_map: 
-                    c_map[c_val].discard(c_u)
+                    # Cleanup Maps 
+                    # Using discard here so that keyerror doesn't occur as in remove
+                    if d_val in d_map: 
+                        d_map[d_val].discard(d_u)
+                    if c_val in c_map: 
+                        c_map[c_val].discard(c_u)
                 
-                # Amount net off in this transaction will be the lower of the both obviously
-                amt = min(d_val, c_val)
-                current_txs.append((d_u, c_u, amt))
+                    # Amount net off in this transaction will be the lower of the both obviously
+                    amt = min(d_val, c_val)
+                    current_txs.add(d_u, c_u, amt)
                 
-                # Remainder amount, one of the vals will be 0 other would be non zero
-                rem_d = round(d_val - amt, 2)
-                rem_c = round(c_val - amt, 2)
+                    # Remainder amount, one of the vals will be 0 other would be non zero
+                    rem_d = round(d_val - amt, 2)
+                    rem_c = round(c_val - amt, 2)
                 
-                # HANDLE REMAINDERS
-                self._handle_remainder(d_u, rem_d, True, active_bals, d_map, c_map, d_list, c_list, d_heap, current_txs)
-                self._handle_remainder(c_u, rem_c, False, active_bals, d_map, c_map, d_list, c_list, c_heap, current_txs)
+                    # HANDLE REMAINDERS
+                    for outcome in (self._handle_remainder(d_u, rem_d, True, active_bals, d_map, c_map, d_list, c_list, d_heap, current_txs),
+                                    self._handle_remainder(c_u, rem_c, False, active_bals, d_map, c_map, d_list, c_list, c_heap, current_txs)):
+                        if outcome == self.ELIMINATED:
+                            eliminated_greedy += 1
+                        elif outcome == self.MATCHED:
+                            remainder_matches += 1
+                    if timed: t_remainder += clock() - t0
 
-            if len(current_txs) < min_tx_count:
-                min_tx_count = len(current_txs)
-                best_txs = current_txs
-                
+                if len(current_txs) < min_tx_count:
+                    min_tx_count = len(current_txs)
+                    best_txs = current_txs
+            ins.progress(it + 1, self.iterations)
+
+        if timed:
+            ins.add_time("setup", t_setup)
+            ins.add_time("exact_match", t_exact)
+            ins.add_time("select", t_select)
+            ins.add_time("remainder", t_remainder)
+            ins.count("iterations", self.iterations)
+            ins.count("stale_heap_pops", stale_pops)
+            ins.count("random_picks", random_picks)
+            ins.count("exact_matches", exact_matches)
+            ins.count("remainder_exact_matches", remainder_matches)
+            # Exact matches settle two users at once, a greedy match settles whoever has no remainder left
+            ins.count("users_eliminated_exact", 2 * (exact_matches + remainder_matches))
+            ins.count("users_eliminated_greedy", eliminated_greedy)
         return best_txs
 
     def _handle_remainder(self, uid, remainder, is_debtor : bool, active_bals, d_map, c_map, d_list, c_list, heap, current_txs):
@@ -188,13 +244,15 @@ class HybridSolver():
         Steps:
         1. Check if there is an exact value left in the opposing side if so match them
         2. If no exact value then push in heap, map, list.
+
+        Returns ELIMINATED (nothing left), MATCHED (settled by an exact match) or PUSHED (back in the pool).
         """
         # If remainder is negligible / 0 don't run the whole function just return
         # Always executes once since one guy would have 0 remainder
         if remainder < 0.001:
             if uid in active_bals: 
                 del active_bals[uid]
-            return
+            return self.ELIMINATED
 
         # Identify Structures
         my_map = d_map if is_debtor else c_map
@@ -208,11 +266,11 @@ class HybridSolver():
             # If user with remainder is debtor and exact match with creditor is found
             # Then transaction to settle would be debtor pays mathced person with the rem
             if is_debtor: 
-                current_txs.append((uid, match_id, remainder))
+                current_txs.add(uid, match_id, remainder)
             # If user with rem is creditor and exact match with debtor is found
             # Then transaction to settle would be matched person pays creditor with the rem
             else:         
-                current_txs.append((match_id, uid, remainder))
+                current_txs.add(match_id, uid, remainder)
             
             # Cleanup Maps 
             if uid in active_bals: 
@@ -221,6 +279,7 @@ class HybridSolver():
                 del active_bals[match_id]
             if not other_map[remainder]: 
                 del other_map[remainder]
+            return self.MATCHED
         else:
             # Add back to System (All structures)
             if is_debtor: 
@@ -230,4 +289,5 @@ class HybridSolver():
             
             my_map[remainder].add(uid)
             my_list.append(uid)           
-            heapq.heappush(heap, (-remainder, uid)) 
\ No newline at end of file
+            heapq.heappush(heap, (-remainder, uid))
+            return self.PUSHED 
\ No newline at end of file
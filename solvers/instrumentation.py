@@ -0,0 +1,111 @@
+import time
+from contextlib import contextmanager, nullcontext
+from collections import defaultdict
+
+# Solver instrumentation hooks.
+# Solvers have a class level `instrumentation = NULL`, harnesses (main.py, benchmark.py) swap in a real
+# Instrumentation on the instance when they want phase timings / counters / progress:
+#
+#   ins = Instrumentation(progress=tqdm_progress("Hybrid"))
+#   solver.instrumentation = ins
+#   solver.solve(balances)
+#   ins.summary()            -> {"phases": {name: seconds}, "counters": {name: value}}
+#   chrome_trace({name: ins.events})  -> chrome://tracing / Perfetto JSON
+#
+# Disabled (NULL) every hook is a no-op, hot loops additionally check `ins.enabled` before touching the clock.
+
+class Instrumentation:
+    """
+    Collects phase timings (aggregated + one trace event per phase call), counters and progress for one solver.
+    If a utils.memory_tracker.MemoryTracker is passed, every phase is also a memory phase.
+    """
+    enabled = True
+
+    def __init__(self, progress=None, memory_tracker=None):
+        self.progress_callback = progress
+        self.memory_tracker = memory_tracker
+        self.phases = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.events = []
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        mem = self.memory_tracker.phase(name) if self.memory_tracker is not None else nullcontext()
+        with mem:
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                end = time.perf_counter()
+                self.phases[name] += end - start
+                self.events.append({"name": name, "ph": "X", "ts": round((start - self._origin) * 1e6, 3),
+                                    "dur": round((end - start) * 1e6, 3)})
+
+    def add_time(self, name, seconds):
+        """Aggregated time only (no trace event), for phases that run thousands of times inside a loop."""
+        self.phases[name] += seconds
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def progress(self, done, total):
+        if self.progress_callback is not None:
+            self.progress_callback(done, total)
+
+    def summary(self):
+        return {"phases": {k: round(v, 6) for k, v in self.phases.items()}, "counters": dict(self.counters)}
+
+class _NullInstrumentation:
+    """Shared do nothing instance, the default on every solver."""
+    enabled = False
+    _ctx = nullcontext()
+
+    def phase(self, name):
+        return self._ctx
+
+    def add_time(self, name, seconds):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+    def progress(self, done, total):
+        pass
+
+    def summary(self):
+        return {"phases": {}, "counters": {}}
+
+NULL = _NullInstrumentation()
+
+def tqdm_progress(desc=None):
+    """
+    Progress callback backed by a tqdm bar (what HybridSolver used to print unconditionally).
+    """
+    from tqdm import tqdm
+    bar = {}
+
+    def callback(done, total):
+        if "bar" not in bar:
+            bar["bar"] = tqdm(total=total, desc=desc)
+        b = bar["bar"]
+        b.update(done - b.n)
+        if done >= total:
+            b.close()
+    return callback
+
+def chrome_trace(traces, counters=None):
+    """
+    Builds a Chrome trace (chrome://tracing, Perfetto) dict from {solver name: events}, one thread per solver.
+    counters: optional {solver name: {counter: value}} written as counter events at the end of each solver track.
+    """
+    out = [{"name": "process_name", "ph": "M", "pid": 1, "tid": 0, "args": {"name": "solvers"}}]
+    for tid, (name, events) in enumerate(traces.items(), start=1):
+        out.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}})
+        end = 0.0
+        for e in events:
+            out.append({**e, "pid": 1, "tid": tid})
+            end = max(end, e["ts"] + e.get("dur", 0))
+        for cname, value in (counters or {}).get(name, {}).items():
+            out.append({"name": f"{name}: {cname}", "ph": "C", "pid": 1, "tid": tid, "ts": end, "args": {cname: value}})
+    return {"traceEvents": out, "displayTimeUnit": "ms"}
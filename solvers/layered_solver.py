@@ -1,6 +1,8 @@
 from typing import Dict, List, Tuple
 from collections import defaultdict
 from .simple_greedy_solver import SimpleGreedySolver
+from .instrumentation import NULL
+from models.settlement_plan import SettlementPlan
 
 # Inspired by this thesis paper 
 # https://dash.harvard.edu/server/api/core/bitstreams/bf76bfed-1f76-4d7f-837b-a5828232d539/content
@@ -19,35 +21,69 @@ class LayeredSolver():
     converted into these algos. Moreover, converting the data so that I can use these algos was also a big challenge.
     Unlike leetcode, I can't reuse a value once and I also have duplicates. So, I had to ensure multiple Data Structs
     work simultaneously.
+
+    With exact_threshold set, groups (or greedy leftovers) of at most that many users are solved optimally by
+    solvers/small_exact.py instead.
+
+    Instrumentation (solvers/instrumentation.py): phases k2 / k3 / k4 / exact / greedy, counters groups_k* and
+    users_eliminated_k* per layer plus exact_users / greedy_users for whatever is left after the layers.
     """
-    def __init__(self, k4=True):
+    instrumentation = NULL
+    # Max-Max greedy for the fallback and for settling each k3 / k4 group. It keeps no state between solve() calls,
+    # so one shared instance instead of a new object per group
+    _greedy = SimpleGreedySolver(strategy='max')
+
+    def __init__(self, k4=True, exact_threshold=0):
         self.k4 = k4
+        # Whole groups / greedy leftovers of <= exact_threshold users are solved exactly instead (small_exact.py), 0 = never
+        self.exact_threshold = exact_threshold
 
-    def solve(self, net_balances: Dict[int, float]) -> List[Tuple[int, int, float]]:
+    def solve(self, net_balances: Dict[int, float]) -> SettlementPlan:
+        ins = self.instrumentation
         pool = {userId: bal for userId, bal in net_balances.items() if abs(bal) > 0}
-        transactions = []
+        transactions = SettlementPlan()
+        if self.exact_threshold and len(pool) <= self.exact_threshold:
+            return self._solve_exact(pool)
         
         # EXACT PAIRS (k=2) Removes simple 1 to 1 matches
-        txs_k2 = self._solve_k2(pool)
-        transactions.extend(txs_k2)
-        
         # EXACT TRIPLES (k=3) Removes 3 person zero sum loops
-        txs_k3 = self._solve_k3(pool)
-        transactions.extend(txs_k3)
-        
         # EXACT QUADS (k=4) Removes 4 person zero sum loops
+        layers = [(2, self._solve_k2), (3, self._solve_k3)]
         if self.k4:
-            transactions.extend(self._solve_k4(pool))
+            layers.append((4, self._solve_k4))
+
+        # Each layer updates pool in place, so the users eliminated per k is just the change in pool size
+        for k, layer in layers:
+            before = len(pool)
+            # Fewer than k users left can't form a k group (saves the setup on tiny pools, e.g. batch groups)
+            if before >= k:
+                with ins.phase(f"k{k}"):
+                    transactions.extend(layer(pool))
+            ins.count(f"groups_k{k}", (before - len(pool)) // k)
+            ins.count(f"users_eliminated_k{k}", before - len(pool))
+
+        # EXACT LEFTOVERS: small enough remainder is solved optimally instead of by greedy
+        if pool and len(pool) <= self.exact_threshold:
+            ins.count("exact_users", len(pool))
+            with ins.phase("exact"):
+                transactions.extend(self._solve_exact(pool))
+            pool = {}
 
         # GREEDY FALLBACK
         if pool:
+            ins.count("greedy_users", len(pool))
             # Pass the remaining dict to the custom Max-Max Greedy solver
-            greedy = SimpleGreedySolver(strategy='max')
-            cleanup_txs = greedy.solve(pool)
+            with ins.phase("greedy"):
+                cleanup_txs = self._greedy.solve(pool)
             transactions.extend(cleanup_txs)
             
         return transactions
 
+    def _solve_exact(self, pool: Dict[int, float]) -> SettlementPlan:
+        # Imported here so the numpy backed engine only loads when exact_threshold is used
+        from .small_exact import solve_small
+        return solve_small(pool)
+
     def _solve_k2(self, pool: Dict[int, float]) -> List[Tuple]:
         """
         Finds all A + B = 0 pairs.
@@ -74,8 +110,7 @@ class LayeredSolver():
                 # Remove from pool
                 del pool[d]
                 del pool[c]
-                
-        # print("2 cycles ", len(txs))
+
         return txs
 
     def _solve_k3(self, pool: Dict[int, float]) -> List[Tuple]:
@@ -118,7 +153,7 @@ class LayeredSolver():
                     # Resolve this closed group locally using Greedy
                     # Doing this because we don't know if there are 2 creditors or 2 debtors
                     sub_bal = {u: pool[u] for u in group}
-                    sub_txs = SimpleGreedySolver(strategy='max').solve(sub_bal)
+                    sub_txs = self._greedy.solve(sub_bal)
                     txs.extend(sub_txs)
                     
                     # Update used, using update since it allows me to add more than 1 element in the set
@@ -129,7 +164,6 @@ class LayeredSolver():
         for u in used:
             del pool[u]
 
-        # print("3 cycles ", len(txs))
         return txs
     
     def _solve_k4(self, pool: Dict[int, float]) -> List[Tuple]:
@@ -185,7 +219,7 @@ class LayeredSolver():
                             # Execute using greedy logic on just this group
                             # A quad can be solved in 3 transactions optimally
                             sub_bal = {u: pool[u] for u in group}
-                            sub_txs = SimpleGreedySolver(strategy='max').solve(sub_bal)
+                            sub_txs = self._greedy.solve(sub_bal)
                             txs.extend(sub_txs)
                             
                             used.update(group)
@@ -196,5 +230,4 @@ class LayeredSolver():
             if u in pool: 
                 del pool[u]
             
-        # print("4 cycles ", len(txs))
         return txs
\ No newline at end of file
@@ -1,5 +1,6 @@
 import pulp
-from typing import Dict, List, Tuple
+from typing import Dict
+from models.settlement_plan import SettlementPlan
 
 class MilpSolver():
     """
@@ -22,14 +23,22 @@ class MilpSolver():
         4. max sum of z <= num of debtors + num of creditors - 1
 
     """
-    def __init__(self, time_limit=60):
+    def __init__(self, time_limit=60, exact_threshold=0):
         self.time_limit = time_limit
+        # Groups of <= exact_threshold active users skip the model and go to the bitmask DP (small_exact.py),
+        # same optimum without the model build / solver start up. 0 = always build the model (default, so the
+        # "Exact MILP" benchmarks time the MILP)
+        self.exact_threshold = exact_threshold
 
-    def solve(self, net_balances: Dict[int, float]) -> List[Tuple[int, int, float]]:
+    def solve(self, net_balances: Dict[int, float]) -> SettlementPlan:
+        # Tiny groups go to the exact engine (solvers/small_exact.py), imported here so it only costs when used
+        if self.exact_threshold and sum(1 for b in net_balances.values() if b != 0) <= self.exact_threshold:
+            from .small_exact import solve_small
+            return solve_small(net_balances)
         debtors = [u for u, b in net_balances.items() if b < 0]
         creditors = [u for u, b in net_balances.items() if b > 0]
         if not debtors or not creditors: 
-            return []
+            return SettlementPlan()
 
         # print(net_balances)
         # print(debtors)
@@ -72,7 +81,7 @@ class MilpSolver():
         solver = pulp.PULP_CBC_CMD(msg=False, timeLimit=self.time_limit)
         prob.solve(solver)
         
-        results = []
+        results = SettlementPlan()
         if pulp.LpStatus[prob.status] in ["Optimal", "Feasible"]:
             for d in debtors:
                 for c in creditors:
@@ -80,6 +89,6 @@ class MilpSolver():
                     if val_z and val_z > 0.5:
                         amt = pulp.value(x[d][c])
                         if amt and amt > 0.001:
-                            results.append((d, c, round(amt, 2)))
+                            results.add(d, c, amt)
                             
         return results
\ No newline at end of file
@@ -1,6 +1,7 @@
 import gurobipy as gp
 from gurobipy import GRB
-from typing import Dict, List, Tuple
+from typing import Dict
+from models.settlement_plan import SettlementPlan
 
 class MilpSolverGurobi():
     """
@@ -22,15 +23,23 @@ class MilpSolverGurobi():
     
     Using Gurobi here (Thanks to Prof. Mackey for letting us know about this optimiser.)
     """
-    def __init__(self, time_limit=60):
+    def __init__(self, time_limit=60, exact_threshold=0):
         self.time_limit = time_limit
-
-    def solve(self, net_balances: Dict[int, float]) -> List[Tuple[int, int, float]]:
+        # Groups of <= exact_threshold active users skip the model and go to the bitmask DP (small_exact.py),
+        # same optimum without the model build / solver start up. 0 = always build the model (default, so the
+        # "Exact MILP" benchmarks time the MILP)
+        self.exact_threshold = exact_threshold
+
+    def solve(self, net_balances: Dict[int, float]) -> SettlementPlan:
+        # Tiny groups go to the exact engine (solvers/small_exact.py), imported here so it only costs when used
+        if self.exact_threshold and sum(1 for b in net_balances.values() if b != 0) <= self.exact_threshold:
+            from .small_exact import solve_small
+            return solve_small(net_balances)
         debtors = [u for u, b in net_balances.items() if b < -0.001]
         creditors = [u for u, b in net_balances.items() if b > 0.001]
         
         if not debtors or not creditors:
-            return []
+            return SettlementPlan()
 
         # First four lines are for supressing output taken from
         # https://support.gurobi.com/hc/en-us/articles/360044784552-How-do-I-suppress-all-console-output-from-Gurobi
@@ -99,7 +108,7 @@ class MilpSolverGurobi():
                 # print(model.Status)
                 # print(model.SolCount)
 
-                results = []
+                results = SettlementPlan()
                 if model.SolCount > 0:
                     for d in debtors:
                         for c in creditors:
@@ -107,6 +116,6 @@ class MilpSolverGurobi():
                             if z_val > 0.5:
                                 amt = x[d, c].X
                                 if amt > 0.001:
-                                    results.append((d, c, round(amt, 2)))
+                                    results.add(d, c, amt)
                             
         return results
\ No newline at end of file
@@ -0,0 +1,262 @@
+import os
+import time
+import heapq
+import shutil
+import tempfile
+import numpy as np
+from typing import Dict
+from .instrumentation import NULL
+from models.settlement_plan import SettlementPlan
+from models.snapshot import RECORD
+
+# Out of core settlement for balance vectors that don't fit in memory as a {user: balance} dict.
+#
+# Input is a memory mapped int64 .npy of balances in cents (index = user id, write_balances() makes one), output is a
+# plan file of packed (payer int32, payee int32, cents int64) records, same layout as a snapshot / SettlementPlan.
+# Everything in between is a streaming pass over files, so memory is bounded by chunk_size, not N:
+#
+#   1. split:  read the balances chunk by chunk, each chunk's debtors / creditors sorted by amount (largest first)
+#              and written as a sorted run file
+#   2. merge:  external sort, heapq.merge of the runs into one sorted debtor file and one sorted creditor file
+#   3. k2:     merge join of the two sorted files, a debtor and a creditor with the same amount settle in one
+#              transaction (LayeredSolver's k2 layer / the greedy's exact match phase). The rest stays sorted.
+#   4. greedy: max-max over the leftovers, the largest debtor pays the largest creditor and the remainder goes
+#              back into an in memory heap next to the stream. The heap is capped at chunk_size entries (past that
+#              the remainder stays at the head of its side, i.e. a plain two pointer merge), so memory stays bounded.
+#              SimpleGreedySolver additionally matches remainders against every unsettled amount of the other side
+#              (dict lookup), which can't be done on a stream, so expect ~5-20% more transactions than in memory.
+
+# Balances per split chunk (also the buffer size of the plan / sorted file writers)
+CHUNK_SIZE = 1 << 20
+# Smallest read buffer per run during the merge
+MIN_MERGE_BUFFER = 4096
+
+RUN = np.dtype([("key", "<i8"), ("user", "<i8")])
+
+def write_balances(path, balances, size=0):
+    """{user: balance} dict or a per user sequence (floats, currency units) -> int64 cents .npy at path."""
+    if isinstance(balances, dict):
+        size = max(size, max(balances) + 1 if balances else 0)
+        out = np.lib.format.open_memmap(path, mode="w+", dtype="<i8", shape=(size,))
+        out[:] = 0
+        users = np.fromiter(balances.keys(), dtype=np.int64, count=len(balances))
+        out[users] = np.rint(np.fromiter(balances.values(), dtype=np.float64, count=len(balances)) * 100)
+    else:
+        values = np.asarray(balances, dtype=np.float64)
+        out = np.lib.format.open_memmap(path, mode="w+", dtype="<i8", shape=(max(size, len(values)),))
+        out[len(values):] = 0
+        for start in range(0, len(values), CHUNK_SIZE):
+            out[start:start + CHUNK_SIZE] = np.rint(values[start:start + CHUNK_SIZE] * 100)
+    out.flush()
+    return path
+
+def load_plan(path) -> SettlementPlan:
+    """Plan file -> SettlementPlan (has to fit in memory, iter_plan streams it instead)."""
+    records = np.fromfile(path, dtype=RECORD)
+    return SettlementPlan.from_arrays(records["payer"], records["payee"], records["cents"])
+
+def iter_plan(path, chunk_size=CHUNK_SIZE):
+    """Plan file as SettlementPlan chunks of up to chunk_size transactions."""
+    records = np.memmap(path, dtype=RECORD, mode="r") if os.path.getsize(path) else np.zeros(0, dtype=RECORD)
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        yield SettlementPlan.from_arrays(chunk["payer"], chunk["payee"], chunk["cents"])
+
+class _Writer:
+    """Buffered appender of fixed dtype rows to a binary file."""
+    def __init__(self, path, dtype, buffer_size=CHUNK_SIZE):
+        self.f = open(path, "wb")
+        self.buffer = np.empty(buffer_size, dtype=dtype)
+        self.fill = 0
+        self.count = 0
+
+    def add(self, row):
+        self.buffer[self.fill] = row
+        self.fill += 1
+        if self.fill == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        if self.fill:
+            self.f.write(self.buffer[:self.fill].tobytes())
+            self.count += self.fill
+            self.fill = 0
+
+    def close(self):
+        self.flush()
+        self.f.close()
+
+def _iter_run(path, buffer_size=CHUNK_SIZE):
+    """(key, user) tuples of a sorted run / side file, read buffer_size rows at a time."""
+    if not os.path.getsize(path):
+        return
+    rows = np.memmap(path, dtype=RUN, mode="r")
+    for start in range(0, len(rows), buffer_size):
+        chunk = rows[start:start + buffer_size]
+        yield from zip(chunk["key"].tolist(), chunk["user"].tolist())
+    del rows
+
+class OutOfCoreSolver:
+    """
+    Streaming k2 + max-max greedy over sorted files (see the top of the file).
+    solve_file(balances .npy, plan path) is the out of core entry point, solve(dict) is the usual solver interface
+    (goes through temporary files, only useful for testing / comparing against the in memory solvers).
+
+    Instrumentation (solvers/instrumentation.py): phases split / merge / k2 / greedy, counters runs, k2_pairs,
+    greedy_transactions.
+    """
+    instrumentation = NULL
+
+    def __init__(self, chunk_size=CHUNK_SIZE, work_dir=None):
+        self.chunk_size = chunk_size
+        # Where the sorted runs go (None = a temp dir next to the plan file), removed after every solve
+        self.work_dir = work_dir
+
+    def solve(self, net_balances: Dict[int, float]) -> SettlementPlan:
+        with tempfile.TemporaryDirectory(dir=self.work_dir) as tmp:
+            balances = write_balances(os.path.join(tmp, "balances.npy"), net_balances)
+            plan_path = os.path.join(tmp, "plan.bin")
+            self.solve_file(balances, plan_path)
+            return load_plan(plan_path)
+
+    def solve_file(self, balances_path, plan_path) -> dict:
+        """
+        Settles the int64 cents balances in balances_path (.npy, memory mapped), writes the plan to plan_path.
+        Returns stats: users, debtors, creditors, runs, k2_pairs, transactions, elapsed_s.
+        """
+        start = time.perf_counter()
+        ins = self.instrumentation
+        balances = np.load(balances_path, mmap_mode="r")
+        work = tempfile.mkdtemp(prefix="ooc_", dir=self.work_dir or os.path.dirname(os.path.abspath(plan_path)))
+        try:
+            with ins.phase("split"):
+                debtor_runs, creditor_runs, total = self._split(balances, work)
+            if total != 0:
+                raise ValueError(f"balances don't sum to zero ({total} cents)")
+            ins.count("runs", len(debtor_runs) + len(creditor_runs))
+            with ins.phase("merge"):
+                debtors, n_debtors = self._merge(debtor_runs, os.path.join(work, "debtors.bin"))
+                creditors, n_creditors = self._merge(creditor_runs, os.path.join(work, "creditors.bin"))
+
+            plan = _Writer(plan_path, RECORD, self.chunk_size)
+            try:
+                with ins.phase("k2"):
+                    rest_d, rest_c, pairs = self._k2(debtors, creditors, work, plan)
+                ins.count("k2_pairs", pairs)
+                with ins.phase("greedy"):
+                    self._greedy(rest_d, rest_c, plan)
+            finally:
+                plan.close()
+            ins.count("greedy_transactions", plan.count - pairs)
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+        return {"users": len(balances), "debtors": n_debtors, "creditors": n_creditors,
+                "runs": len(debtor_runs) + len(creditor_runs), "k2_pairs": pairs, "transactions": plan.count,
+                "elapsed_s": time.perf_counter() - start}
+
+    def _split(self, balances, work):
+        """Sorted run files per chunk. Keys sort ascending = largest amount first: cents for debtors, -cents for creditors."""
+        debtor_runs, creditor_runs, total = [], [], 0
+        for i, start in enumerate(range(0, len(balances), self.chunk_size)):
+            cents = np.asarray(balances[start:start + self.chunk_size])
+            users = np.arange(start, start + len(cents), dtype=np.int64)
+            total += int(cents.sum())
+            for mask, key, runs, side in ((cents < 0, cents, debtor_runs, "d"), (cents > 0, -cents, creditor_runs, "c")):
+                if not mask.any():
+                    continue
+                rows = np.empty(int(mask.sum()), dtype=RUN)
+                rows["key"], rows["user"] = key[mask], users[mask]
+                rows = rows[np.lexsort((rows["user"], rows["key"]))]
+                path = os.path.join(work, f"run_{side}_{i}.bin")
+                rows.tofile(path)
+                runs.append(path)
+        return debtor_runs, creditor_runs, total
+
+    def _merge(self, runs, path):
+        """External merge of sorted runs into path. Returns (path, rows)."""
+        if len(runs) == 1:
+            return runs[0], os.path.getsize(runs[0]) // RUN.itemsize
+        out = _Writer(path, RUN, self.chunk_size)
+        # Read buffers split the chunk budget between the runs
+        buffer_size = max(MIN_MERGE_BUFFER, self.chunk_size // max(1, len(runs)))
+        for row in heapq.merge(*(_iter_run(r, buffer_size) for r in runs)):
+            out.add(row)
+        out.close()
+        for r in runs:
+            os.remove(r)
+        return path, out.count
+
+    def _k2(self, debtors, creditors, work, plan):
+        """Merge join on amount: equal amounts settle pairwise, the rest goes to still sorted leftover files."""
+        rest_d = _Writer(os.path.join(work, "rest_d.bin"), RUN, self.chunk_size)
+        rest_c = _Writer(os.path.join(work, "rest_c.bin"), RUN, self.chunk_size)
+        d_iter, c_iter = _iter_run(debtors, self.chunk_size), _iter_run(creditors, self.chunk_size)
+        d, c = next(d_iter, None), next(c_iter, None)
+        pairs = 0
+        while d is not None and c is not None:
+            # Debtor key is -amount, creditor key is -amount: same key = same amount
+            if d[0] == c[0]:
+                plan.add((d[1], c[1], -d[0]))
+                pairs += 1
+                d, c = next(d_iter, None), next(c_iter, None)
+            elif d[0] < c[0]:
+                rest_d.add(d)
+                d = next(d_iter, None)
+            else:
+                rest_c.add(c)
+                c = next(c_iter, None)
+        while d is not None:
+            rest_d.add(d)
+            d = next(d_iter, None)
+        while c is not None:
+            rest_c.add(c)
+            c = next(c_iter, None)
+        rest_d.close()
+        rest_c.close()
+        return rest_d.f.name, rest_c.f.name, pairs
+
+    def _greedy(self, debtors, creditors, plan):
+        """Largest debtor pays largest creditor, remainders go back in (see _Side), until one side runs out."""
+        d_side, c_side = _Side(debtors, self.chunk_size), _Side(creditors, self.chunk_size)
+        while True:
+            d, c = d_side.pop(), c_side.pop()
+            if d is None or c is None:
+                return
+            amt = min(d[0], c[0])
+            plan.add((d[1], c[1], amt))
+            if d[0] > amt:
+                d_side.push(d[0] - amt, d[1])
+            elif c[0] > amt:
+                c_side.push(c[0] - amt, c[1])
+
+class _Side:
+    """
+    One side of the greedy: the sorted leftover file (streamed) + an in memory max heap of partially paid users.
+    pop() gives the largest of the two as (amount, user), so it's max-max like SimpleGreedySolver. The heap is capped
+    at max_heap entries, past that a remainder is just handed out by the next pop() (plain two pointer merge).
+    """
+    def __init__(self, path, max_heap):
+        self.stream = _iter_run(path, max_heap)
+        self.head = next(self.stream, None)
+        self.heap = []
+        self.max_heap = max_heap
+        self.carry = None
+
+    def pop(self):
+        if self.carry is not None:
+            out, self.carry = self.carry, None
+            return out
+        # Keys are -amount, so the smaller key is the larger amount
+        if self.heap and (self.head is None or self.heap[0][0] <= self.head[0]):
+            key, user = heapq.heappop(self.heap)
+        elif self.head is not None:
+            (key, user), self.head = self.head, next(self.stream, None)
+        else:
+            return None
+        return -key, user
+
+    def push(self, amount, user):
+        if len(self.heap) < self.max_heap:
+            heapq.heappush(self.heap, (-amount, user))
+        else:
+            self.carry = (amount, user)
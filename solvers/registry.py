@@ -0,0 +1,93 @@
+import importlib
+import importlib.util
+from typing import Dict, Optional, Tuple
+
+# Solver registry: class name -> where it lives + what it is, without importing anything.
+# The solver module (and its backend: pulp, gurobipy) is only imported the first time the class is asked for,
+# so greedy only workers never pay for the MILP imports and a host without Gurobi can still run everything else.
+#
+#   create_solver("SimpleGreedySolver", strategy="max")   -> instance (imports simple_greedy_solver only)
+#   get_solver("MilpSolverGurobi")                        -> class, or SolverUnavailableError if gurobipy is missing
+#   unavailable_solvers()                                 -> {"MilpSolverGurobi": "missing package(s): gurobipy"}
+
+class SolverUnavailableError(ImportError):
+    """Raised when a registered solver can't be loaded (backend package not installed / fails to import)."""
+
+class SolverInfo:
+    """
+    Capability metadata for one solver.
+    kind: "exact" (optimal, MILP) or "heuristic".
+    max_n: largest active N the solver is recommended for (None = no limit), same limits main.py used to hard code.
+    requires: third party packages the module imports at the top.
+    """
+    def __init__(self, name: str, module: str, kind: str, max_n: Optional[int] = None, requires: Tuple[str, ...] = ()):
+        self.name = name
+        self.module = module
+        self.kind = kind
+        self.max_n = max_n
+        self.requires = requires
+        self._cls = None
+        self._error = None
+
+    def missing_packages(self):
+        # find_spec only looks the package up on sys.path, it doesn't import it
+        return [pkg for pkg in self.requires if importlib.util.find_spec(pkg) is None]
+
+    def unavailable_reason(self) -> Optional[str]:
+        """None if the solver can be loaded, otherwise why not."""
+        if self._error is not None:
+            return self._error
+        missing = self.missing_packages()
+        return f"missing package(s): {', '.join(missing)}" if missing else None
+
+    @property
+    def available(self) -> bool:
+        return self.unavailable_reason() is None
+
+    def load(self):
+        if self._cls is None:
+            reason = self.unavailable_reason()
+            if reason is not None:
+                raise SolverUnavailableError(f"{self.name} is unavailable ({reason})")
+            try:
+                module = importlib.import_module(f"{__package__}.{self.module}")
+            except ImportError as e:
+                # Installed but broken (e.g. a gurobipy without its native library), remember it so we only try once
+                self._error = f"{type(e).__name__}: {e}"
+                raise SolverUnavailableError(f"{self.name} is unavailable ({self._error})") from e
+            self._cls = getattr(module, self.name)
+        return self._cls
+
+    def __repr__(self):
+        return f"SolverInfo({self.name!r}, kind={self.kind!r}, max_n={self.max_n}, requires={list(self.requires)})"
+
+REGISTRY: Dict[str, SolverInfo] = {info.name: info for info in [
+    SolverInfo("SimpleGreedySolver", "simple_greedy_solver", "heuristic"),
+    SolverInfo("LayeredSolver", "layered_solver", "heuristic"),
+    SolverInfo("HybridSolver", "hybrid_solver", "heuristic", max_n=9999),
+    SolverInfo("MilpSolver", "milp_solver", "exact", max_n=400, requires=("pulp",)),
+    SolverInfo("MilpSolverGurobi", "milp_solver_gurobi", "exact", max_n=500, requires=("gurobipy",)),
+    SolverInfo("SmallExactSolver", "small_exact", "exact", max_n=12, requires=("numpy",)),
+    SolverInfo("OutOfCoreSolver", "out_of_core", "heuristic", requires=("numpy",)),
+]}
+
+def solver_info(name: str) -> SolverInfo:
+    try:
+        return REGISTRY[name]
+    except KeyError:
+        raise KeyError(f"Unknown solver {name!r}, registered: {sorted(REGISTRY)}") from None
+
+def get_solver(name: str):
+    """Solver class by name, importing its module on first use."""
+    return solver_info(name).load()
+
+def create_solver(name: str, **params):
+    return get_solver(name)(**params)
+
+def available_solvers(kind: Optional[str] = None):
+    """Names of the solvers that can be loaded on this host (optionally only "exact" / "heuristic" ones)."""
+    return [n for n, info in REGISTRY.items() if info.available and (kind is None or info.kind == kind)]
+
+def unavailable_solvers() -> Dict[str, str]:
+    """{name: reason} for every registered solver that can't be loaded here."""
+    return {n: reason for n, info in REGISTRY.items() if (reason := info.unavailable_reason()) is not None}
@@ -1,6 +1,7 @@
 import heapq
-from typing import Dict, List, Tuple
+from typing import Dict
 from collections import defaultdict
+from models.settlement_plan import SettlementPlan
 
 class SimpleGreedySolver:
     """
@@ -12,11 +13,17 @@ class SimpleGreedySolver:
         - Phase B: Greedy Match.
             - Pick MAX/MIN Debtor/Creditor.    
     """
-    def __init__(self, strategy='max'):
+    def __init__(self, strategy='max', exact_threshold=0):
         self.strategy = strategy
+        # Groups of <= exact_threshold active users are solved exactly instead (small_exact.py), 0 = never
+        self.exact_threshold = exact_threshold
 
-    def solve(self, net_balances: Dict[int, float]) -> List[Tuple[int, int, float]]:
-        transactions = []
+    def solve(self, net_balances: Dict[int, float]) -> SettlementPlan:
+        # Tiny groups go to the exact engine (solvers/small_exact.py), imported here so it only costs when used
+        if self.exact_threshold and sum(1 for b in net_balances.values() if b != 0) <= self.exact_threshold:
+            from .small_exact import solve_small
+            return solve_small(net_balances)
+        transactions = SettlementPlan()
 
         # Setup Active Balances (Filter zero)
         active_bals = {userId: bal for userId, bal in net_balances.items() if bal != 0.0}
@@ -40,7 +47,7 @@ class SimpleGreedySolver:
             while debtor_map[amt] and creditor_map[amt]:
                 d = debtor_map[amt].pop()
                 c = creditor_map[amt].pop()
-                transactions.append((d, c, amt))
+                transactions.add(d, c, amt)
 
                 # Cleanup of users as they are done now
                 del active_bals[d]
@@ -101,7 +108,7 @@ class SimpleGreedySolver:
 
             # Amount net off in this transaction will be the lower of the both obviously
             amt = min(debtor_val, creditor_val)
-            transactions.append((debtor_id, creditor_id, amt))
+            transactions.add(debtor_id, creditor_id, amt)
             
             # Cleanup maps, using discard as it doesn't raise key error if key doesn not exist
             if debtor_val in debtor_map: 
@@ -143,9 +150,9 @@ class SimpleGreedySolver:
             
             # Create Transaction
             if is_debtor:
-                transactions.append((uid, match_id, remainder)) # Debtor pays Match
+                transactions.add(uid, match_id, remainder) # Debtor pays Match
             else:
-                transactions.append((match_id, uid, remainder)) # Match pays Creditor
+                transactions.add(match_id, uid, remainder) # Match pays Creditor
             
             # Cleanup Match
             del active_bals[uid]
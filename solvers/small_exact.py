@@ -0,0 +1,236 @@
+import os
+import hashlib
+import numpy as np
+from typing import Dict, List, Tuple
+from models.settlement_plan import SettlementPlan
+
+# Exact engine for tiny groups (up to MAX_N active users).
+#
+# Min number of transactions = N - (max number of disjoint zero sum subsets the group can be split into),
+# each zero sum subset of k people settles in k - 1 transactions. The split is found with a bitmask DP over all
+# 2^N subsets (memoized sums + best split per subset), so it's exact and for N <= 8 well under a millisecond.
+#
+# Results are keyed by the canonical signature = sorted balances in integer cents, so {7: -5, 3: 2, 9: 3} and
+# {1: 3, 2: -5, 4: 2} are the same problem. Solutions are stored as positions in the signature and mapped back
+# to user ids on the way out. Lookups go:
+#   1. in process memo dict (signature -> solution)
+#   2. on disk table (TABLE_PATH), mmap'd at startup: sorted 64 bit hashes + fixed width solution records
+#   3. DP, result goes to the memo (SmallExactEngine.save() merges the memo into the on disk table)
+# Solvers delegating through solve_small() only fill the memo: main.py and the benchmark workers call save_engine()
+# when they're done, SmallExactSolver(save_table=True) saves after every solve.
+
+# DP is 2^N * N, 12 is ~50k steps (tens of ms in python), past that use the MILP
+MAX_N = 12
+TABLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "artifacts", "small_exact_table.bin")
+
+_MAGIC = b"SMEX"
+_VERSION = 1
+_HEADER = np.dtype([("magic", "S4"), ("version", "<u4"), ("max_n", "<u4"), ("count", "<u4")])
+_RECORD = np.dtype([("n", "u1"), ("ntx", "u1"), ("key", "<i8", (MAX_N,)),
+                    ("src", "u1", (MAX_N - 1,)), ("dst", "u1", (MAX_N - 1,)), ("amt", "<i8", (MAX_N - 1,))])
+
+def signature(net_balances: Dict[int, float]):
+    """(sorted cents tuple, user ids in the same order), zero balances dropped."""
+    items = sorted((round(b * 100), u) for u, b in net_balances.items() if round(b * 100) != 0)
+    return tuple(c for c, _ in items), [u for _, u in items]
+
+def _hash(sig) -> int:
+    return int.from_bytes(hashlib.blake2b(np.asarray(sig, dtype="<i8").tobytes(), digest_size=8).digest(), "little")
+
+def _settle(positions, values):
+    """One zero sum subset in len - 1 transactions: largest debtor pays largest creditor until both lists are empty."""
+    debtors = sorted((values[p], p) for p in positions if values[p] < 0)
+    creditors = sorted(((values[p], p) for p in positions if values[p] > 0), reverse=True)
+    txs = []
+    i = j = 0
+    d_left, c_left = -debtors[0][0], creditors[0][0]
+    while i < len(debtors) and j < len(creditors):
+        amt = min(d_left, c_left)
+        txs.append((debtors[i][1], creditors[j][1], amt))
+        d_left -= amt
+        c_left -= amt
+        if d_left == 0:
+            i += 1
+            d_left = -debtors[i][0] if i < len(debtors) else 0
+        if c_left == 0:
+            j += 1
+            c_left = creditors[j][0] if j < len(creditors) else 0
+    return txs
+
+def solve_signature(sig) -> List[Tuple[int, int, int]]:
+    """
+    Exact solution for a cents signature as [(debtor position, creditor position, cents)].
+    sig has to sum to zero and have at most MAX_N entries.
+    """
+    n = len(sig)
+    if n > MAX_N:
+        raise ValueError(f"{n} users is past the exact engine's limit ({MAX_N})")
+    if sum(sig) != 0:
+        raise ValueError(f"balances don't sum to zero ({sum(sig)} cents)")
+    if n == 0:
+        return []
+
+    full = (1 << n) - 1
+    sums = [0] * (full + 1)
+    best = [0] * (full + 1)
+    for mask in range(1, full + 1):
+        low = mask & -mask
+        sums[mask] = sums[mask ^ low] + sig[low.bit_length() - 1]
+        # Best split of mask = best split of mask minus one person, +1 if mask itself closes a zero sum subset
+        b, m = 0, mask
+        while m:
+            bit = m & -m
+            if best[mask ^ bit] > b:
+                b = best[mask ^ bit]
+            m ^= bit
+        best[mask] = b + (sums[mask] == 0)
+
+    # Walk back down: every time the remaining set sums to zero again, what was removed since the last
+    # zero sum set is one subset of the optimal split
+    groups, mask, start = [], full, full
+    while mask:
+        target = best[mask] - (sums[mask] == 0)
+        m = mask
+        while m:
+            bit = m & -m
+            if best[mask ^ bit] == target:
+                break
+            m ^= bit
+        mask ^= bit
+        if sums[mask] == 0:
+            groups.append(start ^ mask)
+            start = mask
+
+    txs = []
+    for g in groups:
+        txs.extend(_settle([p for p in range(n) if g >> p & 1], sig))
+    return txs
+
+class SmallExactEngine:
+    """
+    Memo + mmap'd on disk table in front of solve_signature (see the top of the file).
+    """
+    def __init__(self, path=TABLE_PATH):
+        self.path = path
+        self.memo = {}
+        self._new = set()
+        self.hits = {"memo": 0, "table": 0, "solved": 0}
+        self._load()
+
+    def _load(self):
+        self._hashes = self._records = None
+        if not self.path or not os.path.exists(self.path):
+            return
+        header = np.fromfile(self.path, dtype=_HEADER, count=1)
+        if not len(header) or header["magic"][0] != _MAGIC or header["version"][0] != _VERSION or header["max_n"][0] != MAX_N:
+            # Other version / limit: ignore it, save() rewrites it
+            return
+        count = int(header["count"][0])
+        if count:
+            self._hashes = np.memmap(self.path, dtype="<u8", mode="r", offset=_HEADER.itemsize, shape=(count,))
+            self._records = np.memmap(self.path, dtype=_RECORD, mode="r", offset=_HEADER.itemsize + 8 * count, shape=(count,))
+
+    @property
+    def table_size(self):
+        return 0 if self._hashes is None else len(self._hashes)
+
+    def _from_table(self, sig):
+        if self._hashes is None:
+            return None
+        h = _hash(sig)
+        i = int(np.searchsorted(self._hashes, h))
+        while i < len(self._hashes) and int(self._hashes[i]) == h:
+            rec = self._records[i]
+            n = int(rec["n"])
+            if n == len(sig) and tuple(rec["key"][:n].tolist()) == sig:
+                k = int(rec["ntx"])
+                return list(zip(rec["src"][:k].tolist(), rec["dst"][:k].tolist(), rec["amt"][:k].tolist()))
+            i += 1
+        return None
+
+    def solve_signature(self, sig):
+        sol = self.memo.get(sig)
+        if sol is not None:
+            self.hits["memo"] += 1
+            return sol
+        sol = self._from_table(sig)
+        if sol is not None:
+            self.hits["table"] += 1
+        else:
+            sol = solve_signature(sig)
+            self.hits["solved"] += 1
+            self._new.add(sig)
+        self.memo[sig] = sol
+        return sol
+
+    def solve(self, net_balances: Dict[int, float]) -> SettlementPlan:
+        sig, users = signature(net_balances)
+        plan = SettlementPlan()
+        for d, c, cents in self.solve_signature(sig):
+            plan.add_cents(users[d], users[c], cents)
+        return plan
+
+    def save(self):
+        """Merges the signatures solved in this process into the on disk table (atomic rewrite). Returns the table size."""
+        if not self._new or not self.path:
+            return self.table_size
+        new = sorted(self._new)
+        rows = np.zeros(len(new), dtype=_RECORD)
+        for row, sig in zip(rows, new):
+            sol = self.memo[sig]
+            row["n"], row["ntx"] = len(sig), len(sol)
+            row["key"][:len(sig)] = sig
+            if sol:
+                row["src"][:len(sol)], row["dst"][:len(sol)], row["amt"][:len(sol)] = zip(*sol)
+        hashes = np.array([_hash(sig) for sig in new], dtype="<u8")
+        if self._hashes is not None:
+            hashes = np.concatenate([np.asarray(self._hashes), hashes])
+            rows = np.concatenate([np.asarray(self._records), rows])
+        order = np.argsort(hashes, kind="stable")
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Per process tmp name, parallel trials can save at the same time (last one to replace wins, it's a cache)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.array([(_MAGIC, _VERSION, MAX_N, len(hashes))], dtype=_HEADER).tofile(f)
+            hashes[order].tofile(f)
+            rows[order].tofile(f)
+        # Drop our maps before replacing the file (Windows won't replace a mapped file)
+        self._hashes = self._records = None
+        os.replace(tmp, self.path)
+        self._new.clear()
+        self._load()
+        return self.table_size
+
+_ENGINE = None
+
+def get_engine() -> SmallExactEngine:
+    """Process wide engine (table mmap'd on first use)."""
+    global _ENGINE
+    if _ENGINE is None:
+        _ENGINE = SmallExactEngine()
+    return _ENGINE
+
+def save_engine():
+    """Saves what the process wide engine solved to the on disk table, no op if nothing used it. Returns the table size."""
+    return _ENGINE.save() if _ENGINE is not None else None
+
+def solve_small(net_balances: Dict[int, float]) -> SettlementPlan:
+    """Exact solution through the process wide engine, for solvers delegating groups <= their exact_threshold."""
+    return get_engine().solve(net_balances)
+
+class SmallExactSolver:
+    """
+    Exact solver for groups of up to MAX_N active users (bitmask DP + signature table).
+    Same interface as the other solvers, raises ValueError for bigger groups.
+    """
+    def __init__(self, save_table=False):
+        # save_table: write newly solved signatures to the on disk table after every solve (handy for warm up runs)
+        self.save_table = save_table
+
+    def solve(self, net_balances: Dict[int, float]) -> SettlementPlan:
+        engine = get_engine()
+        txs = engine.solve(net_balances)
+        if self.save_table:
+            engine.save()
+        return txs
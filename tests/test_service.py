@@ -0,0 +1,121 @@
+import threading
+import unittest
+from service import start_background, SettlementClient, ServiceError
+
+# Drives service.py end to end through start_background + SettlementClient (one local process, a spawned pool).
+#   python -m pytest tests   or   python -m unittest tests.test_service   (from the repo root)
+
+def _settle_in_thread(port, results, key, **kwargs):
+    with SettlementClient(port=port) as client:
+        try:
+            results[key] = client.settle(**kwargs)
+        except ServiceError as e:
+            results[key] = e
+
+class SettlementServiceTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Wide batch window so concurrent requests reliably land in the same batch
+        cls.service = start_background(workers=1, batch_window_ms=300)
+        cls.client = SettlementClient(port=cls.service.port)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.close()
+        cls.service.stop()
+
+    def test_ingest_and_settle_group(self):
+        added = self.client.ingest("trip", [(1, 2, 30), (2, 3, 12.5), (3, 1, 4), (4, 4, 99)])
+        self.assertEqual(added["added"], 3)
+        res = self.client.settle("trip")
+        self.assertTrue(res["verified"])
+        self.assertEqual(res["count"], len(res["transactions"]))
+        # Net flow per user must match the ingested balances (payer +, payee -)
+        net = {1: 26.0, 2: -17.5, 3: -8.5}
+        for payer, payee, amount in res["transactions"]:
+            net[payer] += amount
+            net[payee] -= amount
+        self.assertTrue(all(abs(v) < 0.005 for v in net.values()))
+
+    def test_settle_inline_balances(self):
+        res = self.client.settle(balances={1: -5, 2: 3, 3: 2})
+        self.assertTrue(res["verified"])
+        self.assertEqual(res["count"], 2)
+
+    def test_bad_requests(self):
+        with self.assertRaises(ServiceError) as ctx:
+            self.client.settle(balances={1: -5, 2: 3})
+        self.assertEqual(ctx.exception.status, 400)
+        with self.assertRaises(ServiceError) as ctx:
+            self.client.settle("no such group")
+        self.assertEqual(ctx.exception.status, 400)
+
+    def test_user_id_range(self):
+        for bad in (-1, 2 ** 31):
+            with self.assertRaises(ServiceError) as ctx:
+                self.client.ingest("bad ids", [(bad, 2, 10)])
+            self.assertEqual(ctx.exception.status, 400)
+            self.assertIn("out of range", ctx.exception.message)
+            with self.assertRaises(ServiceError) as ctx:
+                self.client.settle(balances={bad: -5, 2: 5})
+            self.assertEqual(ctx.exception.status, 400)
+        # Nothing of the rejected requests was applied
+        with self.assertRaises(ServiceError):
+            self.client.settle("bad ids")
+
+    def test_sparse_user_ids(self):
+        sparse = 200_000_000
+        res = self.client.settle(balances={sparse: -5, 7: 3, 2 ** 31 - 1: 2})
+        self.assertTrue(res["verified"])
+        net = {sparse: -5.0, 7: 3.0, 2 ** 31 - 1: 2.0}
+        for payer, payee, amount in res["transactions"]:
+            net[payer] += amount
+            net[payee] -= amount
+        self.assertTrue(all(abs(v) < 0.005 for v in net.values()))
+
+    def test_deadline_exceeded(self):
+        with self.assertRaises(ServiceError) as ctx:
+            self.client.settle(balances={1: -5, 2: 3, 3: 2}, deadline_ms=0)
+        self.assertEqual(ctx.exception.status, 504)
+        self.assertGreaterEqual(self.client.metrics()["deadline_exceeded"], 1)
+
+    def test_batch_isolation(self):
+        # Same solver + params -> same batch. The 16 user group is past SmallExactSolver's limit and has to fail
+        # on its own, the 2 user one in the same batch still gets its plan.
+        big = {u: (1 if u % 2 else -1) for u in range(16)}
+        results = {}
+        threads = [threading.Thread(target=_settle_in_thread, args=(self.service.port, results, "small"),
+                                    kwargs={"balances": {1: -4, 2: 4}, "solver": "SmallExactSolver"}),
+                   threading.Thread(target=_settle_in_thread, args=(self.service.port, results, "big"),
+                                    kwargs={"balances": big, "solver": "SmallExactSolver"})]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertIsInstance(results["big"], ServiceError)
+        self.assertEqual(results["big"].status, 400)
+        self.assertIn("limit", results["big"].message)
+        self.assertNotIsInstance(results["small"], ServiceError)
+        self.assertEqual(results["small"]["transactions"], [[1, 2, 4.0]])
+        self.assertEqual(results["small"]["batch_size"], 2)
+
+class PoolRecoveryTest(unittest.TestCase):
+    def test_pool_restarts_after_worker_death(self):
+        service = start_background(workers=1, batch_window_ms=1)
+        try:
+            with SettlementClient(port=service.port) as client:
+                self.assertTrue(client.settle(balances={1: -5, 2: 5})["verified"])
+                for proc in list(service._pool._processes.values()):
+                    proc.kill()
+                    proc.join()
+                with self.assertRaises(ServiceError) as ctx:
+                    client.settle(balances={1: -5, 2: 5})
+                self.assertEqual(ctx.exception.status, 503)
+                self.assertTrue(client.settle(balances={1: -5, 2: 5})["verified"])
+                self.assertEqual(client.metrics()["pool_restarts"], 1)
+        finally:
+            service.stop()
+
+if __name__ == "__main__":
+    unittest.main()
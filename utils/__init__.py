@@ -1,3 +1,3 @@
 from .data_generator import generate_connected_data
 from .visualizer import generate_graph_html
-from .exporter import create_artifact_folder, export_run_artifacts, export_benchmark_stats, export_original_state
\ No newline at end of file
+from .exporter import create_artifact_folder, export_run_artifacts, export_benchmark_stats, export_original_state, export_run_metadata, export_solver_trace, export_trial_summary
\ No newline at end of file
@@ -0,0 +1,36 @@
+import os
+import json
+from typing import Optional
+
+# Runtime side of the capacity table written by analysis.py (export_capacity_table).
+# The table holds, per (solver, scenario), the fitted scaling exponents and the largest N the solver
+# can handle within the latency / memory budgets it was generated with.
+
+DEFAULT_CAPACITY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "analysis_results", "capacity_table.json")
+
+def load_capacity_table(path: str = DEFAULT_CAPACITY_PATH) -> dict:
+    """
+    Returns {(algorithm, scenario): entry}. Empty dict if the table hasn't been generated yet.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        table = json.load(f)
+    return {(e["algorithm"], e.get("scenario")): e for e in table.get("entries", [])}
+
+def max_recommended_n(table: dict, algorithm: str, scenario: Optional[str] = None, metric: Optional[str] = None) -> Optional[int]:
+    """
+    Largest recommended N for a solver (overall, or for one metric e.g. 'time' / 'memory').
+    Falls back to the most conservative scenario when the exact one isn't in the table.
+    None means no limit is known.
+    """
+    candidates = [e for (algo, scen), e in table.items() if algo == algorithm and (scenario is None or scen == scenario)]
+    if not candidates and scenario is not None:
+        candidates = [e for (algo, _), e in table.items() if algo == algorithm]
+
+    limits = []
+    for e in candidates:
+        val = e["max_n"].get(metric) if metric else e.get("max_n_overall")
+        if val is not None:
+            limits.append(val)
+    return min(limits) if limits else None
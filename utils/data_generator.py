@@ -71,4 +71,30 @@ def generate_connected_data(manager: ExpenseManager, num_transactions: int, min_
             amt = round(random.uniform(min_amt, max_amt), 0)
         else:
             amt = round(random.uniform(min_amt, max_amt), 2)
-        manager.add_transaction(u, v, amt)
\ No newline at end of file
+        manager.add_transaction(u, v, amt)
+
+def generate_packed_groups(n_groups: int, min_size=3, max_size=30, min_amt=1, max_amt=500, isInt=True, tx_per_member=2, seed=None):
+    """
+    Lots of small independent groups in the packed layout of solvers/batch.py: (balances, offsets).
+    Each group gets tx_per_member * size random payments between its own members, so every group sums to zero.
+    """
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(min_size, max_size + 1, size=n_groups)
+    offsets = np.zeros(n_groups + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+
+    # Payer / payee picked inside the group: offset + random local index (payee shifted so it's never the payer)
+    n_tx = sizes * tx_per_member
+    base = np.repeat(offsets[:-1], n_tx)
+    size = np.repeat(sizes, n_tx)
+    payer = rng.integers(0, size)
+    payee = (payer + rng.integers(1, size)) % size
+    amt = rng.uniform(min_amt, max_amt, size=len(payer))
+    amt = np.round(amt, 0 if isInt else 2)
+
+    # Same convention as ExpenseManager.add_transaction: the payer is owed (+), the payee owes (-)
+    balances = np.zeros(int(offsets[-1]))
+    np.add.at(balances, base + payer, amt)
+    np.add.at(balances, base + payee, -amt)
+    return np.round(balances, 2), offsets
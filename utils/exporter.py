@@ -1,25 +1,31 @@
 import os
 import csv
+import json
 import webbrowser
 from datetime import datetime
-from typing import List, Tuple
+from typing import List
 from models.expense_manager import ExpenseManager
+from models.plan_view import PlanView
+from models.settlement_plan import SettlementPlan, as_plan
 from utils.visualizer import generate_graph_html
+from utils.graph_assets import write_shared_graph_html
 
 # Generated By AI (Gemini) after detailed instructions from me
 # Mostly generated by AI but I had to do changes to the functions where I needed output as per my naming convention
 # Final pass by AI to fix bugs and make it a bit cleaner
 
-def create_artifact_folder(output_root="artifacts"):
-    """Creates a timestamped folder and returns the path."""
+def create_artifact_folder(output_root="artifacts", tag: str = None):
+    """Creates a timestamped folder (run_<timestamp>[_<tag>]) and returns the path."""
     now = datetime.now()
-    folder_name = os.path.join(output_root, f"run_{now.strftime('%Y-%m-%d_%H-%M-%S')}")
+    suffix = f"_{tag}" if tag else ""
+    folder_name = os.path.join(output_root, f"run_{now.strftime('%Y-%m-%d_%H-%M-%S')}{suffix}")
     os.makedirs(folder_name, exist_ok=True)
     return folder_name
 
-def export_original_state(folder_path: str, manager: ExpenseManager, num_users: int, num_transactions: int):
+def export_original_state(folder_path: str, manager: ExpenseManager, num_users: int, num_transactions: int, shared_assets_dir: str = None):
     """
     Exports the initial state of the graph (Before Optimization).
+    If shared_assets_dir is given the graph is written as a stub backed by content hashed sidecars (see utils/graph_assets.py).
     """
     print(f"Exporting Original State to {folder_path}...")
     
@@ -42,38 +48,36 @@ def export_original_state(folder_path: str, manager: ExpenseManager, num_users:
 
     # 3. Generate Original Graph
     graph_path = os.path.join(folder_path, f"graph_original_{num_users}_{num_transactions}.html")
-    generate_graph_html(manager, graph_path)
+    if shared_assets_dir:
+        write_shared_graph_html(manager, graph_path, shared_assets_dir)
+    else:
+        generate_graph_html(manager, graph_path)
 
-def export_run_artifacts(folder_path: str, filename_suffix: str, transactions: List[Tuple], manager: ExpenseManager):
+def export_run_artifacts(folder_path: str, filename_suffix: str, transactions: SettlementPlan, manager: ExpenseManager, shared_assets_dir: str = None):
     """
     Exports CSV and HTML for a specific run (e.g., 'max_max').
+    If shared_assets_dir is given only the plan's edge list is stored (nodes are shared, see utils/graph_assets.py).
     """
-    # 1. Export Transactions CSV
-    csv_name = f"transactions_{filename_suffix}.csv"
-    with open(os.path.join(folder_path, csv_name), 'w', newline='') as f:
-        w = csv.writer(f)
-        w.writerow(["Payer", "Payee", "Amount"])
-        for t in transactions:
-            w.writerow([t[0], t[1], f"{t[2]:.2f}"])
+    # 1. Export Transactions CSV (vectorized, straight from the plan's arrays)
+    transactions = as_plan(transactions)
+    transactions.to_csv(os.path.join(folder_path, f"transactions_{filename_suffix}.csv"))
 
     # 2. Generate HTML Graph
-    # We need to create a temporary manager object that holds THESE transactions
-    # so the visualizer can render them correctly.
-    temp_mgr = ExpenseManager(manager.num_users)
-    # Copy the node balances (structure of the graph)
-    temp_mgr.net_balances = list(manager.net_balances) 
-    
-    # Rebuild transaction objects for visualizer
-    from models.transaction import Transaction
-    for payer, payee, amt in transactions:
-        temp_mgr.transactions.append(Transaction(payer, payee, amt))
-        
+    # The visualizer only reads balances + edges, so wrap the plan in a read-only view.
+    # Balances are shared by reference with the manager (no copy, no Transaction objects).
+    view = PlanView(manager.net_balances, transactions)
     html_name = f"graph_{filename_suffix}.html"
-    generate_graph_html(temp_mgr, os.path.join(folder_path, html_name))
+    if shared_assets_dir:
+        write_shared_graph_html(view, os.path.join(folder_path, html_name), shared_assets_dir)
+    else:
+        generate_graph_html(view, os.path.join(folder_path, html_name))
 
 def export_benchmark_stats(folder_path: str, stats: List[dict], active_balances: dict):
     """
     Exports the comparison table to CSV.
+    Stats entries may carry 'peak_rss_mb' / 'peak_traced_mb' (utils/memory_tracker.py), missing ones are written as N/A
+    (or as 'traced_note', why the solver wasn't traced),
+    and 'instrumentation' ({"phases", "counters"} from solvers/instrumentation.py) written as name=value;... columns.
     """
     # 1. Calculate Bounds
     # Filter strictly active users (non-zero) just to be safe
@@ -91,11 +95,11 @@ def export_benchmark_stats(folder_path: str, stats: List[dict], active_balances:
     path = os.path.join(folder_path, "benchmark_stats.csv")
     with open(path, 'w', newline='') as f:
         w = csv.writer(f)
-        w.writerow(["Algorithm", "Transactions", "Time (s)", "Gap from Floor"])
+        w.writerow(["Algorithm", "Transactions", "Time (s)", "Gap from Floor", "Peak RSS Delta (MB)", "Peak Traced (MB)", "Phases (s)", "Counters"])
         
         # 2. Write Theoretical Rows first
-        w.writerow(["Theoretical Best (Lower Bound)", floor, "0.0000", "0"])
-        w.writerow(["Theoretical Worst (Upper Bound)", ceiling, "0.0000", ceiling - floor])
+        w.writerow(["Theoretical Best (Lower Bound)", floor, "0.0000", "0", "N/A", "N/A", "", ""])
+        w.writerow(["Theoretical Worst (Upper Bound)", ceiling, "0.0000", ceiling - floor, "N/A", "N/A", "", ""])
         
         # 3. Write Algorithm Rows
         for s in stats:
@@ -108,4 +112,44 @@ def export_benchmark_stats(folder_path: str, stats: List[dict], active_balances:
             else:
                 gap = count - floor
                 
-            w.writerow([s['name'], count, f"{time_val:.4f}", gap])
\ No newline at end of file
+            rss = s.get('peak_rss_mb')
+            traced = s.get('peak_traced_mb')
+            ins = s.get('instrumentation') or {}
+            phases = ";".join(f"{k}={v:.6f}" for k, v in ins.get('phases', {}).items())
+            counters = ";".join(f"{k}={v}" for k, v in ins.get('counters', {}).items())
+            w.writerow([s['name'], count, f"{time_val:.4f}", gap,
+                        "N/A" if rss is None else f"{rss:.3f}", (s.get('traced_note') or "N/A") if traced is None else f"{traced:.3f}", phases, counters])
+
+def export_run_metadata(folder_path: str, meta: dict):
+    """
+    Writes run_meta.json (N, seed, scenario, generator + solver params) next to benchmark_stats.csv.
+    Picked up by the results store (utils/results_store.py) used by analysis.py.
+    """
+    with open(os.path.join(folder_path, "run_meta.json"), 'w') as f:
+        json.dump(meta, f, indent=2, default=str)
+
+def export_solver_trace(folder_path: str, traces: dict, counters: dict = None):
+    """
+    Writes solver_trace.json (Chrome trace format, open in chrome://tracing or ui.perfetto.dev),
+    one track per solver. traces = {solver name: Instrumentation.events}.
+    """
+    from solvers.instrumentation import chrome_trace
+    with open(os.path.join(folder_path, "solver_trace.json"), 'w') as f:
+        json.dump(chrome_trace(traces, counters), f)
+
+def export_trial_summary(output_root: str, trials: List[dict]):
+    """
+    Writes trials_<timestamp>.csv into output_root: one row per trial x solver, in trial order
+    (whatever order the trial workers finished in). trials = the summaries returned by main.main().
+    """
+    os.makedirs(output_root, exist_ok=True)
+    path = os.path.join(output_root, f"trials_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.csv")
+    with open(path, 'w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(["Trial", "Seed", "Active Users", "Run Folder", "Algorithm", "Transactions", "Time (s)", "Peak Traced (MB)"])
+        for i, t in enumerate(trials):
+            for s in t["stats"]:
+                traced = s.get('peak_traced_mb')
+                w.writerow([i, t["seed"], t["n_active"], t["folder"] or "", s['name'], s['count'], f"{s['time']:.4f}",
+                            "N/A" if traced is None else f"{traced:.3f}"])
+    return path
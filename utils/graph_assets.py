@@ -0,0 +1,180 @@
+import os
+import json
+import hashlib
+import numpy as np
+from typing import Union
+from models.expense_manager import ExpenseManager
+from models.plan_view import PlanView
+from utils.visualizer import _focus_mode_js, generate_lod_graph_html, LARGE_GRAPH_THRESHOLD
+
+# Shared asset graph output.
+# Every run used to write up to 7 self contained PyVis pages that all embed the same node set and balances.
+# In this mode the data is split into content hashed sidecars in one shared folder:
+#   nodes_<hash>.js  -> the balance array (written once per distinct graph)
+#   edges_<hash>.js  -> one flat edge list per plan (written once per distinct plan)
+# and each graph_*.html in the run folder is a tiny stub that loads them with <script src> (works from file://)
+# and builds the vis network client side. If a sidecar with the same hash exists it is never re-rendered.
+# Graphs past LARGE_GRAPH_THRESHOLD users aren't split: a stub would still send every node and edge to vis-network.
+# They get the clustered Level-of-Detail page (utils/visualizer.py::generate_lod_graph_html), rendered once per
+# distinct (balances, edges) into lod_<hash>.html in the shared folder, the run's graph_*.html redirects to it.
+
+VIS_JS = "https://cdnjs.cloudflare.com/ajax/libs/vis-network/9.1.2/dist/vis-network.min.js"
+
+def _content_hash(payload: str) -> str:
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+def _write_asset(assets_dir: str, kind: str, payload: str):
+    """
+    Writes window.DM_<KIND>["<hash>"] = payload into <kind>_<hash>.js unless it already exists.
+    Returns (hash, path, written).
+    """
+    h = _content_hash(payload)
+    path = os.path.join(assets_dir, f"{kind}_{h}.js")
+    if os.path.exists(path):
+        return h, path, False
+
+    var = f"DM_{kind.upper()}"
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(f"window.{var} = window.{var} || {{}};\nwindow.{var}[\"{h}\"] = {payload};\n")
+    # Atomic rename so a half written asset is never picked up by a concurrent run
+    os.replace(tmp, path)
+    return h, path, True
+
+def _balances_digest(balances) -> str:
+    """Cheap content key of a balance vector (cents, hashed as raw int64 bytes, no JSON)."""
+    cents = np.rint(np.asarray(balances, dtype=np.float64) * 100).astype(np.int64)
+    return hashlib.blake2b(cents.tobytes(), digest_size=16).hexdigest()
+
+def _edges_payload(manager) -> str:
+    edges_flat = []
+    for payer, payee, amt in manager.iter_edges():
+        edges_flat.extend((payer, payee, round(amt, 2)))
+    return json.dumps(edges_flat, separators=(",", ":"))
+
+# (assets_dir, balances digest) -> (hash, path) of node sidecars written by this process
+_NODES_CACHE = {}
+
+def _nodes_asset(balances, assets_dir):
+    """
+    (hash, path, written) of the node sidecar for balances. Every plan of a run shares the same balances, so the
+    JSON payload is only built when the balances' content digest hasn't been seen for this assets_dir.
+    """
+    key = (os.path.abspath(assets_dir), _balances_digest(balances))
+    cached = _NODES_CACHE.get(key)
+    if cached is not None and os.path.exists(cached[1]):
+        return cached + (False,)
+
+    # Balances rounded to cents so float noise doesn't change the hash
+    payload = json.dumps([round(b, 2) for b in balances], separators=(",", ":"))
+    h, path, written = _write_asset(assets_dir, "nodes", payload)
+    _NODES_CACHE[key] = (h, path)
+    return h, path, written
+
+def _write_lod(manager, filepath, assets_dir):
+    """
+    Large graphs: lod_<hash>.html in assets_dir (hash of balances + edges, rendered only if missing) and filepath
+    as a redirect to it. Returns True if the LOD page had to be rendered.
+    """
+    h = _content_hash(_balances_digest(manager.net_balances) + _edges_payload(manager))
+    path = os.path.join(assets_dir, f"lod_{h}.html")
+    written = not os.path.exists(path)
+    if written:
+        tmp = os.path.join(assets_dir, f"lod_{h}.{os.getpid()}.tmp.html")
+        generate_lod_graph_html(manager, tmp)
+        os.replace(tmp, path)
+
+    src = os.path.relpath(path, os.path.dirname(os.path.abspath(filepath))).replace(os.sep, "/")
+    with open(filepath, "w") as f:
+        f.write(_REDIRECT_TEMPLATE % {"src": src})
+    return written
+
+def write_shared_graph_html(manager: Union[ExpenseManager, PlanView], filepath: str, assets_dir: str):
+    """
+    Writes filepath as a small stub page backed by content hashed node/edge sidecars in assets_dir
+    (or as a redirect to a shared Level-of-Detail page past LARGE_GRAPH_THRESHOLD users).
+    Returns True if anything had to be rendered, False if everything was already cached.
+    """
+    os.makedirs(assets_dir, exist_ok=True)
+    if len(manager.net_balances) > LARGE_GRAPH_THRESHOLD:
+        return _write_lod(manager, filepath, assets_dir)
+
+    nodes_hash, nodes_path, nodes_written = _nodes_asset(manager.net_balances, assets_dir)
+    edges_hash, edges_path, edges_written = _write_asset(assets_dir, "edges", _edges_payload(manager))
+
+    folder = os.path.dirname(os.path.abspath(filepath))
+    nodes_src = os.path.relpath(nodes_path, folder).replace(os.sep, "/")
+    edges_src = os.path.relpath(edges_path, folder).replace(os.sep, "/")
+
+    with open(filepath, "w") as f:
+        f.write(_STUB_TEMPLATE % {
+            "vis_js": VIS_JS,
+            "nodes_src": nodes_src,
+            "edges_src": edges_src,
+            "nodes_hash": nodes_hash,
+            "edges_hash": edges_hash,
+            "focus_js": _focus_mode_js("{}", "{}"),
+        })
+    return nodes_written or edges_written
+
+_REDIRECT_TEMPLATE = """<html>
+<head>
+<meta charset="utf-8">
+<meta http-equiv="refresh" content="0; url=%(src)s">
+</head>
+<body><a href="%(src)s">Level-of-Detail graph</a></body>
+</html>
+"""
+
+_STUB_TEMPLATE = """<html>
+<head>
+<meta charset="utf-8">
+<script src="%(vis_js)s"></script>
+<script src="%(nodes_src)s"></script>
+<script src="%(edges_src)s"></script>
+<style>#mynetwork { width: 100%%; height: 850px; border: 1px solid lightgray; }</style>
+</head>
+<body>
+<div id="mynetwork"></div>
+<script>
+function drawGraph() {
+    var balances = window.DM_NODES["%(nodes_hash)s"];
+    var flat = window.DM_EDGES["%(edges_hash)s"];
+
+    // Same styling as utils/visualizer.py::generate_graph_html
+    var nodeList = new Array(balances.length);
+    for (var i = 0; i < balances.length; i++) {
+        var bal = balances[i];
+        var color = Math.abs(bal) > 0.01 ? (bal > 0 ? "#006c00" : "#bb0000") : "#616161";
+        nodeList[i] = {id: i, label: "User " + i, title: "User ID: " + i + "\\nNet Balance: $" + bal.toFixed(2),
+                       color: color, size: 10 + Math.abs(bal) / 10, shape: "dot"};
+    }
+
+    var edgeList = [];
+    var focusEdges = [];
+    for (var k = 0; k < flat.length; k += 3) {
+        var id = "e" + (k / 3);
+        edgeList.push({id: id, from: flat[k], to: flat[k + 1], title: "$" + flat[k + 2].toFixed(2),
+                       width: 1 + flat[k + 2] / 50, color: "#555555", arrows: "to"});
+        focusEdges.push([id, flat[k], flat[k + 1]]);
+    }
+
+    nodes = new vis.DataSet(nodeList);
+    edges = new vis.DataSet(edgeList);
+    var container = document.getElementById("mynetwork");
+    var options = {physics: {solver: "forceAtlas2Based"}};
+    network = new vis.Network(container, {nodes: nodes, edges: edges}, options);
+
+    %(focus_js)s
+
+    for (var k = 0; k < focusEdges.length; k++) {
+        focusIndexEdge(focusEdges[k][0], focusEdges[k][1], focusEdges[k][2]);
+    }
+    return network;
+}
+var nodes, edges, network;
+drawGraph();
+</script>
+</body>
+</html>
+"""
@@ -0,0 +1,110 @@
+import os
+import re
+import glob
+import json
+import numpy as np
+import pandas as pd
+from models.expense_manager import ExpenseManager
+
+# Reload the original ledger of a past run (transactions_original_*.csv / net_balances_original_*.csv written by
+# export_original_state) so it can be re-solved without regenerating the data.
+#
+# First load parses the CSV in bulk with pandas and writes a binary copy to <run dir>/.ledger_cache/*.npy,
+# later loads just np.load(..., mmap_mode="r") it (no parsing, pages come in on demand). The cache is rebuilt
+# whenever the CSV is newer than it.
+#
+#   mgr, meta = load_run("artifacts/N 10000_Int/run_...")     -> ExpenseManager + num_users / seed / scenario
+#   balances = load_balance_array(run_dir)                      -> float array, no ExpenseManager at all
+
+CACHE_DIR = ".ledger_cache"
+TX_DTYPE = np.dtype([("payer", "<i4"), ("payee", "<i4"), ("cents", "<i8")])
+
+def find_ledger_files(run_dir):
+    """(transactions_original csv, net_balances_original csv), None for whichever is missing."""
+    def first(pattern):
+        found = sorted(glob.glob(os.path.join(glob.escape(run_dir), pattern)))
+        return found[0] if found else None
+    return first("transactions_original_*.csv"), first("net_balances_original_*.csv")
+
+def _cached(csv_path, parse, cache=True):
+    """np.load(mmap) of the cached .npy for csv_path, (re)building it with parse(csv_path) if missing / stale."""
+    if not cache:
+        return parse(csv_path)
+    cache_dir = os.path.join(os.path.dirname(csv_path), CACHE_DIR)
+    cache_path = os.path.join(cache_dir, os.path.splitext(os.path.basename(csv_path))[0] + ".npy")
+    if not os.path.exists(cache_path) or os.path.getmtime(cache_path) < os.path.getmtime(csv_path):
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = cache_path + ".tmp.npy"
+        np.save(tmp, parse(csv_path))
+        os.replace(tmp, cache_path)
+    return np.load(cache_path, mmap_mode="r")
+
+def _parse_transactions(csv_path):
+    df = pd.read_csv(csv_path, usecols=["Payer", "Payee", "Amount"],
+                     dtype={"Payer": np.int32, "Payee": np.int32, "Amount": np.float64})
+    out = np.empty(len(df), dtype=TX_DTYPE)
+    out["payer"] = df["Payer"].to_numpy()
+    out["payee"] = df["Payee"].to_numpy()
+    out["cents"] = np.rint(df["Amount"].to_numpy() * 100)
+    return out
+
+def _parse_balances(csv_path):
+    df = pd.read_csv(csv_path, usecols=["User", "Balance"], dtype={"User": np.int64, "Balance": np.float64})
+    cents = np.zeros(int(df["User"].max()) + 1 if len(df) else 0, dtype=np.int64)
+    cents[df["User"].to_numpy()] = np.rint(df["Balance"].to_numpy() * 100)
+    return cents
+
+def load_transactions(csv_path, cache=True):
+    """Structured array (payer int32, payee int32, cents int64) of a transactions CSV."""
+    return _cached(csv_path, _parse_transactions, cache)
+
+def load_balances(csv_path, cache=True):
+    """int64 cents per user (index = user id) of a net_balances CSV."""
+    return _cached(csv_path, _parse_balances, cache)
+
+def load_balance_array(run_dir, cache=True):
+    """Float balances per user of a run, straight from net_balances_original_*.csv."""
+    _, bal_csv = find_ledger_files(run_dir)
+    if bal_csv is None:
+        raise FileNotFoundError(f"No net_balances_original_*.csv in {run_dir}")
+    return load_balances(bal_csv, cache) / 100
+
+def load_run(run_dir, keep_transactions=True, cache=True):
+    """
+    Rebuilds the ExpenseManager of a past run from its transactions_original CSV.
+    If the net_balances CSV is there too the rebuilt balances are checked against it (ValueError on a mismatch).
+    Returns (manager, meta): meta has num_users, num_transactions and whatever is known of the original run's
+    seed / scenario / params (run_meta.json, else the folder names).
+    """
+    tx_csv, bal_csv = find_ledger_files(run_dir)
+    if tx_csv is None:
+        raise FileNotFoundError(f"No transactions_original_*.csv in {run_dir}")
+    txs = load_transactions(tx_csv, cache)
+    expected = load_balances(bal_csv, cache) if bal_csv else None
+
+    # The balances CSV lists every user (neutral ones too), so it knows N even if the last users never transacted
+    num_users = len(expected) if expected is not None else None
+    mgr = ExpenseManager.from_arrays(txs["payer"], txs["payee"], txs["cents"] / 100, num_users=num_users,
+                                     keep_transactions=keep_transactions)
+    if expected is not None:
+        rebuilt = np.rint(np.asarray(mgr.net_balances) * 100).astype(np.int64)
+        bad = np.flatnonzero(rebuilt != expected)
+        if len(bad):
+            raise ValueError(f"{run_dir}: replayed balances differ from {os.path.basename(bal_csv)} for {len(bad)} user(s), "
+                             f"first user {bad[0]}: {rebuilt[bad[0]] / 100:.2f} vs {expected[bad[0]] / 100:.2f}")
+
+    meta = {"num_users": mgr.num_users, "num_transactions": len(txs), "source": os.path.abspath(run_dir)}
+    # Older runs have no run_meta.json: scenario from the "N <n>_<scenario>" parent folder, seed from a _s<seed> tag
+    run_dir = os.path.normpath(run_dir)
+    parent = re.fullmatch(r"N \d+_(.+)", os.path.basename(os.path.dirname(run_dir)))
+    if parent:
+        meta["scenario"] = parent.group(1)
+    tag = re.search(r"_s(\d+)$", os.path.basename(run_dir))
+    if tag:
+        meta["seed"] = int(tag.group(1))
+    meta_path = os.path.join(run_dir, "run_meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            original = json.load(f)
+        meta.update({k: original[k] for k in ("seed", "scenario", "params") if k in original})
+    return mgr, meta
@@ -0,0 +1,211 @@
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Peak memory tracking for solver runs.
+# Two numbers per solver invocation:
+#   - Peak RSS delta: OS level high water mark during the solve minus the RSS right before it
+#   - Peak traced: tracemalloc peak of Python allocations during the solve
+# tracemalloc slows Python down a lot, so timed runs never have it on: the allocation numbers come from a
+# separate traced run (the first warmup if there is one).
+
+MB = 1024 * 1024
+
+def _read_status_kb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1]) * 1024
+    return None
+
+def current_rss():
+    """Current resident set size in bytes (None if unknown on this platform)."""
+    if sys.platform.startswith("linux"):
+        return _read_status_kb("VmRSS:")
+    if sys.platform == "win32":
+        return _win_memory_counters()[0]
+    return None
+
+def peak_rss():
+    """Process RSS high water mark in bytes (None if unknown on this platform)."""
+    if sys.platform.startswith("linux"):
+        return _read_status_kb("VmHWM:")
+    if sys.platform == "win32":
+        return _win_memory_counters()[1]
+    try:
+        import resource
+        # ru_maxrss is bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        return None
+
+def reset_peak_rss():
+    """
+    Resets the RSS high water mark so the next peak_rss() only covers what comes after.
+    Only possible on Linux (/proc/self/clear_refs), returns False elsewhere.
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _win_memory_counters():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+    return counters.WorkingSetSize, counters.PeakWorkingSetSize
+
+class MemoryTracker:
+    """
+    tracemalloc based tracker for one (traced) solver run.
+
+    with MemoryTracker(trace_phases=True) as mem:
+        with mem.phase("k2"): ...
+        with mem.phase("k3"): ...
+    mem.peak_traced -> bytes, mem.phases -> {name: {"peak_mb", "net_mb", "calls", "top": [...]}}
+
+    Phase breakdown (optional) compares tracemalloc snapshots taken around each phase and keeps the
+    top allocation sites, snapshots are expensive so they are only taken when trace_phases is on.
+    """
+    def __init__(self, trace_phases=False, top_n=5):
+        self.trace_phases = trace_phases
+        self.top_n = top_n
+        self.peak_traced = None
+        self.phases = {}
+        self._started = False
+        self._peak_seen = 0
+        # [traced bytes at phase start, peak seen inside the phase] per open phase
+        self._stack = []
+
+    def __enter__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        tracemalloc.reset_peak()
+        self._base = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        peak = max(tracemalloc.get_traced_memory()[1], self._peak_seen)
+        self.peak_traced = max(0, peak - self._base)
+        if self._started:
+            tracemalloc.stop()
+        return False
+
+    @contextmanager
+    def phase(self, name):
+        if not tracemalloc.is_tracing():
+            yield
+            return
+        before, peak_so_far = tracemalloc.get_traced_memory()
+        # reset_peak() below drops the peak of every enclosing phase too, hand it to them first
+        self._peak_seen = max(self._peak_seen, peak_so_far)
+        for frame in self._stack:
+            frame[1] = max(frame[1], peak_so_far)
+        frame = [before, 0]
+        self._stack.append(frame)
+        snap_before = tracemalloc.take_snapshot() if self.trace_phases else None
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, frame[1])
+            self._peak_seen = max(self._peak_seen, peak)
+            for outer in self._stack:
+                outer[1] = max(outer[1], peak)
+            entry = self.phases.setdefault(name, {"peak_mb": 0.0, "net_mb": 0.0, "calls": 0})
+            entry["peak_mb"] = max(entry["peak_mb"], round((peak - before) / MB, 4))
+            entry["net_mb"] = round(entry["net_mb"] + (current - before) / MB, 4)
+            entry["calls"] += 1
+            if snap_before is not None:
+                diff = tracemalloc.take_snapshot().compare_to(snap_before, "lineno")
+                entry["top"] = [f"{d.traceback[0].filename}:{d.traceback[0].lineno} {d.size_diff / MB:+.3f}MB"
+                                for d in diff[:self.top_n]]
+
+    @property
+    def peak_traced_mb(self):
+        return None if self.peak_traced is None else round(self.peak_traced / MB, 4)
+
+def measure_solver(solver, balances, warmups=0, repeats=1, trace_allocations=True, trace_phases=False,
+                   instrument=False, progress=None):
+    """
+    Runs solver.solve(balances) and measures time + memory.
+
+    1. Warmups (the first one runs under tracemalloc when trace_allocations is on)
+    2. `repeats` timed runs with perf_counter, RSS high water mark tracked around them (no tracemalloc)
+    Allocations are only traced on a warmup: with warmups=0 peak_traced_mb / phases stay empty instead of the solver
+    silently running once more.
+
+    instrument=True attaches a solvers.instrumentation.Instrumentation to the last timed run (phase timings,
+    counters, trace events), `progress` is its progress callback.
+    Returns dict(txs, times, peak_rss_delta_mb, peak_traced_mb, phases, instrumentation, trace_events).
+    """
+    from solvers.instrumentation import Instrumentation
+
+    result = {"txs": [], "times": [], "peak_rss_delta_mb": None, "peak_traced_mb": None, "phases": {},
+              "instrumentation": None, "trace_events": []}
+    instrumented = hasattr(solver, "instrumentation")
+
+    def traced_run():
+        with MemoryTracker(trace_phases=trace_phases) as mem:
+            # Instrumented solvers report their own phases (k2/k3/...) into the tracker
+            if instrumented:
+                solver.instrumentation = Instrumentation(memory_tracker=mem)
+            try:
+                with mem.phase("solve"):
+                    solver.solve(dict(balances))
+            finally:
+                if instrumented:
+                    del solver.instrumentation
+        result["peak_traced_mb"] = mem.peak_traced_mb
+        result["phases"] = mem.phases
+
+    for i in range(warmups):
+        if i == 0 and trace_allocations:
+            traced_run()
+        else:
+            solver.solve(dict(balances))
+
+    resettable = reset_peak_rss()
+    base_rss = current_rss()
+    base_peak = peak_rss()
+    repeats = max(1, repeats)
+    for i in range(repeats):
+        ins = None
+        if (instrument or progress) and instrumented and i == repeats - 1:
+            ins = solver.instrumentation = Instrumentation(progress=progress)
+        try:
+            start = time.perf_counter()
+            result["txs"] = solver.solve(balances)
+            result["times"].append(time.perf_counter() - start)
+        finally:
+            if ins is not None:
+                del solver.instrumentation
+        if ins is not None and instrument:
+            result["instrumentation"] = ins.summary()
+            result["trace_events"] = ins.events
+    end_peak = peak_rss()
+    if base_rss is not None and end_peak is not None:
+        # Without a resettable high water mark an older, higher peak hides the solve; report what we can see
+        if resettable or end_peak > base_peak:
+            result["peak_rss_delta_mb"] = round(max(0, end_peak - base_rss) / MB, 4)
+        else:
+            result["peak_rss_delta_mb"] = round(max(0, (current_rss() or base_rss) - base_rss) / MB, 4)
+    return result
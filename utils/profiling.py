@@ -0,0 +1,103 @@
+import os
+import pstats
+import cProfile
+
+# Deterministic (cProfile) profiling of single solver runs.
+# Each profiled run leaves two files next to the run artifacts:
+#   profile_<suffix>.prof       -> raw pstats dump (snakeviz, pstats, python -m pstats)
+#   profile_<suffix>.collapsed  -> "caller;callee;... microseconds" lines for flamegraph.pl / speedscope / inferno
+# cProfile only records caller -> callee edges, not full stacks, so the collapsed stacks are rebuilt by walking the
+# call graph from the roots and splitting every function's time across its callers (same idea as flameprof).
+
+def profile_call(func, *args, **kwargs):
+    """Runs func under cProfile, returns (result, pstats.Stats)."""
+    prof = cProfile.Profile()
+    result = prof.runcall(func, *args, **kwargs)
+    return result, pstats.Stats(prof)
+
+def _label(func):
+    filename, line, name = func
+    if filename == "~":
+        # builtins show up as ('~', 0, "<built-in method ...>")
+        return name
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+def collapsed_stacks(stats: pstats.Stats, min_us=1, max_depth=64):
+    """
+    Folds the cProfile call graph into collapsed stacks {"a;b;c": microseconds}.
+    A function's time on a given path is its cumulative time scaled by the share that path's caller contributed.
+    """
+    raw = stats.stats  # func -> (cc, nc, tottime, cumtime, callers{caller: (cc, nc, tottime, cumtime)})
+    callees = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+
+    roots = [f for f, v in raw.items() if not v[4]]
+    folded = {}
+
+    def walk(func, path, budget):
+        cc, nc, tottime, cumtime, _ = raw[func]
+        scale = budget / cumtime if cumtime > 0 else 0.0
+        stack = path + (_label(func),)
+        own = tottime * scale
+        children = callees.get(func, []) if len(stack) < max_depth else []
+        for child, edge_cum in children:
+            # Recursion: the cycle's time is already inside this frame's cumulative time
+            if child == func or _label(child) in path:
+                continue
+            child_budget = edge_cum * scale
+            if child_budget * 1e6 >= min_us:
+                walk(child, stack, child_budget)
+        if own * 1e6 >= min_us:
+            key = ";".join(stack)
+            folded[key] = folded.get(key, 0) + int(own * 1e6)
+
+    for root in roots:
+        walk(root, (), raw[root][3])
+    return folded
+
+def write_profile(stats: pstats.Stats, folder: str, suffix: str):
+    """Writes profile_<suffix>.prof + profile_<suffix>.collapsed into folder, returns the .prof path."""
+    os.makedirs(folder, exist_ok=True)
+    prof_path = os.path.join(folder, f"profile_{suffix}.prof")
+    stats.dump_stats(prof_path)
+    with open(os.path.join(folder, f"profile_{suffix}.collapsed"), "w") as f:
+        for stack, us in sorted(collapsed_stacks(stats).items()):
+            f.write(f"{stack} {us}\n")
+    return prof_path
+
+def top_functions(prof_path: str, n=25, sort="tottime"):
+    """
+    Top n functions of a .prof file as dicts(function, ncalls, tottime, cumtime), sorted by tottime or cumtime.
+    """
+    raw = pstats.Stats(prof_path).stats
+    rows = [{"function": _label(func), "ncalls": nc, "tottime": tottime, "cumtime": cumtime}
+            for func, (cc, nc, tottime, cumtime, _) in raw.items()]
+    rows.sort(key=lambda r: r[sort], reverse=True)
+    return rows[:n]
+
+def diff_profiles(prof_a: str, prof_b: str, n=25, sort="tottime"):
+    """
+    Compares the hot functions of two profiles: union of the top n of each, with times in both and the delta (b - a).
+    Sorted by the absolute change so regressions and wins both float to the top.
+    """
+    a = {r["function"]: r for r in top_functions(prof_a, n=None, sort=sort)}
+    b = {r["function"]: r for r in top_functions(prof_b, n=None, sort=sort)}
+    hot = {r["function"] for r in top_functions(prof_a, n, sort)} | {r["function"] for r in top_functions(prof_b, n, sort)}
+
+    rows = []
+    for func in hot:
+        ta = a[func][sort] if func in a else 0.0
+        tb = b[func][sort] if func in b else 0.0
+        rows.append({
+            "function": func,
+            f"{sort}_a": ta,
+            f"{sort}_b": tb,
+            "delta": tb - ta,
+            "ratio": (tb / ta) if ta > 0 else float("inf") if tb > 0 else 1.0,
+            "ncalls_a": a[func]["ncalls"] if func in a else 0,
+            "ncalls_b": b[func]["ncalls"] if func in b else 0,
+        })
+    rows.sort(key=lambda r: abs(r["delta"]), reverse=True)
+    return rows
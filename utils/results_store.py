@@ -0,0 +1,313 @@
+import os
+import csv
+import json
+import sqlite3
+import hashlib
+from typing import Optional
+
+# Consolidated benchmark results store (SQLite).
+# analysis.py used to glob the whole artifacts/ tree and re-parse every benchmark_stats.csv on every run.
+# The store keeps a manifest (mtime + content hash) per run folder and only re-ingests folders that are new
+# or whose files changed. Directory mtimes are cached too, so unchanged parts of the tree are not even listed.
+
+STATS_FILE = "benchmark_stats.csv"
+META_FILE = "run_meta.json"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    children TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_dir TEXT UNIQUE NOT NULL,
+    stats_mtime REAL NOT NULL,
+    meta_mtime REAL,
+    content_hash TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    floor INTEGER,
+    ceiling INTEGER,
+    num_users INTEGER,
+    num_transactions INTEGER,
+    seed INTEGER,
+    scenario TEXT,
+    params TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    algorithm TEXT NOT NULL,
+    transactions INTEGER NOT NULL,
+    time_s REAL NOT NULL,
+    peak_rss_mb REAL,
+    peak_traced_mb REAL,
+    solver_params TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_n ON runs(n);
+CREATE INDEX IF NOT EXISTS idx_runs_scenario ON runs(scenario);
+CREATE INDEX IF NOT EXISTS idx_results_run ON results(run_id);
+CREATE INDEX IF NOT EXISTS idx_results_algo ON results(algorithm);
+"""
+
+# Optional benchmark_stats.csv columns (older runs don't have them) -> row key
+MEMORY_COLUMNS = {"Peak RSS Delta (MB)": 'Peak RSS Delta (MB)', "Peak Traced (MB)": 'Peak Traced (MB)'}
+
+def _optional_float(row, idx):
+    if idx is None or idx >= len(row):
+        return None
+    try:
+        return float(row[idx])
+    except ValueError:
+        return None
+
+def parse_benchmark_file(filepath):
+    """
+    Parses a benchmark_stats.csv into a list of algorithm rows with N / Floor attached.
+    Memory columns are read by header name and are None when missing / N/A.
+    Returns None if the file is not a valid benchmark file.
+    """
+    metadata = {}
+    algo_data_temp = []
+    try:
+        with open(filepath, 'r', newline='', encoding='utf-8', errors='replace') as f:
+            reader = csv.reader(f)
+            rows = list(reader)
+        if not rows: return None
+
+        for row in rows[:20]:
+            if len(row) < 2: continue
+            key = row[0].strip()
+            val = row[1].strip()
+            if "Active Users" in key and val.isdigit(): metadata['N'] = int(val)
+            elif "Theoretical Min" in key and val.isdigit(): metadata['Floor'] = int(val)
+            elif "Theoretical Worst" in key and val.isdigit(): metadata['Ceiling'] = int(val)
+
+        header_idx = -1
+        for i, row in enumerate(rows):
+            if len(row) > 0 and "Algorithm" in row[0]:
+                header_idx = i; break
+        if header_idx == -1: return None
+        header = [h.strip() for h in rows[header_idx]]
+        mem_idx = {key: (header.index(col) if col in header else None) for col, key in MEMORY_COLUMNS.items()}
+
+        for row in rows[header_idx+1:]:
+            if not row or not row[0]: continue
+            algo_name = row[0].strip()
+            try:
+                txs = int(float(row[1]))
+                time_val = float(row[2])
+            except ValueError: continue
+
+            if "Theoretical Worst" in algo_name:
+                if 'N' not in metadata: metadata['N'] = txs + 1
+                if 'Ceiling' not in metadata: metadata['Ceiling'] = txs
+                continue
+            if "Theoretical Best" in algo_name:
+                if 'Floor' not in metadata: metadata['Floor'] = txs
+                continue
+
+            algo_data_temp.append({
+                'Algorithm': algo_name,
+                'Transactions': txs,
+                'Time (s)': time_val,
+                **{key: _optional_float(row, idx) for key, idx in mem_idx.items()}
+            })
+
+        if 'N' not in metadata: return None
+
+        final_data = []
+        for item in algo_data_temp:
+            item['N'] = metadata['N']
+            item['Theoretical_Floor'] = metadata.get('Floor', 0)
+            item['Theoretical_Ceiling'] = metadata.get('Ceiling', metadata['N'] - 1)
+            item['Optimality Gap'] = max(0, item['Transactions'] - item['Theoretical_Floor'])
+            final_data.append(item)
+        return final_data
+    except Exception: return None
+
+def _scenario_from_path(run_dir):
+    """
+    Fallback for runs without run_meta.json: artifacts/N 25_Int/run_... -> "Int"
+    """
+    parent = os.path.basename(os.path.dirname(os.path.normpath(run_dir)))
+    if "_" in parent:
+        return parent.rsplit("_", 1)[1]
+    return parent or None
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+class ResultsStore:
+    """
+    SQLite backed store of benchmark runs.
+
+    sync(root) ingests new/modified run folders (a run folder is any folder holding a benchmark_stats.csv),
+    load_frame() serves the same DataFrame analysis.py used to build by hand (plus Seed/Scenario/run columns).
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        # Stores created before the memory columns existed
+        cols = {row[1] for row in self.conn.execute("PRAGMA table_info(results)")}
+        for col in ("peak_rss_mb", "peak_traced_mb"):
+            if col not in cols:
+                self.conn.execute(f"ALTER TABLE results ADD COLUMN {col} REAL")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    # ---------- Ingestion ----------
+
+    def sync(self, root: str) -> dict:
+        """
+        Brings the store up to date with the run folders under root.
+        Returns counts of {'added', 'updated', 'removed', 'unchanged'} runs.
+        """
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        root = os.path.abspath(root)
+        known = {row[0]: row[1:] for row in self.conn.execute("SELECT run_dir, stats_mtime, meta_mtime, content_hash FROM runs")}
+
+        found = set()
+        with self.conn:
+            self._discover(root, found)
+
+            for run_dir in found:
+                stats_path = os.path.join(run_dir, STATS_FILE)
+                meta_path = os.path.join(run_dir, META_FILE)
+                stats_mtime, meta_mtime = _mtime(stats_path), _mtime(meta_path)
+                if stats_mtime is None:
+                    continue
+
+                old = known.get(run_dir)
+                if old and old[0] == stats_mtime and old[1] == meta_mtime:
+                    counts["unchanged"] += 1
+                    continue
+
+                # mtime moved: only re-ingest if the content actually changed (e.g. copied folders, touch)
+                content_hash = self._hash_run(stats_path, meta_path)
+                if old and old[2] == content_hash:
+                    self.conn.execute("UPDATE runs SET stats_mtime = ?, meta_mtime = ? WHERE run_dir = ?", (stats_mtime, meta_mtime, run_dir))
+                    counts["unchanged"] += 1
+                    continue
+
+                if self._ingest(run_dir, stats_path, meta_path, stats_mtime, meta_mtime, content_hash):
+                    counts["updated" if old else "added"] += 1
+
+            # Runs that disappeared from disk (only checked under this root)
+            for run_dir in known:
+                if run_dir.startswith(root) and run_dir not in found and _mtime(os.path.join(run_dir, STATS_FILE)) is None:
+                    self.conn.execute("DELETE FROM runs WHERE run_dir = ?", (run_dir,))
+                    counts["removed"] += 1
+        return counts
+
+    def _discover(self, path, found):
+        """
+        Collects run folders under path. A directory whose mtime didn't change can't have gained or lost
+        children, so its cached child list is reused instead of listing it again.
+        """
+        mtime = _mtime(path)
+        if mtime is None:
+            return
+        row = self.conn.execute("SELECT mtime, children FROM dirs WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == mtime:
+            children = json.loads(row[1])
+            is_run = bool(children and children[0] == STATS_FILE)
+            subdirs = children[1:] if is_run else children
+        else:
+            subdirs = []
+            is_run = False
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        # Shared graph assets are not run folders
+                        if not entry.name.startswith("_"):
+                            subdirs.append(entry.name)
+                    elif entry.name == STATS_FILE:
+                        is_run = True
+            children = ([STATS_FILE] if is_run else []) + subdirs
+            self.conn.execute("INSERT OR REPLACE INTO dirs (path, mtime, children) VALUES (?, ?, ?)", (path, mtime, json.dumps(children)))
+
+        if is_run:
+            found.add(path)
+        for name in subdirs:
+            self._discover(os.path.join(path, name), found)
+
+    @staticmethod
+    def _hash_run(stats_path, meta_path):
+        h = hashlib.sha1()
+        for p in (stats_path, meta_path):
+            if os.path.exists(p):
+                with open(p, "rb") as f:
+                    h.update(f.read())
+        return h.hexdigest()
+
+    def _ingest(self, run_dir, stats_path, meta_path, stats_mtime, meta_mtime, content_hash):
+        data = parse_benchmark_file(stats_path)
+        if not data:
+            return False
+
+        meta = {}
+        if meta_mtime is not None:
+            try:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                meta = {}
+
+        solver_params = meta.get("solvers", {})
+        self.conn.execute("DELETE FROM runs WHERE run_dir = ?", (run_dir,))
+        cur = self.conn.execute(
+            "INSERT INTO runs (run_dir, stats_mtime, meta_mtime, content_hash, n, floor, ceiling, num_users, num_transactions, seed, scenario, params) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (run_dir, stats_mtime, meta_mtime, content_hash, data[0]['N'], data[0]['Theoretical_Floor'], data[0]['Theoretical_Ceiling'],
+             meta.get("num_users"), meta.get("num_transactions"), meta.get("seed"),
+             meta.get("scenario", _scenario_from_path(run_dir)), json.dumps(meta.get("params", {})))
+        )
+        run_id = cur.lastrowid
+        self.conn.executemany(
+            "INSERT INTO results (run_id, algorithm, transactions, time_s, peak_rss_mb, peak_traced_mb, solver_params) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(run_id, r['Algorithm'], r['Transactions'], r['Time (s)'], r.get('Peak RSS Delta (MB)'), r.get('Peak Traced (MB)'),
+              json.dumps(solver_params.get(r['Algorithm'], {}))) for r in data]
+        )
+        return True
+
+    # ---------- Queries ----------
+
+    def load_frame(self, scenario: Optional[str] = None, min_n: Optional[int] = None, max_n: Optional[int] = None, algorithms=None):
+        """
+        Returns the benchmark rows as a DataFrame with the columns analysis.py expects:
+        Algorithm, Transactions, Time (s), N, Theoretical_Floor, Optimality Gap (+ memory, Seed, Scenario, Run).
+        """
+        import pandas as pd
+
+        query = (
+            "SELECT r.algorithm AS 'Algorithm', r.transactions AS 'Transactions', r.time_s AS 'Time (s)', "
+            "u.n AS 'N', u.floor AS 'Theoretical_Floor', "
+            "MAX(0, r.transactions - u.floor) AS 'Optimality Gap', "
+            "r.peak_rss_mb AS 'Peak RSS Delta (MB)', r.peak_traced_mb AS 'Peak Traced (MB)', "
+            "u.seed AS 'Seed', u.scenario AS 'Scenario', u.run_id AS 'Run' "
+            "FROM results r JOIN runs u ON r.run_id = u.run_id WHERE u.n > 0"
+        )
+        args = []
+        if scenario is not None:
+            query += " AND u.scenario = ?"; args.append(scenario)
+        if min_n is not None:
+            query += " AND u.n >= ?"; args.append(min_n)
+        if max_n is not None:
+            query += " AND u.n <= ?"; args.append(max_n)
+        if algorithms:
+            query += f" AND r.algorithm IN ({','.join('?' * len(algorithms))})"; args.extend(algorithms)
+        query += " ORDER BY u.n, u.run_id"
+        return pd.read_sql_query(query, self.conn, params=args)
+
+    def run_count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
@@ -0,0 +1,130 @@
+import weakref
+import numpy as np
+from multiprocessing import shared_memory
+from models.settlement_plan import SettlementPlan
+from models.snapshot import RECORD
+
+# Shared memory transport for worker processes (benchmark solver workers, solve_many chunks).
+# Instead of pickling a {user: balance} dict / a plan to every worker, the arrays live in a
+# multiprocessing.shared_memory block and only a tiny handle (block name, shape, dtype) goes through the pipe.
+#
+#   shared = share_balances(active_balances)          # parent, one copy into shared memory
+#   plan_buf = SharedArray.create(n, RECORD)          # parent, output buffer the worker fills
+#   ... pass shared / plan_buf to the worker ...
+#   balances = shared_balances_dict(shared)           # worker
+#   count = write_plan(plan_buf, plan)                # worker, None if the plan doesn't fit
+#   plan = read_plan(plan_buf, count)                 # parent
+#   shared.release(); plan_buf.release()              # parent (also happens when the handles are garbage collected)
+#
+# The parent allocates everything and owns it: on Windows a block disappears as soon as no process has it open,
+# so a worker can't create the output block and exit before the parent attached to it.
+
+BALANCES = np.dtype([("user", "<i8"), ("balance", "<f8")])
+
+def _release(shm, unlink):
+    try:
+        shm.close()
+    except BufferError:
+        # A numpy view is still alive somewhere, the mapping goes when it does
+        pass
+    if unlink:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+class SharedArray:
+    """
+    numpy array in a shared memory block. Pickles as a handle (name, shape, dtype), .array in the receiving process
+    is a view on the same memory. The creating process owns the block and frees it with release()
+    (or `with`, or when the handle is garbage collected), workers only ever close their mapping.
+    """
+    def __init__(self, name, shape, dtype):
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self._shm = None
+        self._view = None
+        self._finalizer = None
+        self._owner = False
+
+    @classmethod
+    def create(cls, shape, dtype):
+        shape = (shape,) if isinstance(shape, int) else tuple(shape)
+        dtype = np.dtype(dtype)
+        # Zero sized blocks aren't allowed
+        shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+        handle = cls(shm.name, shape, dtype)
+        handle._shm = shm
+        handle._owner = True
+        handle._finalizer = weakref.finalize(handle, _release, shm, True)
+        return handle
+
+    @classmethod
+    def copy_of(cls, array):
+        array = np.asarray(array)
+        handle = cls.create(array.shape, array.dtype)
+        handle.array[...] = array
+        return handle
+
+    @property
+    def owner(self):
+        return self._owner
+
+    @property
+    def array(self):
+        if self._view is None:
+            if self._shm is None:
+                self._shm = shared_memory.SharedMemory(name=self.name)
+                self._finalizer = weakref.finalize(self, _release, self._shm, False)
+            self._view = np.ndarray(self.shape, dtype=self.dtype, buffer=self._shm.buf)
+        return self._view
+
+    def release(self):
+        """Owner: frees the block. Worker: closes its mapping."""
+        self._view = None
+        if self._finalizer is not None:
+            self._finalizer()
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def __getstate__(self):
+        return {"name": self.name, "shape": self.shape, "dtype": self.dtype}
+
+    def __setstate__(self, state):
+        self.__init__(state["name"], state["shape"], state["dtype"])
+
+    def __repr__(self):
+        return f"SharedArray({self.name!r}, shape={self.shape}, dtype={self.dtype})"
+
+def share_balances(balances) -> SharedArray:
+    """{user: balance} dict -> shared (user, balance) records."""
+    handle = SharedArray.create(len(balances), BALANCES)
+    rows = handle.array
+    rows["user"] = np.fromiter(balances.keys(), dtype=np.int64, count=len(balances))
+    rows["balance"] = np.fromiter(balances.values(), dtype=np.float64, count=len(balances))
+    return handle
+
+def shared_balances_dict(handle: SharedArray) -> dict:
+    """The {user: balance} dict back (exact, float64 round trips), what the solvers take."""
+    rows = handle.array
+    return dict(zip(rows["user"].tolist(), rows["balance"].tolist()))
+
+def write_plan(handle: SharedArray, plan):
+    """Copies a plan into a shared RECORD buffer. Returns the row count, None if the buffer is too small."""
+    plan = plan if isinstance(plan, SettlementPlan) else SettlementPlan(plan)
+    if len(plan) > len(handle.array):
+        return None
+    rows = handle.array[:len(plan)]
+    rows["payer"], rows["payee"], rows["cents"] = plan.payers, plan.payees, plan.cents
+    return len(plan)
+
+def read_plan(handle: SharedArray, count: int) -> SettlementPlan:
+    """Copy of the first count rows of a shared RECORD buffer as a SettlementPlan (the buffer can be reused after)."""
+    rows = handle.array[:count]
+    return SettlementPlan.from_arrays(rows["payer"], rows["payee"], rows["cents"])
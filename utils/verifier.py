@@ -0,0 +1,120 @@
+import numpy as np
+from models.settlement_plan import as_plan
+
+# Settlement verifier: does a plan actually settle the balances it was solved for?
+# Everything is in integer cents, one np.bincount over payers and one over payees gives every user's net flow,
+# so a plan of 1M transactions checks in milliseconds (cheap enough to run after every solve).
+#
+# Debtors have negative balances and pay, so a plan settles user u iff
+#     paid_out[u] - received[u] == -balance[u]
+# for every user (users missing from the balances count as 0, i.e. they must come out even).
+
+# How many mismatched users are listed in the report (the count is always exact)
+MAX_REPORTED = 10
+
+class SettlementError(Exception):
+    """Raised by check_plan when a plan doesn't settle the balances."""
+
+# SettlementPlan ids are int32, anything outside 0 <= id < USER_ID_LIMIT can't be a real user and is reported as a mismatch
+USER_ID_LIMIT = 2 ** 31
+
+def balances_to_cents(balances, size=0):
+    """{user: balance} dict or a per user sequence (ExpenseManager.net_balances) -> int64 cents array indexed by user id."""
+    if isinstance(balances, dict):
+        ids, cents = _keyed_cents(balances)
+        if len(ids) and (ids.min() < 0 or ids.max() >= USER_ID_LIMIT):
+            raise ValueError(f"user ids must be in 0..{USER_ID_LIMIT - 1}")
+        out = np.zeros(max(size, int(ids.max()) + 1 if len(ids) else 0), dtype=np.int64)
+        out[ids] = cents
+        return out
+    cents = np.rint(np.asarray(balances, dtype=np.float64) * 100).astype(np.int64)
+    return np.pad(cents, (0, max(0, size - len(cents))))
+
+def _keyed_cents(balances):
+    """{user: balance} -> (int64 ids, int64 cents)."""
+    try:
+        ids = np.fromiter(balances.keys(), dtype=np.int64, count=len(balances))
+    except OverflowError:
+        # Keys past int64 are invalid anyway, pin them to -1 so they still show up as mismatches
+        ids = np.fromiter((k if -2 ** 63 <= k < 2 ** 63 else -1 for k in balances.keys()), dtype=np.int64, count=len(balances))
+    vals = np.fromiter(balances.values(), dtype=np.float64, count=len(balances))
+    return ids, np.rint(vals * 100).astype(np.int64)
+
+def _index_users(ids, payers, payees):
+    """
+    Maps every id that shows up (balances, payers, payees) to a row in the per user arrays.
+    Dense non negative ids index directly like before, sparse / huge / negative ones get compacted with np.unique
+    so the arrays are sized by how many users there are, not by the largest id.
+    Returns (user id per row, balance rows, payer rows, payee rows).
+    """
+    count = len(ids) + len(payers) + len(payees)
+    lo = min(ids.min(initial=0), payers.min(initial=0), payees.min(initial=0))
+    hi = max(ids.max(initial=-1), payers.max(initial=-1), payees.max(initial=-1))
+    if lo >= 0 and hi < 2 * count + 1024:
+        return np.arange(hi + 1, dtype=np.int64), ids, payers, payees
+    users, inverse = np.unique(np.concatenate([ids, payers, payees]).astype(np.int64), return_inverse=True)
+    inverse = inverse.ravel()
+    n_ids, n_payers = len(ids), len(payers)
+    return users, inverse[:n_ids], inverse[n_ids:n_ids + n_payers], inverse[n_ids + n_payers:]
+
+def verify_plan(plan, balances, tolerance_cents=0):
+    """
+    Checks a solver's plan (SettlementPlan or old style tuple list) against the balances it was solved for.
+    Returns dict(ok, transactions, users, mismatched_users, max_error_cents, mismatches, invalid_users, bad_amounts,
+    self_payments)
+    where mismatches lists up to MAX_REPORTED (user, expected cents, actual cents).
+    Users with an id outside 0 <= id < USER_ID_LIMIT always count as mismatched.
+    """
+    plan = as_plan(plan)
+    payers, payees, cents = plan.payers, plan.payees, plan.cents
+    if isinstance(balances, dict):
+        ids, owed = _keyed_cents(balances)
+    else:
+        owed = balances_to_cents(balances)
+        ids = np.arange(len(owed), dtype=np.int64)
+    users, rows, payer_rows, payee_rows = _index_users(ids, payers, payees)
+    size = len(users)
+    expected = np.zeros(size, dtype=np.int64)
+    expected[rows] = owed
+
+    # Net flow per user, weights go through float64 which is exact for anything below 2^53 cents
+    paid = np.bincount(payer_rows, weights=cents, minlength=size)
+    received = np.bincount(payee_rows, weights=cents, minlength=size)
+    flow = np.rint(paid - received).astype(np.int64)
+
+    error = flow + expected
+    invalid = (users < 0) | (users >= USER_ID_LIMIT)
+    bad = np.flatnonzero((np.abs(error) > tolerance_cents) | invalid)
+    return {
+        "ok": len(bad) == 0 and not (cents <= 0).any() and not (payers == payees).any(),
+        "transactions": len(cents),
+        "users": size,
+        "mismatched_users": int(len(bad)),
+        "max_error_cents": int(np.abs(error).max(initial=0)),
+        "mismatches": [(int(users[u]), int(-expected[u]), int(flow[u])) for u in bad[:MAX_REPORTED]],
+        "invalid_users": int(invalid.sum()),
+        "bad_amounts": int((cents <= 0).sum()),
+        "self_payments": int((payers == payees).sum()),
+    }
+
+def check_plan(plan, balances, tolerance_cents=0):
+    """verify_plan that raises SettlementError with a readable summary instead of returning a failed report."""
+    report = verify_plan(plan, balances, tolerance_cents)
+    if not report["ok"]:
+        raise SettlementError(format_report(report))
+    return report
+
+def format_report(report):
+    if report["ok"]:
+        return f"OK: {report['transactions']} transactions settle {report['users']} users"
+    parts = []
+    if report["mismatched_users"]:
+        users = ", ".join(f"user {u} should pay {e / 100:.2f} net, pays {a / 100:.2f}" for u, e, a in report["mismatches"])
+        parts.append(f"{report['mismatched_users']} user(s) off by up to {report['max_error_cents'] / 100:.2f} ({users})")
+    if report.get("invalid_users"):
+        parts.append(f"{report['invalid_users']} user id(s) outside 0..{USER_ID_LIMIT - 1}")
+    if report["bad_amounts"]:
+        parts.append(f"{report['bad_amounts']} non positive amount(s)")
+    if report["self_payments"]:
+        parts.append(f"{report['self_payments']} self payment(s)")
+    return "INVALID: " + "; ".join(parts)
@@ -1,5 +1,10 @@
+import json
+import math
+from collections import defaultdict
+from typing import Union
 from pyvis.network import Network
 from models.expense_manager import ExpenseManager
+from models.plan_view import PlanView
 
 # The idea was mine to generate these kinds of graphs but used AI to generate the entire base code 
 # Generated By AI (Gemini) after detailed instructions from me
@@ -23,10 +28,29 @@ def _clean_id(node_id):
             return node_id
     return node_id
 
-def generate_graph_html(manager: ExpenseManager, filepath: str):
+# Above this many users the full graph is unusable in the browser, switch to the Level-of-Detail renderer
+LARGE_GRAPH_THRESHOLD = 1500
+
+def _node_style(bal):
+    """
+    Returns (color, size) for a node with the given balance.
+    """
+    if abs(bal) > 0.01: 
+        color = "#006c00" if bal > 0 else "#bb0000"
+    else: 
+        color = "#616161"
+    return color, 10 + (abs(bal) / 10)
+
+def generate_graph_html(manager: Union[ExpenseManager, PlanView], filepath: str, large_graph_threshold: int = LARGE_GRAPH_THRESHOLD):
     """
     Generates the PyVis graph and injects the Focus Mode JS.
+    Accepts either a full ExpenseManager or a read-only PlanView (balances + plan edges).
+    Graphs with more than large_graph_threshold users are rendered in Level-of-Detail mode.
     """
+    if large_graph_threshold and len(manager.net_balances) > large_graph_threshold:
+        generate_lod_graph_html(manager, filepath)
+        return
+
     # Initialize Network
     net = Network(height="850px", width="100%", bgcolor="white", font_color="black", directed=True)
     net.force_atlas_2based()
@@ -35,112 +59,309 @@ def generate_graph_html(manager: ExpenseManager, filepath: str):
     # We use enumerate, so uid is guaranteed to be an Integer 0, 1, 2...
     for uid, bal in enumerate(manager.net_balances):
         clean_uid = _clean_id(uid)
-        
-        if abs(bal) > 0.01: 
-            color = "#006c00" if bal > 0 else "#bb0000"
-        else: 
-            color = "#616161"
-        
+        color, size = _node_style(bal)
         title = f"User ID: {clean_uid}\nNet Balance: ${bal:.2f}"
-        size = 10 + (abs(bal) / 10)
         
         net.add_node(clean_uid, label=f"User {clean_uid}", title=title, color=color, size=size)
 
     # 2. Add Edges
     limit = 3000
-    for i, t in enumerate(manager.transactions):
+    edge_list = []
+    for i, (payer, payee, amt) in enumerate(manager.iter_edges()):
         if i > limit: break
         
         # Robustly clean IDs to ensure they match the Nodes added above
-        u = _clean_id(t.payer_id)
-        v = _clean_id(t.payee_id)
+        u = _clean_id(payer)
+        v = _clean_id(payee)
         
-        width = 1 + (t.amount / 50)
+        width = 1 + (amt / 50)
         
         try:
-            net.add_edge(u, v, title=f"${t.amount:.2f}", width=width, color="#555555", arrows='to')
+            net.add_edge(u, v, id=f"e{i}", title=f"${amt:.2f}", width=width, color="#555555", arrows='to')
+            edge_list.append((f"e{i}", u, v))
         except Exception as e:
             print(f"Skipping invalid edge {u}->{v}: {e}")
             continue
 
     # 3. Save and Inject JS
     net.write_html(filepath)
-    _inject_focus_mode_js(filepath)
+    _inject_focus_mode_js(filepath, _focus_index(edge_list))
 
-def _inject_focus_mode_js(filename):
+def _magnitude_bin(bal, n_bins):
     """
-    Injects custom JavaScript for click-to-focus functionality.
+    Order of magnitude bucket of a balance: $0-10 -> 0, $10-100 -> 1, ... capped at n_bins - 1.
     """
-    js_logic = """
-    network.on("selectNode", function (params) {
-        if (params.nodes.length === 1) {
-            var nodeId = params.nodes[0];
-            var connectedNodes = network.getConnectedNodes(nodeId);
-            var connectedEdges = network.getConnectedEdges(nodeId);
-            
-            connectedNodes.push(nodeId);
+    mag = abs(bal)
+    if mag < 10:
+        return 0
+    return min(n_bins - 1, int(math.log10(mag)))
 
-            var allNodes = nodes.get(); 
-            var allEdges = edges.get();
+def _bin_label(b, n_bins):
+    lo = 0 if b == 0 else 10 ** b
+    if b == n_bins - 1:
+        return f"${lo:,}+"
+    return f"${lo:,}-${10 ** (b + 1):,}"
 
-            var nodesToUpdate = [];
-            var edgesToUpdate = [];
+def generate_lod_graph_html(manager: Union[ExpenseManager, PlanView], filepath: str, top_k: int = 100, n_bins: int = 5, drill_limit: int = 150, max_edges: int = 2000):
+    """
+    Level-of-Detail renderer for large graphs (HTML size bounded regardless of N).
 
-            for (var i = 0; i < allNodes.length; i++) {
-                var n = allNodes[i];
-                if (connectedNodes.indexOf(n.id) === -1) {
-                    if (!n.hidden) { n.hidden = true; nodesToUpdate.push(n); }
-                } else {
-                    if (n.hidden) { n.hidden = false; nodesToUpdate.push(n); }
-                }
-            }
+    Strategy:
+    1. Keep the top_k debtors and top_k creditors as real nodes.
+    2. Everyone else is aggregated into cluster supernodes by sign and order of magnitude of their balance
+       (e.g. "Debtors $10-$100"), neutral users go in one cluster.
+    3. Plan edges are re-pointed to the representative (user or cluster) and summed, so edge count is bounded
+       by the number of representatives, then capped at max_edges (largest amounts first).
+    4. Layout is precomputed here (debtors left, creditors right, clusters on the outside) and physics is off,
+       so the browser doesn't have to simulate anything.
+    5. Double click a cluster to drill into it: its drill_limit largest members (and their edges) are added on demand.
+    """
+    balances = manager.net_balances
+    debtors = sorted((u for u, b in enumerate(balances) if b < -0.01), key=lambda u: balances[u])
+    creditors = sorted((u for u, b in enumerate(balances) if b > 0.01), key=lambda u: -balances[u])
+    kept = set(debtors[:top_k]) | set(creditors[:top_k])
 
-            for (var i = 0; i < allEdges.length; i++) {
-                var e = allEdges[i];
-                if (connectedEdges.indexOf(e.id) === -1) {
-                    if (!e.hidden) { e.hidden = true; edgesToUpdate.push(e); }
-                } else {
-                    if (e.hidden) { e.hidden = false; edgesToUpdate.push(e); }
-                }
+    # 1. Representatives: every user maps to itself (kept) or to a cluster id
+    def cluster_of(u):
+        bal = balances[u]
+        if abs(bal) <= 0.01:
+            return "cluster_neutral"
+        side = "c" if bal > 0 else "d"
+        return f"cluster_{side}_{_magnitude_bin(bal, n_bins)}"
+
+    def rep(u):
+        return u if u in kept else cluster_of(u)
+
+    members = defaultdict(list)
+    for u in range(len(balances)):
+        if u not in kept:
+            members[cluster_of(u)].append(u)
+
+    # 2. Aggregate edges between representatives (and per clustered member for drill down)
+    agg_edges = defaultdict(lambda: [0.0, 0])
+    member_edges = defaultdict(lambda: defaultdict(float))
+    internal = defaultdict(int)
+    for payer, payee, amt in manager.iter_edges():
+        ru, rv = rep(payer), rep(payee)
+        if ru == rv:
+            internal[ru] += 1
+        else:
+            e = agg_edges[(ru, rv)]
+            e[0] += amt
+            e[1] += 1
+        # Keep the member level edge (pointing at the other side's representative) for drill down
+        if payer not in kept:
+            member_edges[payer][(payer, rv)] += amt
+        if payee not in kept:
+            member_edges[payee][(ru, payee)] += amt
+
+    # 3. Server side layout (physics off)
+    net = Network(height="850px", width="100%", bgcolor="white", font_color="black", directed=True)
+    net.toggle_physics(False)
+    positions = {}
+
+    def place_column(users, x_sign):
+        cols = 3
+        rows = math.ceil(len(users) / cols) if users else 0
+        for i, u in enumerate(users):
+            x = x_sign * (400 + (i % cols) * 120)
+            y = (i // cols - rows / 2) * 60
+            positions[u] = (x, y)
+
+    place_column(debtors[:top_k], -1)
+    place_column(creditors[:top_k], 1)
+    for u in list(positions.keys()):
+        bal = balances[u]
+        color, size = _node_style(bal)
+        x, y = positions[u]
+        net.add_node(u, label=f"User {u}", title=f"User ID: {u}\nNet Balance: ${bal:.2f}", color=color, size=size, x=x, y=y, physics=False)
+
+    clusters = {}
+    for b in range(n_bins):
+        for side, x_sign in (("d", -1), ("c", 1)):
+            cid = f"cluster_{side}_{b}"
+            if cid not in members:
+                continue
+            group = members[cid]
+            total = sum(balances[u] for u in group)
+            name = "Debtors" if side == "d" else "Creditors"
+            x, y = x_sign * 1100, (b - n_bins / 2) * 220
+            positions[cid] = (x, y)
+            clusters[cid] = group
+            net.add_node(
+                cid, label=f"{name} {_bin_label(b, n_bins)} ({len(group)})",
+                title=f"{len(group)} users | Total: ${total:,.2f} | Internal edges: {internal[cid]}\nDouble click to expand",
+                color="#8fbc8f" if side == "c" else "#e9967a", shape="box", x=x, y=y, physics=False
+            )
+    if "cluster_neutral" in members:
+        group = members["cluster_neutral"]
+        positions["cluster_neutral"] = (0, -900)
+        clusters["cluster_neutral"] = group
+        net.add_node("cluster_neutral", label=f"Neutral ({len(group)})", title=f"{len(group)} users with zero balance",
+                     color="#616161", shape="box", x=0, y=-900, physics=False)
+
+    # 4. Edges (largest flows first, capped)
+    ranked = sorted(agg_edges.items(), key=lambda kv: -kv[1][0])[:max_edges]
+    edge_list = []
+    for i, ((u, v), (amt, count)) in enumerate(ranked):
+        title = f"${amt:.2f}" if count == 1 else f"${amt:.2f} over {count} transactions"
+        net.add_edge(u, v, id=f"e{i}", title=title, width=1 + min(amt, 5000) / 50, color="#555555", arrows='to')
+        edge_list.append((f"e{i}", u, v))
+
+    # 5. Drill down payload (bounded by drill_limit per cluster)
+    drill = {}
+    for cid, group in clusters.items():
+        top = sorted(group, key=lambda u: -abs(balances[u]))[:drill_limit]
+        cx, cy = positions[cid]
+        nodes_payload = []
+        edges_payload = []
+        for i, u in enumerate(top):
+            bal = balances[u]
+            color, size = _node_style(bal)
+            angle = 2 * math.pi * i / max(1, len(top))
+            radius = 120 + 25 * (i // 24)
+            nodes_payload.append({
+                "id": u, "label": f"User {u}", "title": f"User ID: {u}\nNet Balance: ${bal:.2f}",
+                "color": color, "size": size, "x": cx + radius * math.cos(angle), "y": cy + radius * math.sin(angle),
+                "physics": False,
+            })
+            for j, ((a, b2), amt) in enumerate(list(member_edges[u].items())[:10]):
+                edges_payload.append({"id": f"{cid}_{u}_{j}", "from": a, "to": b2, "title": f"${amt:.2f}",
+                                      "width": 1 + min(amt, 5000) / 50, "color": "#999999", "arrows": "to"})
+        drill[cid] = {"nodes": nodes_payload, "edges": edges_payload}
+
+    net.write_html(filepath)
+    _inject_focus_mode_js(filepath, _focus_index(edge_list), _drill_down_js(drill))
+
+def _drill_down_js(drill):
+    """
+    JS for expanding / collapsing cluster supernodes on double click.
+    Member nodes are only added to the DataSets when asked for.
+    """
+    return """
+    var clusterDrill = %s;
+    var expanded = {};
+    network.on("doubleClick", function (params) {
+        if (params.nodes.length !== 1) return;
+        var cid = params.nodes[0];
+        var payload = clusterDrill[cid];
+        if (!payload) return;
+        if (expanded[cid]) {
+            edges.remove(expanded[cid].edges);
+            nodes.remove(expanded[cid].nodes);
+            delete expanded[cid];
+            return;
+        }
+        var nodeIds = [];
+        for (var i = 0; i < payload.nodes.length; i++) {
+            if (nodes.get(payload.nodes[i].id) === null) {
+                nodes.add(payload.nodes[i]);
+                nodeIds.push(payload.nodes[i].id);
             }
-            
-            if (nodesToUpdate.length > 0) nodes.update(nodesToUpdate);
-            if (edgesToUpdate.length > 0) edges.update(edgesToUpdate);
         }
+        var edgeIds = [];
+        for (var i = 0; i < payload.edges.length; i++) {
+            var e = payload.edges[i];
+            // Skip edges whose other endpoint isn't on the canvas (e.g. member of a collapsed cluster)
+            if (nodes.get(e.from) === null || nodes.get(e.to) === null) continue;
+            if (edges.get(e.id) !== null) continue;
+            edges.add(e);
+            edgeIds.push(e.id);
+            focusIndexEdge(e.id, e.from, e.to);
+        }
+        expanded[cid] = {nodes: nodeIds, edges: edgeIds};
     });
+    """ % json.dumps(drill)
 
-    network.on("deselectNode", function (params) {
-        var allNodes = nodes.get();
-        var allEdges = edges.get();
-        
-        var nodesToUpdate = [];
-        var edgesToUpdate = [];
-        
-        for (var i = 0; i < allNodes.length; i++) {
-            if (allNodes[i].hidden) {
-                allNodes[i].hidden = false;
-                nodesToUpdate.push(allNodes[i]);
-            }
+def _focus_index(edge_list):
+    """
+    Precomputes the adjacency index used by Focus Mode.
+    edge_list: [(edge_id, from, to)] -> ({node: [neighbours]}, {node: [incident edge ids]})
+    """
+    adj = defaultdict(list)
+    inc = defaultdict(list)
+    for eid, u, v in edge_list:
+        adj[u].append(v)
+        adj[v].append(u)
+        inc[u].append(eid)
+        inc[v].append(eid)
+    return adj, inc
+
+def _focus_mode_js(adj_js: str, inc_js: str) -> str:
+    """
+    Focus Mode JS, parameterised on the JS expressions for the adjacency and incident edge indexes
+    (inline JSON here, built client side by the shared asset pages in utils/graph_assets.py).
+    Expects `network`, `nodes` and `edges` to be in scope.
+    """
+    return """
+    var focusAdj = %s;
+    var focusInc = %s;
+    var focusShown = null;
+
+    function focusIndexEdge(edgeId, from, to) {
+        (focusAdj[from] = focusAdj[from] || []).push(to);
+        (focusAdj[to] = focusAdj[to] || []).push(from);
+        (focusInc[from] = focusInc[from] || []).push(edgeId);
+        (focusInc[to] = focusInc[to] || []).push(edgeId);
+    }
+
+    function focusSetHidden(dataSet, ids, value) {
+        var updates = [];
+        for (var i = 0; i < ids.length; i++) {
+            // Items can disappear (e.g. collapsed cluster members), update() would re-add them
+            if (dataSet.get(ids[i]) !== null) updates.push({id: ids[i], hidden: value});
         }
-        
-        for (var i = 0; i < allEdges.length; i++) {
-            if (allEdges[i].hidden) {
-                allEdges[i].hidden = false;
-                edgesToUpdate.push(allEdges[i]);
-            }
+        if (updates.length > 0) dataSet.update(updates);
+    }
+
+    function focusClear() {
+        if (focusShown === null) return;
+        // null drops the per item override so the global option applies again
+        focusSetHidden(nodes, focusShown.nodes, null);
+        focusSetHidden(edges, focusShown.edges, null);
+        focusShown = null;
+    }
+
+    network.on("selectNode", function (params) {
+        if (params.nodes.length === 1) {
+            var nodeId = params.nodes[0];
+            var shownNodes = (focusAdj[nodeId] || []).concat([nodeId]);
+            var shownEdges = focusInc[nodeId] || [];
+
+            focusClear();
+            focusSetHidden(nodes, shownNodes, false);
+            focusSetHidden(edges, shownEdges, false);
+            network.setOptions({nodes: {hidden: true}, edges: {hidden: true}});
+            focusShown = {nodes: shownNodes, edges: shownEdges};
         }
-        
-        if (nodesToUpdate.length > 0) nodes.update(nodesToUpdate);
-        if (edgesToUpdate.length > 0) edges.update(edgesToUpdate);
     });
+
+    network.on("deselectNode", function (params) {
+        focusClear();
+        network.setOptions({nodes: {hidden: false}, edges: {hidden: false}});
+    });
+    """ % (adj_js, inc_js)
+
+def _inject_focus_mode_js(filename, focus_index, extra_js=""):
+    """
+    Injects custom JavaScript for click-to-focus functionality.
+    focus_index is the (adjacency, incident edges) pair from _focus_index, shipped as JSON so a click
+    is a dict lookup instead of scanning every node and edge.
+    extra_js is appended after the focus mode logic (used by the LOD renderer for drill down).
+
+    Hiding "everything else" is done with one global option (nodes/edges hidden) while the focused
+    neighbourhood overrides it per item, so select/deselect only touch the neighbourhood being
+    shown and the previously shown one.
     """
+    adj, inc = focus_index
+    js_logic = _focus_mode_js(json.dumps(adj), json.dumps(inc))
 
     try:
         with open(filename, "r") as f:
             html_content = f.read()
             
         if "return network;" in html_content:
-            new_content = html_content.replace("return network;", f"{js_logic}\nreturn network;")
+            new_content = html_content.replace("return network;", f"{js_logic}\n{extra_js}\nreturn network;")
             
             with open(filename, "w") as f:
                 f.write(new_content)